@@ -1,11 +1,17 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel
+from typing import List, Optional
 import joblib
 import datetime
 import os
 import logging
 from crop_recommendation.risk_engine import calculate_oversupply_risk, generate_mock_price_history
-from crop_recommendation.price_model import predict_price
+from crop_recommendation import price_model
+from crop_recommendation.price_grid import PriceGridRefresher
+from crop_recommendation.training_jobs import TrainingJobManager
+from crop_recommendation.price_model import predict_price, predict_prices_batch
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -24,12 +30,49 @@ app.add_middleware(
 
 MODEL_PATH = "crop_recommendation/price_model.pkl"
 
+# Largest crop x district grid accepted by the batch endpoint
+MAX_BATCH_PAIRS = int(os.getenv("PRICE_BATCH_MAX_PAIRS", 100000))
+
+# Rebuilds the precomputed price grid in the background; None when the grid is disabled
+grid_refresher = (
+    PriceGridRefresher(price_model.refresh_price_grid, float(os.getenv("PRICE_GRID_REFRESH_SECONDS", 3600)))
+    if price_model.USE_PRICE_GRID else None
+)
+
+# Trains in a separate process and swaps the new model in only when the fit succeeds
+training_cores = os.getenv("PRICE_TRAINING_CORES")
+training_jobs = TrainingJobManager(
+    csv_path=price_model.TRAINING_DATA_PATH,
+    model_path=price_model.MODEL_PATH,
+    install=price_model.swap_in_model,
+    on_success=grid_refresher.trigger if grid_refresher is not None else None,
+    cores=int(training_cores) if training_cores else None
+)
+
+@app.on_event("startup")
+async def start_price_grid():
+    """Build the price grid off the request path; predictions use the model until it is ready"""
+    if grid_refresher is not None:
+        grid_refresher.start()
+
+@app.on_event("shutdown")
+async def stop_price_grid():
+    if grid_refresher is not None:
+        grid_refresher.stop()
+
+class PriceBatchRequest(BaseModel):
+    crops: List[str]
+    districts: List[str]
+    arrival_quantity: int = 1000
+    month: Optional[int] = None
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {
         "status": "OK",
         "service": "Kisan Unnati Price Prediction API",
+        "model": price_model.get_model_info(),
         "timestamp": datetime.datetime.now().isoformat()
     }
 
@@ -78,6 +121,58 @@ async def get_price_prediction(crop: str, district: str, arrival_quantity: int =
         logger.error(f"Error predicting price: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to predict price")
 
+@app.post("/api/predict-price/batch")
+async def get_price_predictions_batch(request: PriceBatchRequest):
+    """
+    Predict prices for every crop x district pair in one model call
+    
+    Parameters:
+    - crops: Crop names
+    - districts: District names
+    - arrival_quantity: Quantity arriving in market (default: 1000)
+    - month: Month to predict for (default: current month)
+    
+    Returns:
+    - predictions: List of {crop, district, predicted_price} objects, crop-major
+    - count: Number of predictions
+    """
+    if not request.crops or not request.districts:
+        raise HTTPException(status_code=400, detail="At least one crop and one district are required")
+    if len(request.crops) * len(request.districts) > MAX_BATCH_PAIRS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_PAIRS} crop x district pairs per request")
+    if request.month is not None and not 1 <= request.month <= 12:
+        raise HTTPException(status_code=400, detail="Month must be between 1 and 12")
+    
+    try:
+        # Scoring up to MAX_BATCH_PAIRS rows would block the event loop, and with it
+        # every other request, so it runs in the threadpool
+        predictions = await run_in_threadpool(
+            predict_prices_batch, request.crops, request.districts, request.arrival_quantity, request.month
+        )
+        
+        return {
+            "predictions": predictions,
+            "count": len(predictions),
+            "timestamp": datetime.datetime.now().isoformat()
+        }
+    except Exception as e:
+        logger.error(f"Error predicting prices: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to predict prices")
+
+@app.get("/api/price-grid")
+async def get_price_grid_status():
+    """
+    Get the precomputed price grid's shape, arrival buckets and refresh status
+    """
+    grid = price_model.price_grid
+    return {
+        "enabled": grid_refresher is not None,
+        "ready": price_model.is_price_grid_current(),
+        "grid": grid.get_info() if grid is not None else None,
+        "refresh": grid_refresher.get_status() if grid_refresher is not None else None,
+        "timestamp": datetime.datetime.now().isoformat()
+    }
+
 @app.get("/api/price-history")
 async def get_price_history(crop: str, district: str, months: int = 12):
     """
@@ -149,22 +244,47 @@ async def get_risk_assessment(crop: str, district: str):
         logger.error(f"Error assessing risk: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to assess risk")
 
-@app.post("/api/train-model")
-async def train_model():
+@app.post("/api/train-model", status_code=202)
+async def train_model(cores: Optional[int] = None):
     """
-    Endpoint to trigger model training (admin only in production)
+    Start a background training job (admin only in production)
+    
+    Parameters:
+    - cores: Cores for the fit (default: PRICE_TRAINING_CORES, else half the CPUs)
+    
+    Returns:
+    - job_id: Id to poll at /api/train-model/{job_id}
     """
     try:
-        from crop_recommendation.price_model import train_model
-        message = train_model()
+        job = training_jobs.submit(cores=cores)
         return {
-            "status": "success",
-            "message": message,
+            "status": "accepted",
+            "job_id": job.job_id,
+            "job": job.to_dict(),
             "timestamp": datetime.datetime.now().isoformat()
         }
     except Exception as e:
-        logger.error(f"Error training model: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to train model")
+        logger.error(f"Error starting training job: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to start training job")
+
+@app.get("/api/train-model")
+async def list_training_jobs():
+    """List recent training jobs with their status and progress"""
+    return {
+        "jobs": training_jobs.list_jobs(),
+        "timestamp": datetime.datetime.now().isoformat()
+    }
+
+@app.get("/api/train-model/{job_id}")
+async def get_training_job(job_id: str):
+    """
+    Get a training job's status (queued, running, succeeded, failed),
+    progress (0-1), current stage and error, if any
+    """
+    job = training_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Training job not found")
+    return job
 
 if __name__ == "__main__":
     import uvicorn
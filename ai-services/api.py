@@ -1,15 +1,19 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 import uvicorn
 import os
+import json
+from functools import partial
 from dotenv import load_dotenv
 
 # Import AI service modules
 from crop_recommendation.predict import CropRecommender
 from disease_detection.predict import DiseaseDetector
-from chatbot.intent_handler import ChatbotHandler
+from chatbot import ChatbotHandler
+from inference_executor import ServiceOverloaded, create_inference_executor, lane_limits
 
 # Load environment variables
 load_dotenv()
@@ -31,9 +35,31 @@ app.add_middleware(
 
 # Initialize AI services
 crop_recommender = CropRecommender()
-disease_detector = DiseaseDetector()
+# TensorFlow is not fork-safe once it has loaded a model, so the Keras model is
+# loaded in each worker's startup event rather than at import (see serve.py)
+disease_detector = DiseaseDetector(
+    fast_decode=os.getenv("DISEASE_FAST_DECODE", "true").lower() == "true",
+    lazy_load=True
+)
 chatbot_handler = ChatbotHandler()
 
+# Run blocking model code off the event loop with per-service limits.
+# sklearn crop scoring gets worker processes (it holds the GIL); TensorFlow,
+# OpenCV, spaCy and OpenAI calls release it and share a thread pool.
+inference = create_inference_executor()
+inference.add_process_lane(
+    "crop",
+    CropRecommender,
+    processes=int(os.getenv("INFERENCE_CROP_PROCESSES", 2)),
+    max_queue=lane_limits("crop", 0, 64)[1],
+    local_target=crop_recommender,
+    warmup="is_ready",
+    refresh="reload_model"
+)
+inference.add_thread_lane("advisory", *lane_limits("advisory", 4, 32), target=crop_recommender)
+inference.add_thread_lane("disease", *lane_limits("disease", 4, 32))
+inference.add_thread_lane("chat", *lane_limits("chat", 8, 64))
+
 # Pydantic models for request/response
 class CropRecommendationRequest(BaseModel):
     soil_type: str
@@ -48,6 +74,14 @@ class CropRecommendationResponse(BaseModel):
     confidence_scores: Dict[str, float]
     reasoning: str
 
+class CropRecommendationBatchRequest(BaseModel):
+    requests: List[CropRecommendationRequest]
+    top_k: int = 3
+
+class CropRecommendationBatchResponse(BaseModel):
+    results: List[CropRecommendationResponse]
+    count: int
+
 class ChatRequest(BaseModel):
     message: str
     context: Optional[Dict[str, Any]] = None
@@ -65,6 +99,7 @@ class DiseaseDetectionResponse(BaseModel):
     treatment: str
     prevention: str
     severity: str
+    preprocessing: Optional[Dict[str, Any]] = None
 
 @app.get("/")
 async def root():
@@ -75,23 +110,87 @@ async def root():
         "version": "1.0.0"
     }
 
+@app.exception_handler(ServiceOverloaded)
+async def service_overloaded_handler(request: Request, exc: ServiceOverloaded):
+    """Shed load with 503 when a service's inference queue is full"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc), "service": exc.service},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+def preload_models():
+    """
+    Load model weights up front
+
+    Called by serve.py in the parent before it forks workers, so the weights
+    are shared copy-on-write. Only fork-safe models load here: the Keras disease
+    model loads in each worker's startup event, and the chatbot intent
+    classifier already loads at import.
+    """
+    crop_recommender.is_ready()
+
+@app.on_event("startup")
+async def warm_up_services():
+    """Start per-process inference helpers and load the disease and crop models"""
+    await inference.run("disease", disease_detector.load_model)
+    # Coalesce concurrent disease detection uploads into shared forward passes.
+    # Started here rather than at import so every forked worker gets its own thread.
+    disease_detector.enable_batching(
+        max_batch_size=int(os.getenv("DISEASE_BATCH_MAX_SIZE", 16)),
+        max_wait_ms=float(os.getenv("DISEASE_BATCH_MAX_WAIT_MS", 10))
+    )
+    # Crop worker processes read the artifact this writes, so load it first
+    await inference.run("advisory", crop_recommender.is_ready)
+
+@app.on_event("shutdown")
+async def shutdown_services():
+    """Release background inference workers"""
+    disease_detector.disable_batching()
+    inference.shutdown()
+    await chatbot_handler.prompt_engine.aclose()
+
 @app.get("/health")
 async def health_check():
-    """Detailed health check"""
+    """
+    Detailed health check
+
+    Only reports state: the crop model is loaded (or trained) by the startup
+    warmup on the advisory lane, never from the event loop.
+    """
     return {
         "status": "healthy",
         "services": {
-            "crop_recommendation": crop_recommender.is_ready(),
+            "crop_recommendation": crop_recommender.is_loaded(),
             "disease_detection": disease_detector.is_ready(),
             "chatbot": chatbot_handler.is_ready()
         }
     }
 
+@app.post("/models/reload")
+async def reload_models(force: bool = False):
+    """
+    Hot-reload model artifacts that changed on disk
+
+    Crop worker processes check the artifact before each call and pick up
+    the new model on their own.
+    """
+    try:
+        return {
+            "crop_recommendation": await inference.call("advisory", "reload_model", force=force)
+        }
+    except ServiceOverloaded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Model reload failed: {str(e)}")
+
 @app.post("/crop-recommendation", response_model=CropRecommendationResponse)
 async def recommend_crops(request: CropRecommendationRequest):
     """Get crop recommendations based on soil, location, and weather conditions"""
     try:
-        recommendations = crop_recommender.predict(
+        recommendations = await inference.call(
+            "crop",
+            "predict",
             soil_type=request.soil_type,
             location=request.location,
             season=request.season,
@@ -101,9 +200,41 @@ async def recommend_crops(request: CropRecommendationRequest):
         )
 
         return CropRecommendationResponse(**recommendations)
+    except ServiceOverloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Crop recommendation failed: {str(e)}")
 
+@app.post("/crop-recommendation/batch", response_model=CropRecommendationBatchResponse)
+async def recommend_crops_batch(request: CropRecommendationBatchRequest):
+    """Get crop recommendations for many soil cards in one vectorized model call"""
+    try:
+        recommendations = await inference.call(
+            "crop",
+            "predict_batch",
+            [item.dict() for item in request.requests],
+            top_k=request.top_k
+        )
+
+        return CropRecommendationBatchResponse(
+            results=[CropRecommendationResponse(**rec) for rec in recommendations],
+            count=len(recommendations)
+        )
+    except ServiceOverloaded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch crop recommendation failed: {str(e)}")
+
+@app.get("/crop-recommendation/cache-stats")
+async def crop_cache_stats():
+    """Get recommendation cache hit/miss counters (from one crop worker when they run in processes)"""
+    try:
+        return await inference.call("crop", "get_cache_stats")
+    except ServiceOverloaded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get crop cache stats: {str(e)}")
+
 @app.post("/disease-detection", response_model=DiseaseDetectionResponse)
 async def detect_disease(
     file: UploadFile = File(...),
@@ -119,26 +250,115 @@ async def detect_disease(
         image_data = await file.read()
 
         # Detect disease
-        result = disease_detector.predict(image_data, crop_type)
+        result = await disease_detector.predict_async(
+            image_data, crop_type, offload=partial(inference.run, "disease")
+        )
 
         return DiseaseDetectionResponse(**result)
+    except ServiceOverloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Disease detection failed: {str(e)}")
 
+@app.post("/disease-detection/analyze")
+async def analyze_and_detect_disease(
+    file: UploadFile = File(...),
+    crop_type: str = Form(...)
+):
+    """Check image quality and detect crop disease from one decode of the upload"""
+    try:
+        if not file.content_type.startswith('image/'):
+            raise HTTPException(status_code=400, detail="File must be an image")
+
+        image_data = await file.read()
+
+        return await inference.run("disease", disease_detector.analyze_and_predict, image_data, crop_type)
+    except (HTTPException, ServiceOverloaded):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Image analysis failed: {str(e)}")
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat_with_ai(request: ChatRequest):
     """AI-powered agricultural chatbot"""
     try:
-        response = chatbot_handler.process_message(
+        response = await inference.run(
+            "chat",
+            chatbot_handler.process_message,
             message=request.message,
             context=request.context,
             user_id=request.user_id
         )
 
         return ChatResponse(**response)
+    except ServiceOverloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat processing failed: {str(e)}")
 
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """Stream the chatbot answer as server-sent events"""
+    # Intent classification blocks, so it runs on the chat lane like /chat
+    # before the stream starts (a full lane still answers 503)
+    try:
+        prepared = await inference.run(
+            "chat",
+            chatbot_handler.prepare_turn,
+            request.message,
+            request.user_id
+        )
+    except ServiceOverloaded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Chat processing failed: {str(e)}")
+
+    async def event_stream():
+        async for event in chatbot_handler.stream_message(
+            message=request.message,
+            context=request.context,
+            user_id=request.user_id,
+            prepared=prepared
+        ):
+            yield f"event: {event['event']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/inference/stats")
+async def inference_stats():
+    """Get per-service concurrency, queue depth and rejection counters"""
+    stats = inference.get_stats()
+    if disease_detector.batcher is not None:
+        stats["disease_batcher"] = disease_detector.batcher.get_stats()
+    return stats
+
+@app.get("/inference/metrics", response_class=PlainTextResponse)
+async def inference_metrics():
+    """Inference executor counters in the Prometheus text exposition format"""
+    return PlainTextResponse(inference.to_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/chat/stats")
+async def chat_stats():
+    """Get chatbot usage statistics"""
+    return chatbot_handler.get_chatbot_stats()
+
+@app.get("/chat/metrics", response_class=PlainTextResponse)
+async def chat_metrics():
+    """Chatbot usage counters in the Prometheus text exposition format"""
+    return PlainTextResponse(
+        chatbot_handler.get_prometheus_metrics(),
+        media_type="text/plain; version=0.0.4"
+    )
+
+@app.get("/chat/cache-stats")
+async def chat_cache_stats():
+    """Get LLM response cache hit/miss/eviction counters"""
+    return chatbot_handler.prompt_engine.get_cache_stats()
+
 @app.post("/analyze-soil")
 async def analyze_soil(
     nitrogen: float = Form(...),
@@ -149,7 +369,7 @@ async def analyze_soil(
 ):
     """Analyze soil health and provide recommendations"""
     try:
-        analysis = crop_recommender.analyze_soil({
+        analysis = await inference.call("advisory", "analyze_soil", {
             'nitrogen': nitrogen,
             'phosphorus': phosphorus,
             'potassium': potassium,
@@ -158,6 +378,8 @@ async def analyze_soil(
         })
 
         return analysis
+    except ServiceOverloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Soil analysis failed: {str(e)}")
 
@@ -165,8 +387,10 @@ async def analyze_soil(
 async def get_market_insights(crop_type: Optional[str] = None, location: Optional[str] = None):
     """Get market price predictions and insights"""
     try:
-        insights = crop_recommender.get_market_insights(crop_type, location)
+        insights = await inference.call("advisory", "get_market_insights", crop_type, location)
         return insights
+    except ServiceOverloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Market insights failed: {str(e)}")
 
@@ -180,7 +404,7 @@ async def get_weather_advice(
 ):
     """Get weather-based farming advice"""
     try:
-        advice = crop_recommender.get_weather_advice({
+        advice = await inference.call("advisory", "get_weather_advice", {
             'temperature': temperature,
             'humidity': humidity,
             'rainfall': rainfall,
@@ -189,6 +413,8 @@ async def get_weather_advice(
         })
 
         return advice
+    except ServiceOverloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Weather advice failed: {str(e)}")
 
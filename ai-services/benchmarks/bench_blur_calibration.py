@@ -0,0 +1,66 @@
+"""
+Calibration of the blur threshold for the downsampled quality view
+Synthesizes leaf-like 1/f textures at several upload resolutions, blurs them by
+a fraction of the longest side and JPEG-encodes them, then prints the
+full-resolution Laplacian variance the quality check used before (threshold
+100) next to the sharpness of PreprocessedImage's gray view, marking what
+PreprocessedImage.BLUR_THRESHOLD flags.
+
+Run from the ai-services directory:
+    python benchmarks/bench_blur_calibration.py
+"""
+
+import os
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from disease_detection.image import PreprocessedImage
+
+LEGACY_THRESHOLD = 100.0
+RESOLUTIONS = (512, 1024, 2000, 4000)
+RELATIVE_BLURS = (0.0, 0.0005, 0.001, 0.0015, 0.002, 0.004)
+SPECTRAL_SLOPES = (1.0, 1.2)
+
+
+def synthetic_leaf(height: int, width: int, slope: float, seed: int = 3) -> np.ndarray:
+    """Gray 1/f^slope texture with the contrast of a typical leaf photo"""
+    rng = np.random.default_rng(seed)
+    fy = np.fft.fftfreq(height)[:, None]
+    fx = np.fft.fftfreq(width)[None, :]
+    amplitude = 1.0 / np.maximum(np.hypot(fy, fx), 1.0 / max(height, width)) ** slope
+    phase = rng.uniform(0, 2 * np.pi, (height, width))
+    texture = np.real(np.fft.ifft2(amplitude * np.exp(1j * phase)))
+    texture = (texture - texture.mean()) / texture.std() * 40 + 120
+    return np.clip(texture, 0, 255).astype(np.uint8)
+
+
+def jpeg_round_trip(gray: np.ndarray, quality: int = 85) -> np.ndarray:
+    ok, encoded = cv2.imencode('.jpg', gray, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return cv2.imdecode(encoded, cv2.IMREAD_GRAYSCALE)
+
+
+if __name__ == '__main__':
+    threshold = PreprocessedImage.BLUR_THRESHOLD
+    print(f"View threshold {threshold:g} on a {PreprocessedImage.QUALITY_MAX_SIDE} px view, "
+          f"legacy threshold {LEGACY_THRESHOLD:g} at full resolution ('*' = flagged blurry)")
+    print("=" * 50)
+    print(f"{'slope':>5} {'side':>5} " + ' '.join(f"{f'blur {blur:g}':>17}" for blur in RELATIVE_BLURS))
+
+    for slope in SPECTRAL_SLOPES:
+        for side in RESOLUTIONS:
+            base = synthetic_leaf(side, side * 3 // 4, slope)
+            cells = []
+            for blur in RELATIVE_BLURS:
+                gray = base if blur == 0 else cv2.GaussianBlur(base, (0, 0), blur * side)
+                gray = jpeg_round_trip(gray)
+                legacy = cv2.Laplacian(gray, cv2.CV_64F).var()
+                image = PreprocessedImage(cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR),
+                                          {'original_size': f'{gray.shape[1]}x{gray.shape[0]}'}, None)
+                view = image.quality_metrics()['sharpness']
+                cells.append(f"{legacy:>6.0f}{'*' if legacy < LEGACY_THRESHOLD else ' '}"
+                             f"/{view:>6.0f}{'*' if view < threshold else ' '}")
+            print(f"{slope:>5} {side:>5} " + ' '.join(f"{cell:>17}" for cell in cells))
@@ -0,0 +1,135 @@
+"""
+Check and latency benchmark for the async OpenAI path against a local stub server
+Starts a stub of the chat completions API that emits one token every
+TOKEN_DELAY_MS, points PromptEngine at it through base_url and checks:
+- the async completion returns the stub's answer
+- the stream yields every token in order, and reports time to the first token
+  next to the time for the full answer
+- the prompt built from a user's memory, which already holds the current
+  message, sends that message once
+- a call exceeding the per-call timeout falls back to the canned response
+Exits non-zero on any failure.
+
+Run from the ai-services directory:
+    python benchmarks/bench_chat_streaming.py
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatbot.memory import Turn, UserMemory
+from chatbot.prompt_engine import PromptEngine
+
+TOKENS = ['Sow ', 'wheat ', 'in ', 'early ', 'November ', 'after ', 'the ', 'monsoon.']
+TOKEN_DELAY_MS = 50
+SLOW_MARKER = 'slow'
+
+
+class StubCompletions(BaseHTTPRequestHandler):
+    """Minimal /v1/chat/completions returning TOKENS, as JSON or as an SSE stream"""
+
+    requests = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        StubCompletions.requests.append(body)
+        if any(SLOW_MARKER in message['content'] for message in body['messages'] if message['role'] == 'user'):
+            time.sleep(2.0)
+
+        if not body.get('stream'):
+            payload = json.dumps({
+                'id': 'stub', 'object': 'chat.completion', 'created': int(time.time()), 'model': body['model'],
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': ''.join(TOKENS)}}],
+                'usage': {'prompt_tokens': 1, 'completion_tokens': len(TOKENS), 'total_tokens': len(TOKENS) + 1}
+            }).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        for token in TOKENS:
+            chunk = {'id': 'stub', 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                     'model': body['model'],
+                     'choices': [{'index': 0, 'delta': {'content': token}, 'finish_reason': None}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+            time.sleep(TOKEN_DELAY_MS / 1000.0)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def user_messages(request):
+    return [message['content'] for message in request['messages'] if message['role'] == 'user']
+
+
+async def run_checks(base_url: str) -> bool:
+    ok = True
+    # Every call uses a different message, so none is answered from the response cache
+    engine = PromptEngine(api_key='stub-key', base_url=base_url, request_timeout=1.0)
+
+    def check(name, passed, detail=''):
+        nonlocal ok
+        ok = ok and passed
+        print(f"{name}: {'OK' if passed else 'FAIL'}{f' ({detail})' if detail else ''}")
+
+    answer = await engine.generate_response_async('which crop for loamy soil', 'crop_recommendation', {})
+    check('async completion', answer == ''.join(TOKENS).strip(), repr(answer))
+
+    # Memory as ChatbotHandler.prepare_turn leaves it: the current message is already recorded
+    memory = UserMemory()
+    memory.history.append(Turn('user', 'when should I sow wheat'))
+    memory.history.append(Turn('assistant', 'Which district are you in?'))
+    memory.history.append(Turn('user', 'Ludhiana, sowing wheat'))
+
+    started = time.perf_counter()
+    first_token = None
+    tokens = []
+    async for token in engine.stream_response('Ludhiana, sowing wheat', 'crop_recommendation', {}, memory):
+        if first_token is None:
+            first_token = time.perf_counter() - started
+        tokens.append(token)
+    total = time.perf_counter() - started
+    check('stream tokens', tokens == TOKENS, f"{len(tokens)} tokens")
+    print(f"  time to first token {first_token * 1000:.0f} ms, full answer {total * 1000:.0f} ms")
+
+    sent = user_messages(StubCompletions.requests[-1])
+    check('current message sent once', sent == ['when should I sow wheat', 'Ludhiana, sowing wheat'], repr(sent))
+
+    fallback = engine._generate_fallback_response('crop_recommendation', {})
+    slow = [token async for token in engine.stream_response(f'{SLOW_MARKER} question', 'crop_recommendation', {})]
+    check('timeout falls back', slow == [fallback])
+
+    await engine.aclose()
+    return ok
+
+
+if __name__ == '__main__':
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubCompletions)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    print(f"Stub server at {base_url}, {len(TOKENS)} tokens {TOKEN_DELAY_MS} ms apart")
+    print("=" * 50)
+
+    try:
+        passed = asyncio.run(run_checks(base_url))
+    finally:
+        server.shutdown()
+
+    if not passed:
+        sys.exit(1)
@@ -0,0 +1,120 @@
+"""
+Parity check and micro-benchmark for the precompiled intent matchers
+Compares the previous per-pattern rule loop and per-keyword substring scan
+with RuleMatcher and the keyword automaton in IntentHandler, on fixed cases
+where a lower-priority rule matches earlier in the text plus a random corpus.
+Exits non-zero on any mismatch.
+
+Run from the ai-services directory:
+    python benchmarks/bench_intent_matching.py
+"""
+
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatbot.intent_handler import IntentHandler
+
+NUM_QUERIES = 5000
+
+# (message, intent the previous rule loop returned)
+RULE_CASES = [
+    ("problem with plant recommendation", 'crop_recommendation'),
+    ("issue in crop recommendations please", 'crop_recommendation'),
+    ("yellow leaves, which crop should I grow", 'crop_recommendation'),
+    ("current price of crop after rain today", 'weather_advice'),
+    ("spots on leaves", 'disease_identification'),
+    ("market rates for wheat", 'market_prices'),
+    ("hello there", None)
+]
+
+
+def build_handler():
+    """Build an IntentHandler with the shipped intents and rules without loading spaCy"""
+    handler = IntentHandler.__new__(IntentHandler)
+    handler.intents = handler._load_intents()
+    handler.rules = handler._load_rules()
+    handler._build_matchers()
+    return handler
+
+
+def legacy_rule_classification(handler, message):
+    """Previous implementation: every pattern searched separately, in rule order"""
+    for intent, patterns in handler.rules.items():
+        for pattern in patterns:
+            if re.search(pattern, message, re.IGNORECASE):
+                return intent
+    return None
+
+
+def legacy_keyword_classification(handler, message):
+    """Previous implementation: substring test per keyword, normalized by distinct keywords"""
+    max_score = 0
+    best_intent = 'general_help'
+    for intent_name, intent_data in handler.intents.items():
+        keywords = {keyword.lower() for keyword in intent_data['keywords']}
+        score = sum(1 for keyword in keywords if keyword in message)
+        score = score / len(keywords) if keywords else 0
+        if score > max_score:
+            max_score = score
+            best_intent = intent_name
+    return best_intent, min(max_score, 1.0)
+
+
+def build_corpus(handler, seed: int = 7):
+    """Random messages mixing rule fragments, keywords and filler words"""
+    rng = random.Random(seed)
+    words = ['my', 'the', 'with', 'in', 'for', 'of', 'on', 'crop', 'plant', 'problem', 'issue',
+             'recommendation', 'suggestion', 'price', 'rate', 'market', 'current', 'today', 'rain',
+             'weather', 'forecast', 'should', 'I', 'irrigate', 'spots', 'yellow', 'leaves',
+             'what', 'which', 'best', 'grow', 'recommend', 'to', 'disease', 'selling', 'cost']
+    for intent_data in handler.intents.values():
+        words.extend(keyword.lower() for keyword in intent_data['keywords'])
+    return [' '.join(rng.choice(words) for _ in range(rng.randint(2, 12))) for _ in range(NUM_QUERIES)]
+
+
+def time_path(fn, queries):
+    start = time.perf_counter()
+    results = [fn(query) for query in queries]
+    return results, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    handler = build_handler()
+    ok = True
+
+    for message, expected in RULE_CASES:
+        legacy = legacy_rule_classification(handler, message)
+        actual = handler._rule_matcher.match(message)
+        if legacy != expected or actual != expected:
+            ok = False
+            print(f"MISMATCH {message!r}: expected {expected}, legacy {legacy}, matcher {actual}")
+
+    queries = build_corpus(handler)
+    legacy_rules, legacy_rule_time = time_path(lambda q: legacy_rule_classification(handler, q), queries)
+    rules, rule_time = time_path(handler._rule_matcher.match, queries)
+    legacy_keywords, legacy_keyword_time = time_path(
+        lambda q: legacy_keyword_classification(handler, q.lower()), queries)
+    keywords, keyword_time = time_path(lambda q: handler._keyword_based_classification(q.lower()), queries)
+
+    rule_mismatches = sum(1 for a, b in zip(legacy_rules, rules) if a != b)
+    keyword_mismatches = sum(
+        1 for (li, ls), (ki, ks) in zip(legacy_keywords, keywords)
+        if li != ki or abs(ls - ks) > 1e-12
+    )
+    ok = ok and not rule_mismatches and not keyword_mismatches
+
+    print(f"Fixed rule cases: {len(RULE_CASES)}, random queries: {NUM_QUERIES}")
+    print("=" * 50)
+    print(f"Legacy rule loop:     {legacy_rule_time / NUM_QUERIES * 1e6:8.1f} us/query")
+    print(f"RuleMatcher:          {rule_time / NUM_QUERIES * 1e6:8.1f} us/query")
+    print(f"Legacy keyword scan:  {legacy_keyword_time / NUM_QUERIES * 1e6:8.1f} us/query")
+    print(f"Keyword automaton:    {keyword_time / NUM_QUERIES * 1e6:8.1f} us/query")
+    print(f"Mismatched rule results: {rule_mismatches}, keyword results: {keyword_mismatches}")
+
+    if not ok:
+        sys.exit(1)
@@ -0,0 +1,98 @@
+"""
+Micro-benchmark for TF-IDF intent scoring
+Compares the previous dense per-intent slicing path with the sparse
+reduceat path in IntentHandler on a synthetic 5k-example intent set
+
+Run from the ai-services directory:
+    python benchmarks/bench_intent_scoring.py
+"""
+
+import os
+import random
+import sys
+import time
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatbot.intent_handler import IntentHandler
+
+NUM_INTENTS = 250
+EXAMPLES_PER_INTENT = 20
+NUM_QUERIES = 2000
+
+
+def build_synthetic_intents(seed: int = 42):
+    """Create NUM_INTENTS intents with EXAMPLES_PER_INTENT random utterances each"""
+    rng = random.Random(seed)
+    vocabulary = [f"word{i}" for i in range(3000)]
+    intents = {}
+    for i in range(NUM_INTENTS):
+        topic = rng.sample(vocabulary, 30)
+        intents[f"intent_{i}"] = {
+            'examples': [' '.join(rng.sample(topic, 6)) for _ in range(EXAMPLES_PER_INTENT)],
+            'keywords': topic[:5],
+            'response_type': f"intent_{i}"
+        }
+    return intents, vocabulary
+
+
+def build_handler(intents):
+    """Build an IntentHandler around synthetic intents without loading spaCy"""
+    handler = IntentHandler.__new__(IntentHandler)
+    handler.vectorizer = TfidfVectorizer(stop_words='english', ngram_range=(1, 2))
+    handler.intents = intents
+    handler.rules = {}
+    handler._build_matchers()
+    handler._train_vectorizer()
+    return handler
+
+
+def legacy_tfidf_classification(handler, message):
+    """Previous implementation: dense cosine similarity and per-intent slicing"""
+    message_vector = handler.vectorizer.transform([message])
+    similarities = cosine_similarity(message_vector, handler.intent_vectors)
+
+    intent_similarities = {}
+    example_count = 0
+    for intent_name, intent_data in handler.intents.items():
+        num_examples = len(intent_data['examples'])
+        intent_sims = similarities[0][example_count:example_count + num_examples]
+        intent_similarities[intent_name] = np.max(intent_sims)
+        example_count += num_examples
+
+    best_intent = max(intent_similarities, key=intent_similarities.get)
+    return best_intent, float(intent_similarities[best_intent])
+
+
+def time_path(fn, queries):
+    start = time.perf_counter()
+    results = [fn(query) for query in queries]
+    elapsed = time.perf_counter() - start
+    return results, elapsed
+
+
+if __name__ == '__main__':
+    intents, vocabulary = build_synthetic_intents()
+    handler = build_handler(intents)
+    rng = random.Random(7)
+    queries = [' '.join(rng.sample(vocabulary, 5)) for _ in range(NUM_QUERIES)]
+
+    print(f"Intents: {NUM_INTENTS}, examples: {NUM_INTENTS * EXAMPLES_PER_INTENT}, queries: {NUM_QUERIES}")
+    print("=" * 50)
+
+    legacy_results, legacy_time = time_path(lambda q: legacy_tfidf_classification(handler, q), queries)
+    sparse_results, sparse_time = time_path(handler._tfidf_based_classification, queries)
+
+    mismatches = sum(
+        1 for (li, ls), (si, ss) in zip(legacy_results, sparse_results)
+        if li != si or abs(ls - ss) > 1e-9
+    )
+
+    print(f"Legacy dense path:  {legacy_time / NUM_QUERIES * 1e6:8.1f} us/query")
+    print(f"Sparse reduce path: {sparse_time / NUM_QUERIES * 1e6:8.1f} us/query")
+    print(f"Speedup: {legacy_time / sparse_time:.1f}x")
+    print(f"Mismatched results: {mismatches}")
@@ -0,0 +1,61 @@
+"""
+Soak test for the chatbot conversation memory store
+Pushes synthetic users through a capped InMemoryBackend and reports process
+RSS periodically; once the cap is reached RSS should level off instead of
+growing with the number of users seen
+
+Run from the ai-services directory:
+    python benchmarks/bench_memory_soak.py [num_users] [max_users]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatbot.memory import InMemoryBackend, Turn
+
+NUM_USERS = 1_000_000
+MAX_USERS = 50_000
+TURNS_PER_USER = 4
+REPORT_EVERY = 100_000
+
+
+def rss_mb() -> float:
+    """Resident set size of this process in MB"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError):
+        import resource
+        # ru_maxrss is the peak, in KB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    num_users = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_USERS
+    max_users = int(sys.argv[2]) if len(sys.argv) > 2 else MAX_USERS
+
+    store = InMemoryBackend(max_users=max_users, idle_ttl=None)
+    entities = {'crops': ['wheat'], 'locations': [], 'numbers': ['2']}
+
+    print(f"Users: {num_users:,}  cap: {max_users:,}  turns/user: {TURNS_PER_USER}")
+    print(f"{'users seen':>12} {'resident':>10} {'evictions':>10} {'rss MB':>9} {'elapsed s':>10}")
+
+    start = time.perf_counter()
+    for i in range(num_users):
+        memory, _ = store.get_or_create(f"user-{i}")
+        for t in range(TURNS_PER_USER):
+            memory.history.append(Turn('user', f"how much urea for {t} acres of wheat",
+                                       intent='fertilizer_advice', entities=entities))
+        memory.last_intent = 'fertilizer_advice'
+
+        if (i + 1) % REPORT_EVERY == 0:
+            print(f"{i + 1:>12,} {len(store):>10,} {store.evictions:>10,} "
+                  f"{rss_mb():>9.1f} {time.perf_counter() - start:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Per-worker memory with and without pre-fork model loading
+Forks N workers that each serve one crop recommendation, either after the
+parent loaded the model (the serve.py mode) or loading it themselves (one
+uvicorn worker per process), and reports each worker's RSS and PSS
+
+Run from the ai-services directory (Linux only, reads /proc):
+    python benchmarks/bench_prefork_memory.py [workers]
+"""
+
+import gc
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from serve import memory_usage
+
+NUM_WORKERS = 4
+REQUEST = {'soil_type': 'loamy', 'location': 'punjab', 'season': 'rabi'}
+
+
+def build_services():
+    """Load the models a worker serves"""
+    from crop_recommendation.predict import CropRecommender
+
+    recommender = CropRecommender()
+    recommender.is_ready()
+    services = {'crop': recommender}
+
+    try:
+        from chatbot.intent_handler import IntentHandler
+        services['intent'] = IntentHandler()
+    except Exception as e:
+        print(f"Skipping chatbot intent model: {e}")
+
+    return services
+
+
+def serve_once(services):
+    services['crop'].predict(**REQUEST)
+    if 'intent' in services:
+        services['intent'].classify_intent("which crop should I grow in black soil")
+
+
+def run_mode(num_workers: int, preload: bool):
+    services = build_services() if preload else None
+    if preload:
+        serve_once(services)
+        gc.collect()
+        gc.freeze()
+
+    read_fds, pids = [], []
+    for _ in range(num_workers):
+        ready_r, ready_w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_r)
+            worker_services = services if preload else build_services()
+            serve_once(worker_services)
+            os.write(ready_w, b'1')
+            time.sleep(60)
+            os._exit(0)
+        os.close(ready_w)
+        read_fds.append(ready_r)
+        pids.append(pid)
+
+    for fd in read_fds:
+        os.read(fd, 1)
+        os.close(fd)
+
+    usages = [memory_usage(pid) for pid in pids]
+    for pid in pids:
+        os.kill(pid, 9)
+        os.waitpid(pid, 0)
+    if preload:
+        gc.unfreeze()
+    return usages
+
+
+def main():
+    num_workers = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_WORKERS
+
+    # Run the per-worker-load mode first so the parent has no models loaded yet
+    for label, preload in (('load per worker', False), ('pre-fork (serve.py)', True)):
+        usages = run_mode(num_workers, preload)
+        print(f"\n{label}: {num_workers} workers")
+        print(f"{'worker':>7} {'rss MB':>9} {'pss MB':>9} {'shared MB':>10} {'private MB':>11}")
+        for i, usage in enumerate(usages):
+            print(f"{i:>7} {usage['rss']:>9.1f} {usage['pss']:>9.1f} "
+                  f"{usage['shared']:>10.1f} {usage['private']:>11.1f}")
+        print(f"Total worker PSS: {sum(u['pss'] for u in usages):.1f} MB, "
+              f"private: {sum(u['private'] for u in usages):.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Interpolation error of the precomputed price grid
+Fits a price-style forest on synthetic mandi history in which price falls with
+arrival quantity, builds the grid for several arrival bucket sets and compares
+PriceGrid.lookup with the model at off-bucket quantities, so the error of
+PRICE_GRID_BUCKETS choices can be read off before changing them.
+
+Run from the ai-services directory:
+    python benchmarks/bench_price_grid.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crop_recommendation.price_grid import DEFAULT_ARRIVAL_BUCKETS, build_price_grid
+from crop_recommendation.price_model import N_ESTIMATORS
+
+N_CROPS = 20
+N_DISTRICTS = 40
+N_ROWS = 60000
+NUM_QUERIES = 5000
+
+BUCKET_SETS = {
+    'previous default': (100, 250, 500, 1000, 2000, 5000, 10000),
+    'default': DEFAULT_ARRIVAL_BUCKETS,
+    'dense (1.12x steps)': tuple(np.round(np.geomspace(100, 10000, 41)))
+}
+
+
+def synthetic_mandi(rng):
+    """Mandi rows over [crop, district, month, arrival_quantity] with a falling demand curve"""
+    crop = rng.integers(0, N_CROPS, size=N_ROWS)
+    district = rng.integers(0, N_DISTRICTS, size=N_ROWS)
+    month = rng.integers(1, 13, size=N_ROWS)
+    arrival = np.exp(rng.uniform(np.log(50), np.log(20000), size=N_ROWS))
+    base = rng.uniform(1500, 6000, size=N_CROPS)[crop]
+    price = (base
+             * (1 + 0.1 * rng.normal(size=N_DISTRICTS)[district])
+             * (1 + 0.08 * np.sin(2 * np.pi * month / 12))
+             * (arrival / 1000.0) ** -0.15
+             + rng.normal(scale=80, size=N_ROWS))
+    X = np.column_stack([crop, district, month, arrival]).astype(np.float64)
+    return X, price
+
+
+def error_report(model, grid, queries):
+    expected = model.predict(queries)
+    actual = np.array([grid.lookup(int(c), int(d), int(m), q) for c, d, m, q in queries])
+    relative = np.abs(actual - expected) / expected
+    return {
+        'mean': float(relative.mean()),
+        'p95': float(np.percentile(relative, 95)),
+        'max': float(relative.max())
+    }
+
+
+if __name__ == '__main__':
+    rng = np.random.default_rng(42)
+    X, y = synthetic_mandi(rng)
+    # Same forest settings as fit_price_model
+    model = RandomForestRegressor(n_estimators=N_ESTIMATORS, max_depth=15, random_state=42, n_jobs=-1)
+    model.fit(X, y)
+
+    queries = np.column_stack([
+        rng.integers(0, N_CROPS, size=NUM_QUERIES),
+        rng.integers(0, N_DISTRICTS, size=NUM_QUERIES),
+        rng.integers(1, 13, size=NUM_QUERIES),
+        np.exp(rng.uniform(np.log(100), np.log(10000), size=NUM_QUERIES))
+    ])
+    spot_checks = np.column_stack([
+        np.zeros(4), np.zeros(4), np.full(4, 6), [700, 3000, 7000, 8500]
+    ])
+
+    print(f"{N_ROWS} synthetic rows, {NUM_QUERIES} quantities drawn log-uniformly from 100 to 10000")
+    print("=" * 50)
+    print(f"{'buckets':<22} {'n':>3} {'grid MB':>8} {'build s':>8} {'mean':>7} {'p95':>7} {'max':>7}")
+    for name, buckets in BUCKET_SETS.items():
+        started = time.perf_counter()
+        grid = build_price_grid(model, N_CROPS, N_DISTRICTS, buckets)
+        build = time.perf_counter() - started
+        errors = error_report(model, grid, queries)
+        print(f"{name:<22} {len(buckets):>3} {grid.prices.nbytes / 2 ** 20:>8.2f} {build:>8.2f} "
+              f"{errors['mean']:>7.2%} {errors['p95']:>7.2%} {errors['max']:>7.2%}")
+        spots = model.predict(spot_checks)
+        print('    ' + ', '.join(
+            f"q={int(q)}: model {spot:.0f} grid {grid.lookup(0, 0, 6, q):.0f}"
+            for q, spot in zip(spot_checks[:, 3], spots)
+        ))
@@ -0,0 +1,109 @@
+"""
+Parity check and latency benchmark for the compiled tree engine
+Fits a crop-style classifier and a price-style regressor, checks the compiled
+forests reproduce sklearn's outputs on held-out rows, then times scoring at
+several batch sizes for both backends. Exits non-zero on any mismatch.
+
+Run from the ai-services directory:
+    python benchmarks/bench_tree_engine.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crop_recommendation.tree_engine import compile_forest
+
+BATCH_SIZE = 1000
+TIMED_BATCH_SIZES = (1, 32, 256, 1000)
+
+
+def build_classifier(rng):
+    """200 trees on 7 scaled features and 22 classes, like the crop model"""
+    X = rng.normal(size=(2200, 7))
+    y = rng.integers(0, 22, size=2200)
+    model = RandomForestClassifier(n_estimators=200, random_state=42, n_jobs=-1)
+    model.fit(X, y)
+    return model, rng.normal(size=(BATCH_SIZE, 7))
+
+
+def build_regressor(rng):
+    """100 trees on crop code, district code, month and arrival quantity, like the price model"""
+    X = np.column_stack([
+        rng.integers(0, 20, size=5000),
+        rng.integers(0, 50, size=5000),
+        rng.integers(1, 13, size=5000),
+        rng.uniform(100, 5000, size=5000)
+    ])
+    y = 1500 + 80 * X[:, 0] + 10 * X[:, 2] - 0.05 * X[:, 3] + rng.normal(scale=50, size=5000)
+    model = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=-1)
+    model.fit(X, y)
+    X_test = np.column_stack([
+        rng.integers(0, 20, size=BATCH_SIZE),
+        rng.integers(0, 50, size=BATCH_SIZE),
+        rng.integers(1, 13, size=BATCH_SIZE),
+        rng.uniform(100, 5000, size=BATCH_SIZE)
+    ])
+    return model, X_test
+
+
+def check_parity(name, model, compiled, X) -> bool:
+    if hasattr(model, 'classes_'):
+        expected, actual = model.predict_proba(X), compiled.predict_proba(X)
+        labels_match = np.array_equal(model.predict(X), compiled.predict(X))
+    else:
+        expected, actual = model.predict(X), compiled.predict(X)
+        labels_match = True
+    max_diff = float(np.abs(expected - actual).max())
+    ok = labels_match and np.allclose(expected, actual, rtol=1e-9, atol=1e-12)
+    print(f"{name}: {'OK' if ok else 'MISMATCH'} (max abs diff {max_diff:.3g}, "
+          f"predictions {'identical' if labels_match else 'differ'})")
+    return ok
+
+
+def time_ms(fn, calls: int) -> float:
+    fn()
+    started = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - started) * 1000.0 / calls
+
+
+def report_latency(name, model, compiled, X):
+    is_classifier = hasattr(model, 'classes_')
+    predict = model.predict_proba if is_classifier else model.predict
+    fast_predict = compiled.predict_proba if is_classifier else compiled.predict
+    for size in TIMED_BATCH_SIZES:
+        rows = X[:size]
+        calls = 100 if size <= 32 else 10
+        sklearn_ms = time_ms(lambda: predict(rows), calls)
+        compiled_ms = time_ms(lambda: fast_predict(rows), calls)
+        print(f"{name:>6} {size:>6} {sklearn_ms:>11.3f} {compiled_ms:>12.3f} {sklearn_ms / compiled_ms:>8.1f}x")
+
+
+def main():
+    rng = np.random.default_rng(0)
+    forests = [('crop', *build_classifier(rng)), ('price', *build_regressor(rng))]
+
+    ok = True
+    compiled_forests = []
+    for name, model, X in forests:
+        compiled = compile_forest(model)
+        compiled_forests.append(compiled)
+        ok = check_parity(name, model, compiled, X) and ok
+
+    print(f"\n{'model':>6} {'rows':>6} {'sklearn ms':>11} {'compiled ms':>12} {'speedup':>9}")
+    for (name, model, X), compiled in zip(forests, compiled_forests):
+        report_latency(name, model, compiled, X)
+
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,30 @@
 from .intent_handler import IntentHandler
 from .response_generator import ResponseGenerator
 from .prompt_engine import PromptEngine
-from typing import Dict, List, Any, Optional
+from .memory import MemoryBackend, Turn, UserMemory, create_memory_backend
+from .stats import ChatStats
+from typing import AsyncIterator, Dict, List, Any, Optional, Tuple
 from datetime import datetime
+import asyncio
 import json
 
 class ChatbotHandler:
-    def __init__(self):
+    def __init__(self, memory_backend: Optional[MemoryBackend] = None):
+        """
+        Args:
+            memory_backend: Conversation memory store (defaults to a bounded
+                in-memory store configured through CHAT_MEMORY_* variables)
+        """
         self.intent_handler = IntentHandler()
         self.response_generator = ResponseGenerator()
         self.prompt_engine = PromptEngine()
-        self.conversation_memory = {}
+        # Near-duplicate cache lookups reuse the intent classifier's TF-IDF space
+        self.prompt_engine.response_cache.vectorizer = self.intent_handler.vectorize_message
         self.max_memory_length = 20
+        if memory_backend is None:
+            memory_backend = create_memory_backend(self.max_memory_length)
+        self.conversation_memory = memory_backend
+        self.stats = ChatStats(active_users=lambda: len(self.conversation_memory))
 
     def is_ready(self) -> bool:
         """Check if all components are ready"""
@@ -34,24 +47,7 @@ class ChatbotHandler:
         """
 
         try:
-            # Initialize user context if needed
-            if user_id and user_id not in self.conversation_memory:
-                self.conversation_memory[user_id] = {
-                    'history': [],
-                    'last_intent': None,
-                    'pending_questions': [],
-                    'user_profile': {}
-                }
-
-            # Get conversation context
-            user_context = self.conversation_memory.get(user_id, {'history': []})
-
-            # Classify intent
-            intent, confidence, entities = self.intent_handler.classify_intent(message)
-
-            # Update conversation memory
-            if user_id:
-                self._update_memory(user_id, message, intent, entities)
+            user_context, intent, confidence, entities = self.prepare_turn(message, user_id)
 
             # Generate response using basic training data (always use rule-based for now)
             response = self.response_generator.generate_response(
@@ -68,9 +64,7 @@ class ChatbotHandler:
             if user_id:
                 response['needs_follow_up'] = response.get('needs_more_info', False)
                 if response.get('follow_up_question'):
-                    self.conversation_memory[user_id]['pending_questions'].append(
-                        response['follow_up_question']
-                    )
+                    user_context.pending_questions.append(response['follow_up_question'])
 
             return response
 
@@ -78,28 +72,104 @@ class ChatbotHandler:
             print(f"Error processing message: {e}")
             return self._generate_error_response(str(e))
 
-    def _update_memory(self, user_id: str, message: str, intent: str, entities: Dict[str, Any]):
-        """Update conversation memory"""
-        memory = self.conversation_memory[user_id]
+    async def stream_message(self,
+                             message: str,
+                             context: Optional[Dict[str, Any]] = None,
+                             user_id: Optional[str] = None,
+                             prepared: Optional[Tuple] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a user message and stream the LLM answer as it is generated
+
+        Args:
+            prepared: Result of prepare_turn(message, user_id) when the caller
+                already ran it (e.g. on an inference lane); otherwise it runs
+                in a worker thread, since intent classification blocks
+
+        Yields:
+            A 'meta' event with intent and entities, 'token' events with text
+            deltas, then a 'done' event with the full response
+        """
+        try:
+            if prepared is None:
+                prepared = await asyncio.to_thread(self.prepare_turn, message, user_id)
+            user_context, intent, confidence, entities = prepared
+        except Exception as e:
+            print(f"Error processing message: {e}")
+            yield {'event': 'error', 'data': self._generate_error_response(str(e))}
+            return
+
+        yield {
+            'event': 'meta',
+            'data': {
+                'intent': intent,
+                'confidence': confidence,
+                'entities': entities,
+                'conversation_id': user_id or 'anonymous'
+            }
+        }
+
+        parts = []
+        async for token in self.prompt_engine.stream_response(message, intent, entities, user_context):
+            parts.append(token)
+            yield {'event': 'token', 'data': {'text': token}}
+
+        full_response = ''.join(parts)
+        if user_id:
+            self.add_to_memory(user_id, 'assistant', full_response)
+
+        yield {
+            'event': 'done',
+            'data': {
+                'response': full_response,
+                'intent': intent,
+                'confidence': confidence,
+                'suggested_actions': self._get_suggested_actions(intent, entities)
+            }
+        }
+
+    def prepare_turn(self, message: str, user_id: Optional[str]) -> Tuple[UserMemory, str, float, Dict[str, Any]]:
+        """
+        Classify a message and record it in the user's conversation memory
+
+        Runs spaCy and TF-IDF classification, so async callers should run it off
+        the event loop.
+
+        Returns:
+            (user memory, intent, confidence, entities)
+        """
+        # Get conversation context, initializing it if needed
+        if user_id:
+            user_context = self._get_or_create_memory(user_id)
+        else:
+            user_context = UserMemory(self.max_memory_length)
+
+        # Classify intent
+        intent, confidence, entities = self.intent_handler.classify_intent(message)
 
+        # Update conversation memory
+        if user_id:
+            self._update_memory(user_context, message, intent, entities)
+
+        return user_context, intent, confidence, entities
+
+    def _get_or_create_memory(self, user_id: str) -> UserMemory:
+        """Get a user's conversation memory, counting newly started conversations"""
+        memory, created = self.conversation_memory.get_or_create(user_id)
+        if created:
+            self.stats.record_user()
+        return memory
+
+    def _update_memory(self, memory: UserMemory, message: str, intent: str, entities: Dict[str, Any]):
+        """Update conversation memory"""
         # Add message to history
-        memory['history'].append({
-            'role': 'user',
-            'content': message,
-            'timestamp': datetime.utcnow().isoformat(),
-            'intent': intent,
-            'entities': entities
-        })
+        memory.history.append(Turn('user', message, intent=intent, entities=entities))
+        self.stats.record_message('user', intent)
 
         # Update last intent
-        memory['last_intent'] = intent
+        memory.last_intent = intent
 
         # Update user profile with extracted information
-        self._update_user_profile(memory['user_profile'], entities)
-
-        # Trim history if too long
-        if len(memory['history']) > self.max_memory_length:
-            memory['history'] = memory['history'][-self.max_memory_length:]
+        self._update_user_profile(memory.user_profile, entities)
 
     def _update_user_profile(self, profile: Dict[str, Any], entities: Dict[str, Any]):
         """Update user profile with extracted entities"""
@@ -181,111 +251,109 @@ class ChatbotHandler:
 
     def get_conversation_history(self, user_id: str) -> List[Dict[str, Any]]:
         """Get conversation history for a user"""
-        if user_id in self.conversation_memory:
-            return self.conversation_memory[user_id]['history']
+        memory = self.conversation_memory.get(user_id)
+        if memory is not None:
+            return [turn.to_dict() for turn in memory.history]
         return []
 
     def clear_conversation_memory(self, user_id: str):
         """Clear conversation memory for a user"""
         if user_id in self.conversation_memory:
-            self.conversation_memory[user_id] = {
-                'history': [],
-                'last_intent': None,
-                'pending_questions': [],
-                'user_profile': {}
-            }
+            self.conversation_memory.put(user_id, UserMemory(self.max_memory_length))
 
     def get_user_profile(self, user_id: str) -> Dict[str, Any]:
         """Get user profile information"""
-        if user_id in self.conversation_memory:
-            return self.conversation_memory[user_id]['user_profile']
+        memory = self.conversation_memory.get(user_id)
+        if memory is not None:
+            return memory.user_profile
         return {}
 
     def get_pending_questions(self, user_id: str) -> List[str]:
         """Get pending questions for a user"""
-        if user_id in self.conversation_memory:
-            return self.conversation_memory[user_id]['pending_questions']
+        memory = self.conversation_memory.get(user_id)
+        if memory is not None:
+            return memory.pending_questions
         return []
 
     def add_to_memory(self, user_id: str, role: str, content: str, metadata: Optional[Dict[str, Any]] = None):
         """Manually add message to conversation memory"""
-        if user_id not in self.conversation_memory:
-            self.conversation_memory[user_id] = {
-                'history': [],
-                'last_intent': None,
-                'pending_questions': [],
-                'user_profile': {}
-            }
-
-        message = {
-            'role': role,
-            'content': content,
-            'timestamp': datetime.utcnow().isoformat()
-        }
-
-        if metadata:
-            message.update(metadata)
-
-        self.conversation_memory[user_id]['history'].append(message)
-
-        # Trim history
-        if len(self.conversation_memory[user_id]['history']) > self.max_memory_length:
-            self.conversation_memory[user_id]['history'] = self.conversation_memory[user_id]['history'][-self.max_memory_length:]
+        memory = self._get_or_create_memory(user_id)
+
+        metadata = dict(metadata or {})
+        turn = Turn(
+            role,
+            content,
+            intent=metadata.pop('intent', None),
+            entities=metadata.pop('entities', None),
+            metadata=metadata
+        )
+        memory.history.append(turn)
+        self.stats.record_message(role, turn.intent, turn.timestamp)
 
     def get_conversation_summary(self, user_id: str) -> Dict[str, Any]:
         """Get summary of conversation"""
-        if user_id not in self.conversation_memory:
+        memory = self.conversation_memory.get(user_id)
+        if memory is None:
             return {'total_messages': 0, 'intents_discussed': [], 'main_topics': []}
 
-        memory = self.conversation_memory[user_id]
-        history = memory['history']
+        history = memory.history
 
         intents = []
         topics = set()
 
-        for msg in history:
-            if msg.get('intent'):
-                intents.append(msg['intent'])
-            if msg.get('entities', {}).get('crops'):
-                topics.update(msg['entities']['crops'])
+        for turn in history:
+            if turn.intent:
+                intents.append(turn.intent)
+            if turn.entities and turn.entities.get('crops'):
+                topics.update(turn.entities['crops'])
 
         return {
             'total_messages': len(history),
             'intents_discussed': list(set(intents)),
             'main_topics': list(topics),
-            'last_interaction': history[-1]['timestamp'] if history else None,
-            'user_profile': memory['user_profile']
+            'last_interaction': history[-1].get('timestamp') if history else None,
+            'user_profile': memory.user_profile
         }
 
     def export_conversation(self, user_id: str) -> str:
         """Export conversation as JSON string"""
-        if user_id in self.conversation_memory:
-            return json.dumps(self.conversation_memory[user_id], indent=2, default=str)
+        memory = self.conversation_memory.get(user_id)
+        if memory is not None:
+            return json.dumps(memory.to_dict(), indent=2, default=str)
         return "{}"
 
     def import_conversation(self, user_id: str, conversation_data: str):
         """Import conversation from JSON string"""
         try:
             data = json.loads(conversation_data)
-            self.conversation_memory[user_id] = data
+            self.conversation_memory.put(user_id, UserMemory.from_dict(data, self.max_memory_length))
         except json.JSONDecodeError:
             print(f"Invalid conversation data for user {user_id}")
 
     def get_chatbot_stats(self) -> Dict[str, Any]:
-        """Get chatbot usage statistics"""
-        total_users = len(self.conversation_memory)
-        total_messages = sum(len(mem['history']) for mem in self.conversation_memory.values())
-
-        intent_counts = {}
-        for mem in self.conversation_memory.values():
-            for msg in mem['history']:
-                intent = msg.get('intent', 'unknown')
-                intent_counts[intent] = intent_counts.get(intent, 0) + 1
+        """
+        Get chatbot usage statistics
 
-        return {
-            'total_users': total_users,
-            'total_messages': total_messages,
-            'average_messages_per_user': total_messages / total_users if total_users > 0 else 0,
-            'intent_distribution': intent_counts,
-            'memory_usage': len(self.conversation_memory)
-        }
\ No newline at end of file
+        Counts are maintained incrementally as messages are recorded, so this
+        does not scan stored conversations.
+        """
+        stats = self.stats.snapshot()
+        stats.update({
+            'memory_usage': stats['total_users'],
+            'memory_evictions': getattr(self.conversation_memory, 'evictions', 0),
+            'memory_expirations': getattr(self.conversation_memory, 'expirations', 0)
+        })
+        return stats
+
+    def get_prometheus_metrics(self) -> str:
+        """Get chatbot usage statistics in the Prometheus text exposition format"""
+        return self.stats.to_prometheus({
+            'memory_evictions': (
+                getattr(self.conversation_memory, 'evictions', 0),
+                'Conversations evicted from memory to stay within CHAT_MEMORY_MAX_USERS'
+            ),
+            'memory_expirations': (
+                getattr(self.conversation_memory, 'expirations', 0),
+                'Conversations dropped after CHAT_MEMORY_IDLE_TTL seconds idle'
+            )
+        })
\ No newline at end of file
@@ -4,19 +4,33 @@ from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 import spacy
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
+from .matcher import KeywordAutomaton, RuleMatcher
+
+# Keyword sets used during entity extraction
+CROP_KEYWORDS = frozenset(['rice', 'wheat', 'maize', 'cotton', 'sugarcane', 'potato', 'tomato', 'onion', 'soybean'])
+PROBLEM_KEYWORDS = frozenset(['disease', 'pest', 'problem', 'issue', 'damage', 'rot', 'blight', 'wilt'])
+
+# spaCy components entity extraction never reads (only NER labels and lexical attributes are used)
+UNUSED_PIPES = ['tagger', 'parser', 'senter', 'attribute_ruler', 'lemmatizer']
 
 class IntentHandler:
-    def __init__(self):
+    def __init__(self, fast_entities: bool = True):
+        """
+        Args:
+            fast_entities: Load spaCy with only the components entity extraction
+                needs (tokenizer + NER) instead of the full pipeline
+        """
+        self.fast_entities = fast_entities
+
         # Load spaCy model for NLP processing
         try:
-            self.nlp = spacy.load("en_core_web_sm")
+            self.nlp = self._load_nlp()
         except OSError:
             # Fallback if model not available
             import subprocess
             subprocess.run(["python", "-m", "spacy", "download", "en_core_web_sm"])
-            self.nlp = spacy.load("en_core_web_sm")
+            self.nlp = self._load_nlp()
 
         # Initialize TF-IDF vectorizer
         self.vectorizer = TfidfVectorizer(stop_words='english', ngram_range=(1, 2))
@@ -24,10 +38,29 @@ class IntentHandler:
 
         # Define intents and their training examples
         self.intents = self._load_intents()
+        self.rules = self._load_rules()
+
+        # Compile keyword and rule matchers once
+        self._build_matchers()
 
         # Train the vectorizer
         self._train_vectorizer()
 
+    def _load_nlp(self):
+        """Load the spaCy pipeline, trimmed to NER when fast entity extraction is on"""
+        if not self.fast_entities:
+            return spacy.load("en_core_web_sm")
+
+        nlp = spacy.load("en_core_web_sm", exclude=UNUSED_PIPES)
+
+        # Drop the shared tok2vec too unless a remaining component listens to it
+        if 'tok2vec' in nlp.pipe_names:
+            listeners = getattr(nlp.get_pipe('tok2vec'), 'listening_components', [])
+            if not any(name in nlp.pipe_names for name in listeners):
+                nlp.disable_pipe('tok2vec')
+
+        return nlp
+
     def _load_intents(self) -> Dict[str, Dict[str, Any]]:
         """Load intent definitions and examples"""
         return {
@@ -152,17 +185,71 @@ class IntentHandler:
             }
         }
 
+    def _load_rules(self) -> Dict[str, List[str]]:
+        """Load regex rules for rule-based classification, in priority order"""
+        return {
+            'crop_recommendation': [
+                r'\b(what|which|best)\s+(crop|plant)s?\s+(should|to|for|can)\s+(I|we)\s+(grow|plant|cultivate)',
+                r'\b(recommend|suggest)\s+(crop|plant)s?\s+(for|to)',
+                r'\b(crop|plant)\s+(recommendation|suggestion)s?'
+            ],
+            'disease_identification': [
+                r'\b(disease|problem|issue)\s+(with|in)\s+(my|plant|crop)',
+                r'\b(what|identify)\s+(is|are)\s+(wrong|this)\s+(with|disease)',
+                r'\b(spots?|yellow|brown|black)\s+(on|leaves?|stems?|fruits?)'
+            ],
+            'weather_advice': [
+                r'\b(weather|rain|temperature|climate)\s+(effect|impact|advice)',
+                r'\b(should|can)\s+I\s+(irrigate|water|plant)',
+                r'\b(weather|rain)\s+(today|now|forecast)'
+            ],
+            'market_prices': [
+                r'\b(price|rate|cost)\s+(of|for)\s+(crop|produce|commodity)',
+                r'\b(market|selling)\s+(price|rate)s?',
+                r'\b(current|today)\s+(price|rate)s?'
+            ]
+        }
+
+    def _build_matchers(self):
+        """Compile keyword automaton and combined rule regex from intents and rules"""
+        self._intent_names = list(self.intents.keys())
+        self._keyword_intents = {}
+        self._keyword_counts = []
+
+        for idx, intent_data in enumerate(self.intents.values()):
+            keywords = {keyword.lower() for keyword in intent_data['keywords']}
+            self._keyword_counts.append(len(keywords))
+            for keyword in keywords:
+                self._keyword_intents.setdefault(keyword, []).append(idx)
+
+        self._keyword_automaton = KeywordAutomaton(self._keyword_intents.keys())
+        self._rule_matcher = RuleMatcher(self.rules)
+
     def _train_vectorizer(self):
         """Train TF-IDF vectorizer with intent examples"""
         all_examples = []
-        for intent_data in self.intents.values():
+        example_intents = []
+        for idx, intent_data in enumerate(self.intents.values()):
             all_examples.extend(intent_data['examples'])
+            example_intents.extend([idx] * len(intent_data['examples']))
+
+        # Examples are laid out grouped by intent, so intent ids are sorted
+        self._example_intent = np.array(example_intents, dtype=np.intp)
 
         try:
             self.intent_vectors = self.vectorizer.fit_transform(all_examples)
+            # TF-IDF rows are L2-normalized, so a dot product is the cosine similarity
+            self._intent_vectors_t = self.intent_vectors.T.tocsr()
         except Exception as e:
             print(f"Error training vectorizer: {e}")
             self.intent_vectors = None
+            self._intent_vectors_t = None
+
+    def vectorize_message(self, message: str):
+        """Get the L2-normalized TF-IDF row vector for a message, or None"""
+        if self.intent_vectors is None:
+            return None
+        return self.vectorizer.transform([self._preprocess_message(message)])
 
     def classify_intent(self, message: str) -> Tuple[str, float, Dict[str, Any]]:
         """
@@ -233,19 +320,18 @@ class IntentHandler:
 
     def _keyword_based_classification(self, message: str) -> Tuple[str, float]:
         """Classify based on keyword matching"""
+        hits = [0] * len(self._intent_names)
+        for keyword in self._keyword_automaton.find_all(message):
+            for idx in self._keyword_intents[keyword]:
+                hits[idx] += 1
+
         max_score = 0
         best_intent = 'general_help'
 
-        for intent_name, intent_data in self.intents.items():
-            score = 0
-            keywords = intent_data['keywords']
-
-            for keyword in keywords:
-                if keyword.lower() in message:
-                    score += 1
-
+        for idx, intent_name in enumerate(self._intent_names):
             # Normalize score
-            score = score / len(keywords) if keywords else 0
+            num_keywords = self._keyword_counts[idx]
+            score = hits[idx] / num_keywords if num_keywords else 0
 
             if score > max_score:
                 max_score = score
@@ -260,22 +346,22 @@ class IntentHandler:
 
         try:
             message_vector = self.vectorizer.transform([message])
-            similarities = cosine_similarity(message_vector, self.intent_vectors)
 
-            # Group similarities by intent
-            intent_similarities = {}
-            example_count = 0
+            # Sparse 1 x n_examples product; only examples sharing a term are stored
+            similarities = message_vector @ self._intent_vectors_t
+            similarities.sort_indices()
 
-            for intent_name, intent_data in self.intents.items():
-                num_examples = len(intent_data['examples'])
-                intent_sims = similarities[0][example_count:example_count + num_examples]
-                intent_similarities[intent_name] = np.max(intent_sims)
-                example_count += num_examples
+            # Per-intent max over the nonzero similarities in one reduction
+            intent_similarities = np.zeros(len(self.intents))
+            if similarities.nnz:
+                intent_ids = self._example_intent[similarities.indices]
+                starts = np.flatnonzero(np.r_[True, intent_ids[1:] != intent_ids[:-1]])
+                intent_similarities[intent_ids[starts]] = np.maximum.reduceat(similarities.data, starts)
 
-            best_intent = max(intent_similarities, key=intent_similarities.get)
-            best_score = intent_similarities[best_intent]
+            best_idx = int(np.argmax(intent_similarities))
+            best_intent = self._intent_names[best_idx]
 
-            return best_intent, float(best_score)
+            return best_intent, float(intent_similarities[best_idx])
 
         except Exception as e:
             print(f"Error in TF-IDF classification: {e}")
@@ -283,78 +369,64 @@ class IntentHandler:
 
     def _rule_based_classification(self, message: str) -> Tuple[str, float]:
         """Rule-based intent classification"""
-        rules = {
-            'crop_recommendation': [
-                r'\b(what|which|best)\s+(crop|plant)s?\s+(should|to|for|can)\s+(I|we)\s+(grow|plant|cultivate)',
-                r'\b(recommend|suggest)\s+(crop|plant)s?\s+(for|to)',
-                r'\b(crop|plant)\s+(recommendation|suggestion)s?'
-            ],
-            'disease_identification': [
-                r'\b(disease|problem|issue)\s+(with|in)\s+(my|plant|crop)',
-                r'\b(what|identify)\s+(is|are)\s+(wrong|this)\s+(with|disease)',
-                r'\b(spots?|yellow|brown|black)\s+(on|leaves?|stems?|fruits?)'
-            ],
-            'weather_advice': [
-                r'\b(weather|rain|temperature|climate)\s+(effect|impact|advice)',
-                r'\b(should|can)\s+I\s+(irrigate|water|plant)',
-                r'\b(weather|rain)\s+(today|now|forecast)'
-            ],
-            'market_prices': [
-                r'\b(price|rate|cost)\s+(of|for)\s+(crop|produce|commodity)',
-                r'\b(market|selling)\s+(price|rate)s?',
-                r'\b(current|today)\s+(price|rate)s?'
-            ]
-        }
-
-        for intent, patterns in rules.items():
-            for pattern in patterns:
-                if re.search(pattern, message, re.IGNORECASE):
-                    return intent, 0.8
+        intent = self._rule_matcher.match(message)
+        if intent is not None:
+            return intent, 0.8
 
         return 'general_help', 0.3
 
     def _extract_entities(self, message: str) -> Dict[str, Any]:
         """Extract entities from message using spaCy"""
         try:
-            doc = self.nlp(message)
-
-            entities = {
-                'crops': [],
-                'locations': [],
-                'numbers': [],
-                'dates': [],
-                'problems': []
-            }
-
-            # Extract named entities
-            for ent in doc.ents:
-                if ent.label_ in ['GPE', 'LOC']:
-                    entities['locations'].append(ent.text)
-                elif ent.label_ == 'DATE':
-                    entities['dates'].append(ent.text)
-
-            # Extract crop names (simple keyword matching)
-            crop_keywords = ['rice', 'wheat', 'maize', 'cotton', 'sugarcane', 'potato', 'tomato', 'onion', 'soybean']
-            for token in doc:
-                if token.text.lower() in crop_keywords:
-                    entities['crops'].append(token.text)
+            return self._entities_from_doc(self.nlp(message))
 
-            # Extract numbers
-            for token in doc:
-                if token.like_num:
-                    entities['numbers'].append(token.text)
-
-            # Extract problem indicators
-            problem_keywords = ['disease', 'pest', 'problem', 'issue', 'damage', 'rot', 'blight', 'wilt']
-            for token in doc:
-                if token.text.lower() in problem_keywords:
-                    entities['problems'].append(token.text)
+        except Exception as e:
+            print(f"Error extracting entities: {e}")
+            return {}
 
-            return entities
+    def extract_entities_batch(self, messages: List[str], batch_size: int = 64) -> List[Dict[str, Any]]:
+        """Extract entities from many messages with spaCy's batched nlp.pipe"""
+        try:
+            return [
+                self._entities_from_doc(doc)
+                for doc in self.nlp.pipe(messages, batch_size=batch_size)
+            ]
 
         except Exception as e:
             print(f"Error extracting entities: {e}")
-            return {}
+            return [{} for _ in messages]
+
+    def _entities_from_doc(self, doc) -> Dict[str, Any]:
+        """Collect crops, locations, numbers, dates and problems from a parsed doc"""
+        entities = {
+            'crops': [],
+            'locations': [],
+            'numbers': [],
+            'dates': [],
+            'problems': []
+        }
+
+        # Extract named entities
+        for ent in doc.ents:
+            if ent.label_ in ['GPE', 'LOC']:
+                entities['locations'].append(ent.text)
+            elif ent.label_ == 'DATE':
+                entities['dates'].append(ent.text)
+
+        # Crops, numbers and problem indicators in a single token pass
+        crops = entities['crops']
+        numbers = entities['numbers']
+        problems = entities['problems']
+        for token in doc:
+            lower = token.lower_
+            if lower in CROP_KEYWORDS:
+                crops.append(token.text)
+            elif lower in PROBLEM_KEYWORDS:
+                problems.append(token.text)
+            if token.like_num:
+                numbers.append(token.text)
+
+        return entities
 
     def get_intent_examples(self, intent: str) -> List[str]:
         """Get example messages for an intent"""
@@ -0,0 +1,111 @@
+import re
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton finding every keyword in a text in a single pass"""
+
+    def __init__(self, keywords: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Set[str]] = [set()]
+
+        for keyword in keywords:
+            self._add(keyword)
+        self._build_failure_links()
+
+    def _add(self, keyword: str):
+        """Insert a keyword into the trie"""
+        if not keyword:
+            return
+
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(set())
+                self._goto[state][char] = next_state
+            state = next_state
+        self._output[state].add(keyword)
+
+    def _build_failure_links(self):
+        """Breadth-first construction of failure links and merged outputs"""
+        queue = deque(self._goto[0].values())
+
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] |= self._output[self._fail[next_state]]
+
+    def find_all(self, text: str) -> Set[str]:
+        """Get the set of keywords occurring anywhere in text"""
+        goto, fail, output = self._goto, self._fail, self._output
+        found = set()
+        state = 0
+
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found |= output[state]
+
+        return found
+
+
+class RuleMatcher:
+    """
+    All intent regex rules compiled into one alternation with a named group per intent
+
+    Each intent's alternative sits inside a lookahead, so every match is
+    zero-width and the scan tries every position of the message. A
+    lower-priority intent matching earlier in the text therefore cannot consume
+    the characters of a higher-priority match that starts inside it.
+    """
+
+    def __init__(self, rules: Dict[str, List[str]], flags: int = re.IGNORECASE):
+        self.intents = list(rules.keys())
+        self._group_to_intent = {}
+        alternatives = []
+
+        for rank, (intent, patterns) in enumerate(rules.items()):
+            if not patterns:
+                continue
+            group = f'intent_{rank}'
+            self._group_to_intent[group] = rank
+            alternatives.append(f"(?=(?P<{group}>{'|'.join(f'(?:{p})' for p in patterns)}))")
+
+        self._pattern = re.compile('|'.join(alternatives), flags) if alternatives else None
+
+    def match(self, message: str) -> Optional[str]:
+        """
+        Get the matching intent, or None
+
+        When several intents match, the one listed first in the rules wins,
+        matching the order the rules were previously evaluated in. At a given
+        position the alternation already tries intents in rule order, and the
+        lookaheads make every position visible, so the lowest rank seen is the
+        first listed intent matching anywhere in the message.
+        """
+        if self._pattern is None:
+            return None
+
+        best_rank = None
+        for match in self._pattern.finditer(message):
+            rank = self._group_to_intent[match.lastgroup]
+            if best_rank is None or rank < best_rank:
+                best_rank = rank
+                if rank == 0:
+                    break
+
+        return self.intents[best_rank] if best_rank is not None else None
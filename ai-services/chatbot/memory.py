@@ -0,0 +1,427 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+# Turns kept per user; older turns fall off the front of the ring buffer
+DEFAULT_MAX_HISTORY = 20
+
+
+def _to_iso(timestamp: float) -> str:
+    """Format an epoch timestamp the way conversation history always has"""
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).replace(tzinfo=None).isoformat()
+
+
+def _from_iso(value: Any) -> float:
+    """Parse an ISO timestamp (or pass through an epoch float)"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp()
+    except (TypeError, ValueError):
+        return time.time()
+
+
+class Turn:
+    """
+    One conversation message
+
+    Stored with __slots__ and an epoch timestamp instead of a nested dict with
+    an ISO string. Supports read-only dict-style access (turn['content'],
+    turn.get('role')) so consumers of history entries keep working.
+    """
+
+    __slots__ = ('role', 'content', 'timestamp', 'intent', 'entities', 'metadata')
+
+    def __init__(self,
+                 role: str,
+                 content: str,
+                 timestamp: Optional[float] = None,
+                 intent: Optional[str] = None,
+                 entities: Optional[Dict[str, Any]] = None,
+                 metadata: Optional[Dict[str, Any]] = None):
+        self.role = role
+        self.content = content
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.intent = intent
+        self.entities = entities or None
+        self.metadata = metadata or None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in Turn.__slots__ and key != 'metadata':
+            value = _to_iso(self.timestamp) if key == 'timestamp' else getattr(self, key)
+            return default if value is None else value
+        if self.metadata:
+            return self.metadata.get(key, default)
+        return default
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Expand into the dict format used by the API and exports"""
+        message = {
+            'role': self.role,
+            'content': self.content,
+            'timestamp': _to_iso(self.timestamp)
+        }
+        if self.intent is not None:
+            message['intent'] = self.intent
+        if self.entities is not None:
+            message['entities'] = self.entities
+        if self.metadata:
+            message.update(self.metadata)
+        return message
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Turn':
+        extra = {
+            key: value for key, value in data.items()
+            if key not in ('role', 'content', 'timestamp', 'intent', 'entities')
+        }
+        return cls(
+            role=data.get('role', 'user'),
+            content=data.get('content', ''),
+            timestamp=_from_iso(data.get('timestamp')),
+            intent=data.get('intent'),
+            entities=data.get('entities'),
+            metadata=extra
+        )
+
+
+class UserMemory:
+    """
+    Conversation state for one user
+
+    history is a fixed-capacity deque, so appending past max_history drops the
+    oldest turn in O(1) instead of re-slicing the list on every message.
+    """
+
+    __slots__ = ('history', 'last_intent', 'pending_questions', 'user_profile', 'last_seen')
+
+    def __init__(self, max_history: int = DEFAULT_MAX_HISTORY):
+        self.history: Deque[Turn] = deque(maxlen=max_history)
+        self.last_intent: Optional[str] = None
+        self.pending_questions: List[str] = []
+        self.user_profile: Dict[str, Any] = {}
+        self.last_seen = time.time()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Dict-style read access for code that treats the memory as a context dict"""
+        if key in UserMemory.__slots__:
+            return getattr(self, key)
+        return default
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in UserMemory.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'history': [turn.to_dict() for turn in self.history],
+            'last_intent': self.last_intent,
+            'pending_questions': list(self.pending_questions),
+            'user_profile': self.user_profile
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], max_history: int = DEFAULT_MAX_HISTORY) -> 'UserMemory':
+        memory = cls(max_history)
+        memory.history.extend(Turn.from_dict(msg) for msg in data.get('history', []))
+        memory.last_intent = data.get('last_intent')
+        memory.pending_questions = list(data.get('pending_questions', []))
+        memory.user_profile = dict(data.get('user_profile', {}))
+        return memory
+
+
+class MemoryBackend(ABC):
+    """
+    Interface for conversation memory storage
+
+    Backends must implement get, put, delete, __len__ and values; one missing
+    any of them fails when it is constructed.
+    """
+
+    max_history = DEFAULT_MAX_HISTORY
+
+    @abstractmethod
+    def get(self, user_id: str) -> Optional[UserMemory]:
+        """Get a user's memory, or None"""
+
+    @abstractmethod
+    def put(self, user_id: str, memory: UserMemory):
+        """Store a user's memory, replacing any existing one"""
+
+    @abstractmethod
+    def delete(self, user_id: str):
+        """Forget a user"""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Number of users stored"""
+
+    def __contains__(self, user_id: str) -> bool:
+        return self.get(user_id) is not None
+
+    def get_or_create(self, user_id: str) -> Tuple[UserMemory, bool]:
+        """
+        Get a user's memory, creating an empty one if there is none
+
+        Returns:
+            (memory, created); not atomic here, backends shared between
+            threads override it
+        """
+        memory = self.get(user_id)
+        if memory is not None:
+            return memory, False
+        memory = UserMemory(self.max_history)
+        self.put(user_id, memory)
+        return memory, True
+
+    @abstractmethod
+    def values(self) -> Iterator[UserMemory]:
+        """Iterate over stored memories"""
+
+
+class InMemoryBackend(MemoryBackend):
+    """
+    Bounded in-process memory store
+
+    Users are kept in LRU order; past max_users the least recently seen user
+    is evicted, and users idle longer than idle_ttl seconds are expired. When
+    a spill backend is given, evicted users are written to it and transparently
+    restored on their next message instead of being forgotten.
+    """
+
+    def __init__(self,
+                 max_users: int = 50000,
+                 idle_ttl: Optional[float] = 86400.0,
+                 spill: Optional[MemoryBackend] = None,
+                 max_history: int = DEFAULT_MAX_HISTORY):
+        self.max_users = max(1, int(max_users))
+        self.max_history = max_history
+        self.idle_ttl = idle_ttl
+        self.spill = spill
+        self._users: 'OrderedDict[str, UserMemory]' = OrderedDict()
+        self._lock = threading.RLock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, user_id: str) -> Optional[UserMemory]:
+        with self._lock:
+            memory = self._users.get(user_id)
+            if memory is not None:
+                now = time.time()
+                if self.idle_ttl and memory.last_seen < now - self.idle_ttl:
+                    del self._users[user_id]
+                    self.expirations += 1
+                    return None
+                memory.last_seen = now
+                self._users.move_to_end(user_id)
+                return memory
+
+        if self.spill is None:
+            return None
+
+        memory = self.spill.get(user_id)
+        if memory is not None:
+            self.spill.delete(user_id)
+            self.put(user_id, memory)
+        return memory
+
+    def put(self, user_id: str, memory: UserMemory):
+        memory.last_seen = time.time()
+        with self._lock:
+            self._users[user_id] = memory
+            self._users.move_to_end(user_id)
+            self._expire_idle(memory.last_seen)
+
+            while len(self._users) > self.max_users:
+                evicted_id, evicted = self._users.popitem(last=False)
+                self.evictions += 1
+                self._spill(evicted_id, evicted)
+
+    def get_or_create(self, user_id: str) -> Tuple[UserMemory, bool]:
+        """
+        Get a user's memory, creating an empty one if there is none
+
+        The lookup (including the spill store) and the insert happen under one
+        lock, so concurrent first messages from a user share a single memory
+        and exactly one caller sees created=True.
+        """
+        with self._lock:
+            memory = self.get(user_id)
+            if memory is not None:
+                return memory, False
+            memory = UserMemory(self.max_history)
+            self.put(user_id, memory)
+            return memory, True
+
+    def _expire_idle(self, now: float):
+        """Drop users idle past the TTL; LRU order means they are at the front"""
+        if not self.idle_ttl:
+            return
+        cutoff = now - self.idle_ttl
+        while self._users:
+            user_id, memory = next(iter(self._users.items()))
+            if memory.last_seen >= cutoff:
+                break
+            self._users.popitem(last=False)
+            self.expirations += 1
+
+    def _spill(self, user_id: str, memory: UserMemory):
+        if self.spill is not None:
+            try:
+                self.spill.put(user_id, memory)
+            except Exception as e:
+                print(f"Error spilling conversation memory for {user_id}: {e}")
+
+    def delete(self, user_id: str):
+        with self._lock:
+            self._users.pop(user_id, None)
+        if self.spill is not None:
+            self.spill.delete(user_id)
+
+    def __contains__(self, user_id: str) -> bool:
+        with self._lock:
+            if user_id in self._users:
+                return True
+        return self.spill is not None and user_id in self.spill
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def values(self) -> Iterator[UserMemory]:
+        with self._lock:
+            return iter(list(self._users.values()))
+
+
+class SQLiteBackend(MemoryBackend):
+    """On-disk memory store, typically used as spill-over for InMemoryBackend"""
+
+    def __init__(self,
+                 path: str,
+                 idle_ttl: Optional[float] = None,
+                 max_history: int = DEFAULT_MAX_HISTORY):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.idle_ttl = idle_ttl
+        self.max_history = max_history
+        self._lock = threading.Lock()
+        # Opened on first use and keyed by PID: a connection must not cross a
+        # fork, and ChatbotHandler builds this backend at import, which
+        # serve.py runs in the parent before forking the workers
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._inherited: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """Connection owned by this process, opened on first use (caller holds the lock)"""
+        pid = os.getpid()
+        if self._conn is None or self._pid != pid:
+            if self._conn is not None:
+                # The parent's connection: keep a reference so it is never used
+                # or closed (closing could checkpoint the parent's WAL) here
+                self._inherited = self._conn
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS conversation_memory ('
+                'user_id TEXT PRIMARY KEY, data TEXT NOT NULL, last_seen REAL NOT NULL)'
+            )
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_conversation_memory_last_seen '
+                'ON conversation_memory(last_seen)'
+            )
+            conn.commit()
+            self._conn, self._pid = conn, pid
+        return self._conn
+
+    def get(self, user_id: str) -> Optional[UserMemory]:
+        with self._lock:
+            row = self._connection().execute(
+                'SELECT data, last_seen FROM conversation_memory WHERE user_id = ?', (user_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        if self.idle_ttl and row[1] < time.time() - self.idle_ttl:
+            self.delete(user_id)
+            return None
+        return UserMemory.from_dict(json.loads(row[0]), self.max_history)
+
+    def put(self, user_id: str, memory: UserMemory):
+        data = json.dumps(memory.to_dict(), default=str)
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                'INSERT OR REPLACE INTO conversation_memory (user_id, data, last_seen) VALUES (?, ?, ?)',
+                (user_id, data, memory.last_seen)
+            )
+            conn.commit()
+
+    def delete(self, user_id: str):
+        with self._lock:
+            conn = self._connection()
+            conn.execute('DELETE FROM conversation_memory WHERE user_id = ?', (user_id,))
+            conn.commit()
+
+    def __contains__(self, user_id: str) -> bool:
+        with self._lock:
+            row = self._connection().execute(
+                'SELECT 1 FROM conversation_memory WHERE user_id = ?', (user_id,)
+            ).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection().execute('SELECT COUNT(*) FROM conversation_memory').fetchone()[0]
+
+    def values(self) -> Iterator[UserMemory]:
+        with self._lock:
+            rows = self._connection().execute('SELECT data FROM conversation_memory').fetchall()
+        return (UserMemory.from_dict(json.loads(row[0]), self.max_history) for row in rows)
+
+    def purge_idle(self) -> int:
+        """Delete users idle past idle_ttl, returning how many were removed"""
+        if not self.idle_ttl:
+            return 0
+        with self._lock:
+            conn = self._connection()
+            cursor = conn.execute(
+                'DELETE FROM conversation_memory WHERE last_seen < ?', (time.time() - self.idle_ttl,)
+            )
+            conn.commit()
+            return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                if self._pid == os.getpid():
+                    self._conn.close()
+                else:
+                    self._inherited = self._conn
+                self._conn = None
+
+
+def create_memory_backend(max_history: int = DEFAULT_MAX_HISTORY) -> MemoryBackend:
+    """Build the memory backend configured through CHAT_MEMORY_* environment variables"""
+    idle_ttl = float(os.getenv('CHAT_MEMORY_IDLE_TTL', 86400))
+    spill_path = os.getenv('CHAT_MEMORY_SPILL_PATH')
+    spill = SQLiteBackend(spill_path, idle_ttl=idle_ttl, max_history=max_history) if spill_path else None
+    return InMemoryBackend(
+        max_users=int(os.getenv('CHAT_MEMORY_MAX_USERS', 50000)),
+        idle_ttl=idle_ttl,
+        spill=spill,
+        max_history=max_history
+    )
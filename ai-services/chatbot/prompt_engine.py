@@ -1,14 +1,40 @@
 import openai
+import httpx
 import os
-from typing import Dict, List, Any, Optional
+from typing import AsyncIterator, Dict, List, Any, Optional
 from datetime import datetime
 import json
+from itertools import islice
+from .response_cache import ResponseCache
 
 class PromptEngine:
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self,
+                 api_key: Optional[str] = None,
+                 base_url: Optional[str] = None,
+                 request_timeout: Optional[float] = None,
+                 max_connections: int = 20):
+        """
+        Args:
+            api_key: OpenAI API key (defaults to OPENAI_API_KEY)
+            base_url: API base URL for the async client, e.g. a local stub server
+                (defaults to OPENAI_BASE_URL, then the public API)
+            request_timeout: Per-call timeout in seconds for async calls
+                (defaults to OPENAI_TIMEOUT, then 15)
+            max_connections: Size of the pooled HTTP connection limit for async calls
+        """
         self.api_key = api_key or os.getenv('OPENAI_API_KEY')
         if self.api_key:
             openai.api_key = self.api_key
+        self.base_url = base_url or os.getenv('OPENAI_BASE_URL')
+        self.request_timeout = request_timeout or float(os.getenv('OPENAI_TIMEOUT', 15))
+        self.connect_timeout = min(5.0, self.request_timeout)
+        self.max_connections = max_connections
+        self._async_client = None
+        self.response_cache = ResponseCache(
+            max_entries=int(os.getenv('CHAT_CACHE_SIZE', 10000)),
+            ttl_seconds=float(os.getenv('CHAT_CACHE_TTL', 3600)),
+            similarity_threshold=float(os.getenv('CHAT_CACHE_SIMILARITY', 0.9))
+        )
         self.model = "gpt-3.5-turbo"
         self.max_tokens = 500
         self.temperature = 0.7
@@ -95,33 +121,165 @@ Consider both local and national markets, seasonal variations, and quality facto
         if not self.api_key:
             return self._generate_fallback_response(intent, entities)
 
-        try:
-            # Select appropriate system prompt
-            system_prompt = self._select_system_prompt(intent)
-
-            # Build conversation context
-            conversation = self._build_conversation_context(message, context)
-
-            # Add entity information
-            enhanced_prompt = self._enhance_with_entities(system_prompt, entities)
+        cached = self.response_cache.get(intent, message, entities)
+        if cached is not None:
+            return cached
 
+        try:
             # Make API call
             response = openai.ChatCompletion.create(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": enhanced_prompt},
-                    *conversation
-                ],
+                messages=self._build_messages(message, intent, entities, context),
                 max_tokens=self.max_tokens,
                 temperature=self.temperature
             )
 
-            return response.choices[0].message.content.strip()
+            answer = response.choices[0].message.content.strip()
+            self.response_cache.put(intent, message, entities, answer)
+            return answer
+
+        except Exception as e:
+            print(f"Error generating AI response: {e}")
+            return self._generate_fallback_response(intent, entities)
+
+    async def generate_response_async(self,
+                                      message: str,
+                                      intent: str,
+                                      entities: Dict[str, Any],
+                                      context: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Generate AI response without blocking the event loop
+
+        Uses a pooled async client with a per-call timeout; falls back to the
+        canned response on any error, like generate_response.
+        """
+        if not self.api_key:
+            return self._generate_fallback_response(intent, entities)
+
+        cached = self.response_cache.get(intent, message, entities)
+        if cached is not None:
+            return cached
+
+        try:
+            client = self._get_async_client()
+            response = await client.chat.completions.create(
+                model=self.model,
+                messages=self._build_messages(message, intent, entities, context),
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                timeout=self._call_timeout()
+            )
+
+            answer = response.choices[0].message.content.strip()
+            self.response_cache.put(intent, message, entities, answer)
+            return answer
 
         except Exception as e:
             print(f"Error generating AI response: {e}")
             return self._generate_fallback_response(intent, entities)
 
+    async def stream_response(self,
+                              message: str,
+                              intent: str,
+                              entities: Dict[str, Any],
+                              context: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """
+        Stream the AI response token by token
+
+        Yields text deltas as they arrive. When the API is unavailable, or fails
+        before the first token, the fallback response is yielded as one chunk.
+        """
+        if not self.api_key:
+            yield self._generate_fallback_response(intent, entities)
+            return
+
+        cached = self.response_cache.get(intent, message, entities)
+        if cached is not None:
+            yield cached
+            return
+
+        sent_any = False
+        parts = []
+        try:
+            client = self._get_async_client()
+            stream = await client.chat.completions.create(
+                model=self.model,
+                messages=self._build_messages(message, intent, entities, context),
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                stream=True,
+                timeout=self._call_timeout()
+            )
+
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    sent_any = True
+                    parts.append(delta)
+                    yield delta
+
+            if parts:
+                self.response_cache.put(intent, message, entities, ''.join(parts).strip())
+
+        except Exception as e:
+            print(f"Error streaming AI response: {e}")
+            if not sent_any:
+                yield self._generate_fallback_response(intent, entities)
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get response cache hit/miss/eviction counters"""
+        return self.response_cache.get_stats()
+
+    def _get_async_client(self) -> 'openai.AsyncOpenAI':
+        """Get the shared async client, creating it with a pooled HTTP client on first use"""
+        if self._async_client is None:
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                ),
+                timeout=self._call_timeout()
+            )
+            self._async_client = openai.AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                http_client=http_client,
+                max_retries=0
+            )
+        return self._async_client
+
+    def _call_timeout(self) -> httpx.Timeout:
+        """Timeout applied to each async API call"""
+        return httpx.Timeout(self.request_timeout, connect=self.connect_timeout)
+
+    async def aclose(self):
+        """Close pooled connections held by the async client"""
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
+
+    def _build_messages(self,
+                        message: str,
+                        intent: str,
+                        entities: Dict[str, Any],
+                        context: Optional[Dict[str, Any]]) -> List[Dict[str, str]]:
+        """Build the chat messages sent to the API"""
+        # Select appropriate system prompt
+        system_prompt = self._select_system_prompt(intent)
+
+        # Build conversation context
+        conversation = self._build_conversation_context(message, context)
+
+        # Add entity information
+        enhanced_prompt = self._enhance_with_entities(system_prompt, entities)
+
+        return [
+            {"role": "system", "content": enhanced_prompt},
+            *conversation
+        ]
+
     def _select_system_prompt(self, intent: str) -> str:
         """Select appropriate system prompt based on intent"""
         prompt_mapping = {
@@ -141,9 +299,14 @@ Consider both local and national markets, seasonal variations, and quality facto
         conversation = []
 
         if context and context.get('history'):
-            # Add recent conversation history (last 5 exchanges)
-            history = context['history'][-10:]  # Last 10 messages
-            for msg in history:
+            # Add recent conversation history (last 5 exchanges), walking back
+            # from the newest turn so only the last 10 messages are visited
+            recent = list(islice(reversed(context['history']), 11))
+            # ChatbotHandler records the user's message before generating the
+            # answer; it is appended below, so leave it out of the history
+            if recent and recent[0].get('role') == 'user' and recent[0].get('content') == current_message:
+                recent = recent[1:]
+            for msg in reversed(recent[:10]):
                 if msg.get('role') in ['user', 'assistant']:
                     conversation.append({
                         "role": msg['role'],
@@ -206,7 +369,48 @@ Consider both local and national markets, seasonal variations, and quality facto
             return self._generate_structured_fallback(intent, entities)
 
         try:
-            prompt = f"""
+            response = openai.ChatCompletion.create(
+                model=self.model,
+                messages=self._build_structured_messages(intent, entities),
+                max_tokens=800,
+                temperature=0.3
+            )
+
+            return self._parse_structured_response(response.choices[0].message.content.strip())
+
+        except Exception as e:
+            print(f"Error generating structured response: {e}")
+            return self._generate_structured_fallback(intent, entities)
+
+    async def generate_structured_response_async(self,
+                                                 intent: str,
+                                                 entities: Dict[str, Any],
+                                                 context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Generate structured response without blocking the event loop
+        """
+        if not self.api_key:
+            return self._generate_structured_fallback(intent, entities)
+
+        try:
+            client = self._get_async_client()
+            response = await client.chat.completions.create(
+                model=self.model,
+                messages=self._build_structured_messages(intent, entities),
+                max_tokens=800,
+                temperature=0.3,
+                timeout=self._call_timeout()
+            )
+
+            return self._parse_structured_response(response.choices[0].message.content.strip())
+
+        except Exception as e:
+            print(f"Error generating structured response: {e}")
+            return self._generate_structured_fallback(intent, entities)
+
+    def _build_structured_messages(self, intent: str, entities: Dict[str, Any]) -> List[Dict[str, str]]:
+        """Build the chat messages requesting a JSON structured response"""
+        prompt = f"""
 Based on the user's query with intent '{intent}' and entities {json.dumps(entities)},
 generate a structured agricultural response in JSON format with the following fields:
 
@@ -222,35 +426,25 @@ generate a structured agricultural response in JSON format with the following fi
 Make the response practical, farmer-friendly, and specific to Indian agriculture context.
 """
 
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are an expert agricultural assistant. Always respond with valid JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=800,
-                temperature=0.3
-            )
-
-            response_text = response.choices[0].message.content.strip()
-
-            # Try to parse JSON
-            try:
-                return json.loads(response_text)
-            except json.JSONDecodeError:
-                # If JSON parsing fails, return as text response
-                return {
-                    "main_advice": response_text,
-                    "detailed_explanation": "",
-                    "action_steps": [],
-                    "precautions": [],
-                    "additional_resources": [],
-                    "follow_up_questions": []
-                }
+        return [
+            {"role": "system", "content": "You are an expert agricultural assistant. Always respond with valid JSON."},
+            {"role": "user", "content": prompt}
+        ]
 
-        except Exception as e:
-            print(f"Error generating structured response: {e}")
-            return self._generate_structured_fallback(intent, entities)
+    def _parse_structured_response(self, response_text: str) -> Dict[str, Any]:
+        """Parse a structured response, wrapping plain text if it is not valid JSON"""
+        try:
+            return json.loads(response_text)
+        except json.JSONDecodeError:
+            # If JSON parsing fails, return as text response
+            return {
+                "main_advice": response_text,
+                "detailed_explanation": "",
+                "action_steps": [],
+                "precautions": [],
+                "additional_resources": [],
+                "follow_up_questions": []
+            }
 
     def _generate_structured_fallback(self, intent: str, entities: Dict[str, Any]) -> Dict[str, Any]:
         """Generate structured fallback response"""
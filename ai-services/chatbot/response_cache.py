@@ -0,0 +1,170 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from itertools import islice
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Entity types that change the meaning of an answer and so belong in the key
+SALIENT_ENTITIES = ('crops', 'locations', 'numbers', 'problems')
+
+
+class ResponseCache:
+    """
+    TTL + LRU cache for LLM chat answers
+
+    Entries are keyed on (intent, normalized message, salient entities). When a
+    vectorizer is supplied, a miss falls back to a near-duplicate search among
+    cached messages with the same intent and entities, using cosine similarity
+    of their TF-IDF vectors.
+    """
+
+    def __init__(self,
+                 max_entries: int = 10000,
+                 ttl_seconds: float = 3600.0,
+                 vectorizer: Optional[Callable[[str], Any]] = None,
+                 similarity_threshold: float = 0.9,
+                 max_near_candidates: int = 256):
+        """
+        Args:
+            max_entries: Maximum cached answers before least recently used ones are evicted
+            ttl_seconds: Lifetime of a cached answer
+            vectorizer: Maps a message to an L2-normalized sparse row vector
+                (e.g. IntentHandler.vectorize_message); enables near-duplicate lookup
+            similarity_threshold: Minimum cosine similarity for a near-duplicate hit
+            max_near_candidates: Most recently cached messages compared per near-duplicate lookup
+        """
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = ttl_seconds
+        self.vectorizer = vectorizer
+        self.similarity_threshold = similarity_threshold
+        self.max_near_candidates = max_near_candidates
+
+        self._entries: 'OrderedDict[Tuple, Tuple[str, float, Any]]' = OrderedDict()
+        self._buckets: Dict[Tuple, Dict[Tuple, None]] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def normalize_message(message: str) -> str:
+        """Lowercase, strip punctuation and collapse whitespace"""
+        message = re.sub(r'[^\w\s]', ' ', message.lower())
+        return ' '.join(message.split())
+
+    @staticmethod
+    def entity_key(entities: Optional[Dict[str, Any]]) -> Tuple:
+        """Order-insensitive key of the salient entities"""
+        if not entities:
+            return ()
+        return tuple(
+            tuple(sorted({str(value).lower() for value in entities.get(name) or []}))
+            for name in SALIENT_ENTITIES
+        )
+
+    def get(self, intent: str, message: str, entities: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Get a cached answer for the message, or None"""
+        normalized = self.normalize_message(message)
+        bucket_key = (intent, self.entity_key(entities))
+        key = bucket_key + (normalized,)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                self._remove(key)
+                self.expirations += 1
+
+            bucket = self._buckets.get(bucket_key, {})
+            candidates = list(islice(reversed(bucket), self.max_near_candidates))
+
+        if self.vectorizer is not None and candidates:
+            match = self._find_near_duplicate(normalized, candidates, now)
+            if match is not None:
+                return match
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _find_near_duplicate(self, normalized: str, candidates, now: float) -> Optional[str]:
+        """Find the most similar unexpired cached message above the threshold"""
+        vector = self.vectorizer(normalized)
+        if vector is None or not vector.nnz:
+            return None
+
+        best_key, best_score = None, self.similarity_threshold
+        with self._lock:
+            for key in candidates:
+                entry = self._entries.get(key)
+                if entry is None or entry[1] <= now or entry[2] is None:
+                    continue
+                score = vector.multiply(entry[2]).sum()
+                if score >= best_score:
+                    best_key, best_score = key, score
+
+            if best_key is None:
+                return None
+
+            self._entries.move_to_end(best_key)
+            self.near_hits += 1
+            return self._entries[best_key][0]
+
+    def put(self, intent: str, message: str, entities: Optional[Dict[str, Any]], response: str):
+        """Cache an answer, evicting least recently used entries past max_entries"""
+        normalized = self.normalize_message(message)
+        bucket_key = (intent, self.entity_key(entities))
+        key = bucket_key + (normalized,)
+        vector = self.vectorizer(normalized) if self.vectorizer is not None else None
+        expires_at = time.monotonic() + self.ttl_seconds
+
+        with self._lock:
+            self._entries[key] = (response, expires_at, vector)
+            self._entries.move_to_end(key)
+            bucket = self._buckets.setdefault(bucket_key, {})
+            bucket.pop(key, None)
+            bucket[key] = None
+
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key: Tuple):
+        """Drop an entry and its bucket membership (caller holds the lock)"""
+        self._entries.pop(key, None)
+        bucket_key = key[:2]
+        bucket = self._buckets.get(bucket_key)
+        if bucket is not None:
+            bucket.pop(key, None)
+            if not bucket:
+                del self._buckets[bucket_key]
+
+    def clear(self):
+        """Remove all cached answers"""
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache counters"""
+        with self._lock:
+            lookups = self.hits + self.near_hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'near_hits': self.near_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': (self.hits + self.near_hits) / lookups if lookups else 0.0
+            }
@@ -0,0 +1,158 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Hourly buckets kept for the message rate history
+RATE_WINDOW_HOURS = 24
+
+
+def _escape_label(value: str) -> str:
+    """Escape a Prometheus label value"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class ChatStats:
+    """
+    Running chatbot usage counters
+
+    Updated as messages are recorded so reading them is O(1) in the number of
+    stored messages, instead of scanning every user's history.
+    """
+
+    def __init__(self, active_users: Optional[Callable[[], int]] = None):
+        """
+        Args:
+            active_users: Returns the number of conversations currently held in memory
+        """
+        self._active_users = active_users
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        # Conversations started, not unique users: a user whose memory was
+        # evicted or expired (without a spill store) starts a new one when they
+        # return. Counting unique users would mean keeping every user id.
+        self.users_seen = 0
+        self.total_messages = 0
+        self.messages_by_role: Dict[str, int] = {}
+        self.intent_counts: Dict[str, int] = {}
+        # [hour since epoch, message count] pairs for the last RATE_WINDOW_HOURS
+        # hours that saw traffic, oldest first
+        self._hourly: deque = deque(maxlen=RATE_WINDOW_HOURS)
+
+    def record_user(self):
+        """Count a newly created conversation (see users_seen)"""
+        with self._lock:
+            self.users_seen += 1
+
+    def record_message(self, role: str, intent: Optional[str] = None, timestamp: Optional[float] = None):
+        """Count one stored message"""
+        now_hour = int(time.time() // 3600)
+        # Timestamps ahead of the clock count towards the current hour
+        hour = min(now_hour, int(timestamp // 3600)) if timestamp is not None else now_hour
+        with self._lock:
+            self.total_messages += 1
+            self.messages_by_role[role] = self.messages_by_role.get(role, 0) + 1
+            intent = intent or 'unknown'
+            self.intent_counts[intent] = self.intent_counts.get(intent, 0) + 1
+
+            self._drop_old_hours(now_hour)
+            if hour <= now_hour - RATE_WINDOW_HOURS:
+                return
+            if self._hourly and self._hourly[-1][0] == hour:
+                self._hourly[-1][1] += 1
+            elif not self._hourly or self._hourly[-1][0] < hour:
+                self._hourly.append([hour, 1])
+            else:
+                # An older message inside the window (e.g. an imported conversation)
+                self._add_to_past_hour(hour)
+
+    def _drop_old_hours(self, now_hour: int):
+        """Forget hours that fell out of the window, however long ago the last traffic was (caller holds the lock)"""
+        while self._hourly and self._hourly[0][0] <= now_hour - RATE_WINDOW_HOURS:
+            self._hourly.popleft()
+
+    def _add_to_past_hour(self, hour: int):
+        """Count a message for an hour before the newest bucket (caller holds the lock)"""
+        for index, bucket in enumerate(self._hourly):
+            if bucket[0] == hour:
+                bucket[1] += 1
+                return
+            if bucket[0] > hour:
+                # Every hour is inside the window, so the deque is not full here
+                self._hourly.insert(index, [hour, 1])
+                return
+
+    def _hourly_rates(self) -> List[Dict[str, Any]]:
+        """Message counts for the hours in the window that saw traffic (caller holds the lock)"""
+        self._drop_old_hours(int(time.time() // 3600))
+        return [
+            {'hour': time.strftime('%Y-%m-%dT%H:00:00', time.gmtime(hour * 3600)), 'messages': count}
+            for hour, count in self._hourly
+        ]
+
+    def _current_hour_messages(self) -> int:
+        """Messages recorded during the current hour (caller holds the lock)"""
+        if self._hourly and self._hourly[-1][0] == int(time.time() // 3600):
+            return self._hourly[-1][1]
+        return 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Get a consistent copy of all counters"""
+        active_users = self._active_users() if self._active_users else 0
+        with self._lock:
+            return {
+                'total_users': active_users,
+                'users_seen': self.users_seen,
+                'total_messages': self.total_messages,
+                'average_messages_per_user': self.total_messages / self.users_seen if self.users_seen else 0,
+                'messages_by_role': dict(self.messages_by_role),
+                'intent_distribution': dict(self.intent_counts),
+                'messages_this_hour': self._current_hour_messages(),
+                'hourly_messages': self._hourly_rates(),
+                'uptime_seconds': time.time() - self.started_at
+            }
+
+    def to_prometheus(self, extra_counters: Optional[Dict[str, Tuple[float, str]]] = None) -> str:
+        """
+        Render the counters in the Prometheus text exposition format
+
+        Args:
+            extra_counters: Additional cumulative counters as name -> (value, help
+                text), emitted as chatbot_<name>_total
+        """
+        stats = self.snapshot()
+        lines = [
+            '# HELP chatbot_active_users Conversations currently held in memory',
+            '# TYPE chatbot_active_users gauge',
+            f"chatbot_active_users {stats['total_users']}",
+            '# HELP chatbot_users_total Conversations started since process start '
+            '(a user returning after eviction or expiry starts a new one)',
+            '# TYPE chatbot_users_total counter',
+            f"chatbot_users_total {stats['users_seen']}",
+            '# HELP chatbot_messages_total Messages stored since process start',
+            '# TYPE chatbot_messages_total counter',
+        ]
+        for role, count in sorted(stats['messages_by_role'].items()):
+            lines.append(f'chatbot_messages_total{{role="{_escape_label(role)}"}} {count}')
+
+        lines += [
+            '# HELP chatbot_intent_messages_total Messages per classified intent',
+            '# TYPE chatbot_intent_messages_total counter',
+        ]
+        for intent, count in sorted(stats['intent_distribution'].items()):
+            lines.append(f'chatbot_intent_messages_total{{intent="{_escape_label(intent)}"}} {count}')
+
+        lines += [
+            '# HELP chatbot_messages_this_hour Messages stored during the current UTC hour',
+            '# TYPE chatbot_messages_this_hour gauge',
+            f"chatbot_messages_this_hour {stats['messages_this_hour']}",
+        ]
+
+        for name, (value, help_text) in (extra_counters or {}).items():
+            lines += [
+                f'# HELP chatbot_{name}_total {help_text}',
+                f'# TYPE chatbot_{name}_total counter',
+                f'chatbot_{name}_total {value}'
+            ]
+
+        return '\n'.join(lines) + '\n'
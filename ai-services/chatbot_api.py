@@ -1,9 +1,11 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, Dict, Any, List
 import uvicorn
 import os
+import json
 from dotenv import load_dotenv
 
 # Import only the chatbot components
@@ -43,6 +45,11 @@ class ChatResponse(BaseModel):
     suggested_actions: Optional[List[str]] = None
     follow_up_question: Optional[str] = None
 
+@app.on_event("shutdown")
+async def shutdown_services():
+    """Close pooled LLM connections"""
+    await chatbot_handler.prompt_engine.aclose()
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -68,6 +75,36 @@ async def chat_with_ai(request: ChatRequest):
         print(f"Chat processing error: {e}")
         raise HTTPException(status_code=500, detail=f"Chat processing failed: {str(e)}")
 
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """Stream the chatbot answer as server-sent events"""
+    async def event_stream():
+        async for event in chatbot_handler.stream_message(
+            message=request.message,
+            context=request.context,
+            user_id=request.user_id
+        ):
+            yield f"event: {event['event']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/chat/stats")
+async def chat_stats():
+    """Get chatbot usage statistics"""
+    return chatbot_handler.get_chatbot_stats()
+
+@app.get("/chat/metrics", response_class=PlainTextResponse)
+async def chat_metrics():
+    """Chatbot usage counters in the Prometheus text exposition format"""
+    return PlainTextResponse(
+        chatbot_handler.get_prometheus_metrics(),
+        media_type="text/plain; version=0.0.4"
+    )
+
 @app.get("/chat/suggestions")
 async def get_chat_suggestions():
     """Get suggested questions for the chatbot"""
@@ -3,5 +3,10 @@
 
 from .model import CropRecommendationModel
 from .predict import CropRecommender
+from .registry import ModelRegistry
+from .artifact import export_mapped_model, load_mapped_model
+from .tree_engine import FlatForest, compile_forest
+from .recommendation_cache import RecommendationCache
 
-__all__ = ['CropRecommendationModel', 'CropRecommender']
\ No newline at end of file
+__all__ = ['CropRecommendationModel', 'CropRecommender', 'ModelRegistry', 'export_mapped_model', 'load_mapped_model',
+           'FlatForest', 'compile_forest', 'RecommendationCache']
\ No newline at end of file
@@ -0,0 +1,197 @@
+"""
+Memory-mapped crop model artifact
+Stores a random forest's tree arrays as uncompressed .npy files with a small
+JSON manifest for the scaler, label classes and feature columns. Loading maps
+the arrays read-only instead of unpickling every tree, so cold start is near
+instant and all processes serving the model share the same page cache. The
+mapped arrays are evaluated by the compiled engine in tree_engine.py.
+
+Export an existing pickle:
+    python -m crop_recommendation.artifact crop_recommendation/models/crop_model.pkl
+"""
+
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .registry import ModelRegistry
+from .tree_engine import CLASSIFIER, TREE_ARRAYS, FlatForest, flatten_forest
+
+FORMAT_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+
+
+def mapped_dir_for(model_path: str) -> str:
+    """Directory holding the mapped export of a pickled model"""
+    return os.path.splitext(model_path)[0] + '_mapped'
+
+
+class MappedScaler:
+    """StandardScaler.transform from stored mean and scale"""
+
+    def __init__(self, mean: Optional[List[float]], scale: Optional[List[float]]):
+        self.mean_ = None if mean is None else np.asarray(mean, dtype=np.float64)
+        self.scale_ = None if scale is None else np.asarray(scale, dtype=np.float64)
+
+    def transform(self, X) -> np.ndarray:
+        X = np.array(X, dtype=np.float64)
+        if self.mean_ is not None:
+            X -= self.mean_
+        if self.scale_ is not None:
+            X /= self.scale_
+        return X
+
+
+class MappedLabelEncoder:
+    """LabelEncoder.inverse_transform from stored classes"""
+
+    def __init__(self, classes: List[Any]):
+        self.classes_ = np.asarray(classes)
+
+    def inverse_transform(self, y) -> np.ndarray:
+        return self.classes_[np.asarray(y, dtype=np.intp)]
+
+
+def export_mapped_model(model_data: Dict[str, Any],
+                        directory: str,
+                        source_sha256: Optional[str] = None) -> str:
+    """
+    Write a pickled-model dict (model, scaler, label_encoder, feature_columns)
+    in the memory-mapped format
+
+    The manifest is written last via an atomic rename, so readers never see a
+    manifest pointing at partially written arrays.
+
+    Returns:
+        Path of the manifest
+    """
+    if not hasattr(model_data['model'], 'classes_'):
+        raise ValueError("Only random forest classifiers can be exported")
+    arrays = flatten_forest(model_data['model'])
+    os.makedirs(directory, exist_ok=True)
+
+    files = {}
+    for name, array in arrays.items():
+        filename = f'{name}.npy'
+        tmp_path = os.path.join(directory, f'.{filename}.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.ascontiguousarray(array), allow_pickle=False)
+        os.replace(tmp_path, os.path.join(directory, filename))
+        files[name] = {'file': filename, 'dtype': str(array.dtype), 'shape': list(array.shape)}
+
+    scaler = model_data.get('scaler')
+    mean = getattr(scaler, 'mean_', None)
+    scale = getattr(scaler, 'scale_', None)
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'created_at': datetime.utcnow().isoformat(),
+        'source_sha256': source_sha256,
+        'model_type': type(model_data['model']).__name__,
+        'n_estimators': len(arrays['roots']),
+        'n_nodes': int(len(arrays['feature'])),
+        'n_features': int(model_data['model'].n_features_in_),
+        'feature_columns': list(model_data['feature_columns']),
+        'classes': [str(c) for c in model_data['label_encoder'].classes_],
+        'scaler': {
+            'mean': None if mean is None else [float(v) for v in mean],
+            'scale': None if scale is None else [float(v) for v in scale]
+        },
+        'arrays': files
+    }
+
+    manifest_path = os.path.join(directory, MANIFEST_NAME)
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+    return manifest_path
+
+
+def read_manifest(directory: str) -> Optional[Dict[str, Any]]:
+    """Read a mapped export's manifest, or None if there is no usable export"""
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('format_version') != FORMAT_VERSION:
+        return None
+    return manifest
+
+
+def load_mapped_model(directory: str, mmap: bool = True) -> Dict[str, Any]:
+    """
+    Load a mapped export as a dict shaped like the pickled model data
+
+    Args:
+        directory: Export directory containing manifest.json
+        mmap: Map the arrays read-only instead of reading them into memory
+    """
+    manifest = read_manifest(directory)
+    if manifest is None:
+        raise FileNotFoundError(f"No mapped crop model in {directory}")
+
+    arrays = {}
+    for name in TREE_ARRAYS:
+        spec = manifest['arrays'][name]
+        array = np.load(os.path.join(directory, spec['file']),
+                        mmap_mode='r' if mmap else None, allow_pickle=False)
+        if list(array.shape) != spec['shape']:
+            raise ValueError(f"Mapped array {name} has shape {array.shape}, expected {spec['shape']}")
+        arrays[name] = array
+
+    return {
+        'model': FlatForest(arrays, manifest['n_features'], CLASSIFIER),
+        'label_encoder': MappedLabelEncoder(manifest['classes']),
+        'scaler': MappedScaler(manifest['scaler']['mean'], manifest['scaler']['scale']),
+        'feature_columns': manifest['feature_columns'],
+        'manifest': manifest
+    }
+
+
+def load_crop_artifact(model_path: str, source_sha256: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Load crop model data, preferring the mapped export next to the pickle
+
+    The export is used when it was made from this exact pickle or when only
+    the export exists.
+
+    Args:
+        model_path: Pickled model data
+        source_sha256: SHA-256 of the pickle if the caller already computed it;
+            otherwise the pickle is hashed here
+    """
+    directory = mapped_dir_for(model_path)
+    manifest = read_manifest(directory)
+    if manifest is not None:
+        pickle_exists = os.path.exists(model_path)
+        if pickle_exists and source_sha256 is None:
+            source_sha256 = ModelRegistry(model_path).file_sha256()
+        if not pickle_exists or manifest.get('source_sha256') == source_sha256:
+            try:
+                return load_mapped_model(directory)
+            except Exception as e:
+                print(f"Error loading mapped crop model, falling back to pickle: {e}")
+
+    import joblib
+    return joblib.load(model_path)
+
+
+if __name__ == '__main__':
+    import hashlib
+    import joblib
+
+    if len(sys.argv) < 2:
+        print("Usage: python -m crop_recommendation.artifact <model.pkl> [output_dir]")
+        sys.exit(1)
+
+    source = sys.argv[1]
+    output = sys.argv[2] if len(sys.argv) > 2 else mapped_dir_for(source)
+    with open(source, 'rb') as f:
+        sha256 = hashlib.sha256(f.read()).hexdigest()
+    path = export_mapped_model(joblib.load(source), output, source_sha256=sha256)
+    print(f"Exported {source} to {path}")
@@ -8,19 +8,93 @@ import joblib
 import os
 from typing import Dict, List, Any, Optional
 import json
+from .registry import ModelRegistry
+from .artifact import export_mapped_model, load_crop_artifact, mapped_dir_for
+from .tree_engine import FlatForest, compile_forest
+
+# Batches larger than this are scored by the multi-threaded sklearn estimator,
+# which overtakes the single-threaded compiled engine at a few hundred rows
+COMPILED_BATCH_LIMIT = int(os.getenv('CROP_COMPILED_BATCH_LIMIT', 256))
+
+class CropModelBundle:
+    """
+    Immutable snapshot of everything a prediction reads: the model, the scorer
+    built from it, the scaler, the label encoder and the feature columns
+
+    Loads publish a new bundle with a single reference assignment and readers
+    take one reference to it, so a hot reload can never pair a new model with
+    an old scaler or encoder.
+
+    model is the fitted sklearn estimator, or None when the bundle was loaded
+    from the memory-mapped export and no large batch has needed it yet.
+    predictor scores requests and small batches.
+    """
+
+    __slots__ = ('model', 'predictor', 'scaler', 'label_encoder', 'feature_columns', 'sha256')
+
+    def __init__(self, model, predictor, scaler, label_encoder, feature_columns, sha256=None):
+        fields = {
+            'model': model,
+            'predictor': predictor,
+            'scaler': scaler,
+            'label_encoder': label_encoder,
+            'feature_columns': tuple(feature_columns),
+            'sha256': sha256
+        }
+        for name, value in fields.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CropModelBundle is immutable")
+
+    def with_model(self, model) -> 'CropModelBundle':
+        """Copy of this bundle holding the given sklearn estimator"""
+        return CropModelBundle(model, self.predictor, self.scaler, self.label_encoder,
+                               self.feature_columns, self.sha256)
 
 class CropRecommendationModel:
-    def __init__(self, model_path: str = "crop_recommendation/models/crop_model.pkl"):
+    def __init__(self,
+                 model_path: str = "crop_recommendation/models/crop_model.pkl",
+                 use_mapped: bool = True,
+                 backend: Optional[str] = None):
+        """
+        Args:
+            model_path: Pickled model artifact
+            use_mapped: Load the memory-mapped export next to the pickle when it
+                matches it, and write one after training
+            backend: 'compiled' to score with the flattened tree engine or
+                'sklearn' for the fitted estimator (default: CROP_INFERENCE_BACKEND
+                environment variable, else 'compiled'). Batches over
+                COMPILED_BATCH_LIMIT rows always use the sklearn estimator.
+        """
         self.model_path = model_path
-        self.model = None
-        self.label_encoder = None
-        self.scaler = None
+        self.use_mapped = use_mapped
+        self.backend = backend or os.getenv('CROP_INFERENCE_BACKEND', 'compiled')
+        # The serving CropModelBundle, replaced by a single assignment; None until loaded
+        self._bundle = None
         self.feature_columns = [
             'N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall'
         ]
         self.crop_data = None
+        self.registry = ModelRegistry(model_path)
         self._load_data()
 
+    @property
+    def model(self):
+        """Scorer of the serving bundle (predict paths read the bundle itself)"""
+        bundle = self._bundle
+        return bundle.predictor if bundle is not None else None
+
+    @property
+    def scaler(self):
+        bundle = self._bundle
+        return bundle.scaler if bundle is not None else None
+
+    @property
+    def label_encoder(self):
+        bundle = self._bundle
+        return bundle.label_encoder if bundle is not None else None
+
     def _load_data(self):
         """Load crop dataset"""
         try:
@@ -57,12 +131,12 @@ class CropRecommendationModel:
             y = self.crop_data['label']
 
             # Encode target labels
-            self.label_encoder = LabelEncoder()
-            y_encoded = self.label_encoder.fit_transform(y)
+            label_encoder = LabelEncoder()
+            y_encoded = label_encoder.fit_transform(y)
 
             # Scale features
-            self.scaler = StandardScaler()
-            X_scaled = self.scaler.fit_transform(X)
+            scaler = StandardScaler()
+            X_scaled = scaler.fit_transform(X)
 
             # Split data
             X_train, X_test, y_train, y_test = train_test_split(
@@ -70,27 +144,32 @@ class CropRecommendationModel:
             )
 
             # Train model
-            self.model = RandomForestClassifier(
+            model = RandomForestClassifier(
                 n_estimators=100,
                 random_state=42,
                 max_depth=10
             )
-            self.model.fit(X_train, y_train)
+            model.fit(X_train, y_train)
 
             # Evaluate model
-            y_pred = self.model.predict(X_test)
+            y_pred = model.predict(X_test)
             accuracy = accuracy_score(y_test, y_pred)
             print(f"Model accuracy: {accuracy:.2f}")
 
             # Save model
             os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
             model_data = {
-                'model': self.model,
-                'label_encoder': self.label_encoder,
-                'scaler': self.scaler,
+                'model': model,
+                'label_encoder': label_encoder,
+                'scaler': scaler,
                 'feature_columns': self.feature_columns
             }
-            joblib.dump(model_data, self.model_path)
+            with self.registry.lock:
+                joblib.dump(model_data, self.model_path)
+                sha256 = self.registry.file_sha256()
+                if self.use_mapped:
+                    self.export_mapped(model_data, sha256)
+                self._publish(model_data, sha256)
 
             return accuracy
 
@@ -101,42 +180,108 @@ class CropRecommendationModel:
     def load_model(self):
         """Load trained model from disk"""
         try:
-            if os.path.exists(self.model_path):
-                model_data = joblib.load(self.model_path)
-                self.model = model_data['model']
-                self.label_encoder = model_data['label_encoder']
-                self.scaler = model_data['scaler']
-                self.feature_columns = model_data['feature_columns']
-                return True
-            else:
-                print("Model file not found, training new model...")
-                return self.train_model() > 0
+            with self.registry.lock:
+                if os.path.exists(self.model_path):
+                    sha256 = self.registry.file_sha256()
+                    # The mapped export is always scored by the compiled engine
+                    if self.use_mapped and self.backend == 'compiled':
+                        model_data = load_crop_artifact(self.model_path, source_sha256=sha256)
+                    else:
+                        model_data = joblib.load(self.model_path)
+                    self._publish(model_data, sha256)
+                    return True
+                else:
+                    print("Model file not found, training new model...")
+                    return self.train_model() > 0
         except Exception as e:
             print(f"Error loading model: {e}")
             return False
 
+    def _publish(self, model_data: Dict[str, Any], sha256: Optional[str]):
+        """
+        Build the next bundle off to the side, swap it in with one assignment and
+        record the load (caller holds registry.lock)
+        """
+        feature_columns = list(model_data['feature_columns'])
+        model = model_data['model']
+        self._bundle = CropModelBundle(
+            # The mapped export carries only the compiled forest
+            None if isinstance(model, FlatForest) else model,
+            self._select_backend(model, model_data['scaler'], feature_columns),
+            model_data['scaler'],
+            model_data['label_encoder'],
+            feature_columns,
+            sha256
+        )
+        self.registry.mark_loaded(sha256)
+
+    def _select_backend(self, model, scaler, feature_columns: List[str]):
+        """Compile a fitted sklearn forest for the 'compiled' backend"""
+        if self.backend != 'compiled' or isinstance(model, FlatForest):
+            return model
+        try:
+            probe = None
+            if self.crop_data is not None and scaler is not None:
+                probe = scaler.transform(self.crop_data[feature_columns].iloc[:64])
+            return compile_forest(model, validate_with=probe)
+        except Exception as e:
+            print(f"Using sklearn crop model, compiled backend unavailable: {e}")
+            return model
+
+    def export_mapped(self, model_data: Optional[Dict[str, Any]] = None, sha256: Optional[str] = None) -> bool:
+        """
+        Write the memory-mapped export of the model next to the pickle
+
+        Returns:
+            True if the export was written
+        """
+        try:
+            if model_data is None:
+                # The serving model may already be compiled, so export from the pickle
+                model_data = joblib.load(self.model_path)
+            export_mapped_model(model_data, mapped_dir_for(self.model_path),
+                                source_sha256=sha256 or self.registry.file_sha256())
+            return True
+        except Exception as e:
+            print(f"Error exporting mapped crop model: {e}")
+            return False
+
+    def is_loaded(self) -> bool:
+        """Check if a model is held in memory without touching disk"""
+        return self.registry.loaded and self._bundle is not None
+
+    def reload_if_changed(self, force: bool = False) -> bool:
+        """
+        Hot-reload the model when its artifact changed on disk
+
+        Returns:
+            True if a new model was loaded
+        """
+        if not force and not self.registry.has_changed():
+            return False
+        return self.load_model()
+
     def predict_crop(self, features: Dict[str, float]) -> Dict[str, Any]:
         """Predict suitable crops based on soil and weather conditions"""
         try:
-            if self.model is None:
-                if not self.load_model():
-                    raise Exception("Failed to load or train model")
+            # One reference for the whole prediction, so a reload cannot mix artifacts
+            bundle = self._get_bundle()
 
             # Prepare input features
             input_data = []
-            for col in self.feature_columns:
+            for col in bundle.feature_columns:
                 value = features.get(col.lower(), 0)
                 input_data.append(value)
 
             input_array = np.array(input_data).reshape(1, -1)
-            input_scaled = self.scaler.transform(input_array)
+            input_scaled = bundle.scaler.transform(input_array)
 
             # Get prediction probabilities
-            probabilities = self.model.predict_proba(input_scaled)[0]
+            probabilities = bundle.predictor.predict_proba(input_scaled)[0]
 
             # Get top 3 predictions
             top_indices = np.argsort(probabilities)[-3:][::-1]
-            top_crops = self.label_encoder.inverse_transform(top_indices)
+            top_crops = bundle.label_encoder.inverse_transform(top_indices)
             top_probabilities = probabilities[top_indices]
 
             # Create response
@@ -161,6 +306,151 @@ class CropRecommendationModel:
             print(f"Error in prediction: {e}")
             return self._get_fallback_recommendation()
 
+    def predict_crops_batch(self, features: Any, top_k: int = 3) -> List[Dict[str, Any]]:
+        """
+        Predict suitable crops for many feature rows in a single model call
+
+        Args:
+            features: List of feature dicts, a 2D NumPy array ordered like
+                ``feature_columns``, or a pandas DataFrame with those columns
+            top_k: Number of crops to return per row
+
+        Returns:
+            One recommendation dict per input row, shaped like ``predict_crop``
+        """
+        try:
+            bundle = self._get_bundle()
+
+            feature_rows = self._to_feature_matrix(features, bundle.feature_columns)
+            if len(feature_rows) == 0:
+                return []
+
+            input_scaled = bundle.scaler.transform(feature_rows)
+
+            # Score every row in one pass; large batches go to the multi-threaded estimator
+            scorer = bundle.predictor
+            if len(input_scaled) > COMPILED_BATCH_LIMIT:
+                scorer = self._get_estimator(bundle)
+            probabilities = scorer.predict_proba(input_scaled)
+            num_classes = probabilities.shape[1]
+            k = max(1, min(top_k, num_classes))
+
+            # Top-k selection across the whole matrix, then order within the k
+            if k < num_classes:
+                top_indices = np.argpartition(probabilities, -k, axis=1)[:, -k:]
+            else:
+                top_indices = np.tile(np.arange(num_classes), (len(probabilities), 1))
+            top_probabilities = np.take_along_axis(probabilities, top_indices, axis=1)
+            order = np.argsort(-top_probabilities, axis=1)
+            top_indices = np.take_along_axis(top_indices, order, axis=1)
+            top_probabilities = np.take_along_axis(top_probabilities, order, axis=1)
+
+            # Map probability columns to crop names without per-row inverse_transform
+            crop_names = bundle.label_encoder.classes_[scorer.classes_]
+            top_crops = crop_names[top_indices]
+
+            results = []
+            for row, crops, probs in zip(feature_rows, top_crops, top_probabilities):
+                row_features = {
+                    col.lower(): float(value)
+                    for col, value in zip(bundle.feature_columns, row)
+                }
+                recommendations = []
+                confidence_scores = {}
+
+                for crop, prob in zip(crops, probs):
+                    recommendations.append({
+                        'crop': crop,
+                        'confidence': float(prob),
+                        'suitability': self._get_crop_info(crop)
+                    })
+                    confidence_scores[crop] = float(prob)
+
+                results.append({
+                    'recommended_crops': recommendations,
+                    'confidence_scores': confidence_scores,
+                    'reasoning': self._generate_reasoning(row_features, crops[0])
+                })
+
+            return results
+
+        except Exception as e:
+            print(f"Error in batch prediction: {e}")
+            try:
+                num_rows = len(features)
+            except TypeError:
+                num_rows = 0
+            return [self._get_fallback_recommendation() for _ in range(num_rows)]
+
+    def _get_bundle(self) -> CropModelBundle:
+        """Serving bundle, loading (or training) the model first if none is loaded"""
+        bundle = self._bundle
+        if bundle is None:
+            if not self.load_model() or self._bundle is None:
+                raise Exception("Failed to load or train model")
+            bundle = self._bundle
+        return bundle
+
+    def _get_estimator(self, bundle: CropModelBundle):
+        """
+        sklearn estimator for large batches
+
+        A bundle loaded from the mapped export has none, so the pickle is read
+        once, checked against the hash the export was loaded for and published
+        in a copy of the bundle. Falls back to the bundle's predictor when the
+        pickle is missing, changed or unreadable.
+        """
+        if bundle.model is not None:
+            return bundle.model
+
+        with self.registry.lock:
+            current = self._bundle
+            if current is not bundle:
+                # Another batch published the estimator for this load, or a reload replaced it
+                if current is not None and current.model is not None and current.sha256 == bundle.sha256:
+                    return current.model
+                return bundle.predictor
+            estimator = bundle.predictor
+            try:
+                if bundle.sha256 is not None and self.registry.file_sha256() == bundle.sha256:
+                    estimator = joblib.load(self.model_path)['model']
+                else:
+                    print("Crop model pickle does not match the loaded export, scoring batches with the compiled engine")
+            except Exception as e:
+                print(f"Error loading sklearn crop model for batch scoring: {e}")
+            # Cache the outcome, falling back to the predictor, so it is decided once per load
+            self._bundle = bundle.with_model(estimator)
+            return estimator
+
+    def _to_feature_matrix(self, features: Any, feature_columns: List[str]) -> np.ndarray:
+        """Convert batch input into an (n_rows, n_features) float matrix"""
+        if isinstance(features, pd.DataFrame):
+            columns = {col.lower(): col for col in features.columns}
+            data = {}
+            for col in feature_columns:
+                source = columns.get(col.lower())
+                data[col] = features[source] if source is not None else 0.0
+            return pd.DataFrame(data, index=features.index).to_numpy(dtype=np.float64)
+
+        if isinstance(features, np.ndarray):
+            matrix = np.asarray(features, dtype=np.float64)
+            if matrix.ndim == 1:
+                matrix = matrix.reshape(1, -1)
+            if matrix.shape[1] != len(feature_columns):
+                raise ValueError(
+                    f"Expected {len(feature_columns)} feature columns, got {matrix.shape[1]}"
+                )
+            return matrix
+
+        columns = [col.lower() for col in feature_columns]
+        matrix = np.empty((len(features), len(columns)), dtype=np.float64)
+        for i, row in enumerate(features):
+            if isinstance(row, dict):
+                matrix[i] = [row.get(col, 0) for col in columns]
+            else:
+                matrix[i] = row
+        return matrix
+
     def _get_crop_info(self, crop: str) -> Dict[str, Any]:
         """Get additional information about a crop"""
         crop_info = {
@@ -227,8 +517,14 @@ class CropRecommendationModel:
         return reasoning
 
     def _get_fallback_recommendation(self) -> Dict[str, Any]:
-        """Provide fallback recommendation when model fails"""
+        """
+        Provide fallback recommendation when model fails
+
+        Marked with 'fallback': True so callers can tell it from a model result
+        and keep it out of caches.
+        """
         return {
+            'fallback': True,
             'recommended_crops': [{
                 'crop': 'rice',
                 'confidence': 0.5,
@@ -1,14 +1,90 @@
 from .model import CropRecommendationModel
-from typing import Dict, List, Any, Optional
+from .recommendation_cache import RecommendationCache, parse_quantization
+from types import MappingProxyType
+from typing import Dict, List, Any, Mapping, Optional, Tuple
+import copy
 import json
+import os
+
+# Typical conditions used when a request leaves them out
+SEASON_TEMPERATURES = {
+    'kharif': 28.0,  # Summer monsoon
+    'rabi': 18.0,    # Winter
+    'zaid': 32.0     # Summer
+}
+DEFAULT_TEMPERATURE = 25.0
+
+SEASON_RAINFALL = {
+    'kharif': 150.0,  # Monsoon season
+    'rabi': 50.0,     # Winter, less rain
+    'zaid': 30.0      # Summer, minimal rain
+}
+DEFAULT_RAINFALL = 100.0
+
+SOIL_ADJUSTMENTS = {
+    'clay': {'n': 60, 'p': 35, 'k': 45, 'ph': 7.2},
+    'sandy': {'n': 40, 'p': 25, 'k': 35, 'ph': 6.8},
+    'loamy': {'n': 50, 'p': 40, 'k': 40, 'ph': 7.0},
+    'silt': {'n': 55, 'p': 38, 'k': 42, 'ph': 7.1},
+    'peat': {'n': 45, 'p': 30, 'k': 38, 'ph': 6.5},
+    'chalky': {'n': 48, 'p': 42, 'k': 44, 'ph': 7.8}
+}
+DEFAULT_SOIL_ADJUSTMENT = {'n': 50, 'p': 40, 'k': 40, 'ph': 7.0}
 
 class CropRecommender:
-    def __init__(self):
+    def __init__(self,
+                 cache_size: Optional[int] = None,
+                 quantization: Optional[Dict[str, float]] = None,
+                 precompute_defaults: bool = True,
+                 score_quantized: Optional[bool] = None):
+        """
+        Args:
+            cache_size: Recommendations memoized per process; 0 disables the cache
+                (default: CROP_CACHE_SIZE environment variable, else 4096)
+            quantization: Rounding step per feature for cache keys
+                (default: CROP_CACHE_QUANTIZATION overrides of DEFAULT_QUANTIZATION)
+            precompute_defaults: Score every soil x season default profile when
+                the model loads and serve requests without explicit conditions
+                from that table
+            score_quantized: Score the quantized features instead of the
+                request's own, so every request sharing a cache key gets the
+                identical answer; the scored values are echoed as
+                'scored_features' (default: CROP_CACHE_SCORE_QUANTIZED, else false)
+        """
         self.model = CropRecommendationModel()
+        self.default_table: Optional[Mapping[Tuple[Optional[str], Optional[str]], Dict[str, Any]]] = None
+        self.default_table_hits = 0
+
+        if cache_size is None:
+            cache_size = int(os.getenv('CROP_CACHE_SIZE', 4096))
+        if quantization is None:
+            quantization = parse_quantization(os.getenv('CROP_CACHE_QUANTIZATION'))
+        if score_quantized is None:
+            score_quantized = os.getenv('CROP_CACHE_SCORE_QUANTIZED', 'false').lower() == 'true'
+        self.score_quantized = score_quantized
+        self.cache = RecommendationCache(cache_size, quantization) if cache_size > 0 else None
+        if self.cache is not None:
+            # Cached results are only valid for the artifact that scored them
+            self.cache.invalidate(self.model.registry.version)
+            self.model.registry.add_listener(self.cache.invalidate)
+        if precompute_defaults:
+            self.model.registry.add_listener(self._build_default_table)
 
     def is_ready(self) -> bool:
         """Check if the model is ready for predictions"""
-        return self.model.load_model()
+        return self.model.is_loaded() or self.model.load_model()
+
+    def is_loaded(self) -> bool:
+        """Check if the model is in memory, without loading or training it"""
+        return self.model.is_loaded()
+
+    def reload_model(self, force: bool = False) -> Dict[str, Any]:
+        """Reload the model if its artifact changed (or unconditionally with force)"""
+        reloaded = self.model.reload_if_changed(force=force)
+        return {
+            'reloaded': reloaded,
+            'artifact': self.model.registry.get_info()
+        }
 
     def predict(self,
                 soil_type: str,
@@ -32,13 +108,25 @@ class CropRecommender:
             Dictionary with recommendations and confidence scores
         """
 
-        # Convert inputs to model features
-        features = self._prepare_features(
-            soil_type, location, season, temperature, rainfall, ph_level
-        )
+        result = None
+        table = self.default_table
+        if table is not None and not (temperature or rainfall or ph_level):
+            entry = table.get(self._default_profile_key(soil_type, season))
+            if entry is not None:
+                self.default_table_hits += 1
+                result = copy.deepcopy(entry)
 
-        # Get model prediction
-        result = self.model.predict_crop(features)
+        if result is None:
+            # Convert inputs to model features
+            features = self._prepare_features(
+                soil_type, location, season, temperature, rainfall, ph_level
+            )
+
+            # Get model prediction
+            if self.cache is None:
+                result = self.model.predict_crop(features)
+            else:
+                result = self._predict_cached(features)
 
         # Enhance result with additional context
         result['input_conditions'] = {
@@ -52,6 +140,147 @@ class CropRecommender:
 
         return result
 
+    def predict_batch(self, requests: List[Dict[str, Any]], top_k: int = 3) -> List[Dict[str, Any]]:
+        """
+        Get crop recommendations for many sets of conditions at once
+
+        Args:
+            requests: List of dicts with the same keys as ``predict`` arguments
+            top_k: Number of crops to return per request
+
+        Returns:
+            List of recommendation dictionaries, one per request
+        """
+        features = [
+            self._prepare_features(
+                req['soil_type'],
+                req.get('location', ''),
+                req['season'],
+                req.get('temperature'),
+                req.get('rainfall'),
+                req.get('ph_level')
+            )
+            for req in requests
+        ]
+
+        if self.cache is None:
+            results = self.model.predict_crops_batch(features, top_k=top_k)
+        else:
+            results = self._predict_batch_cached(features, top_k)
+
+        for req, result in zip(requests, results):
+            result['input_conditions'] = {
+                'soil_type': req['soil_type'],
+                'location': req.get('location', ''),
+                'season': req['season'],
+                'temperature': req.get('temperature'),
+                'rainfall': req.get('rainfall'),
+                'ph_level': req.get('ph_level')
+            }
+
+        return results
+
+    def _predict_cached(self, features: Dict[str, float]) -> Dict[str, Any]:
+        """
+        Score the features, reusing a cached result when there is one
+
+        Quantized features only form the cache key; the request's own features
+        are scored unless score_quantized is set.
+        """
+        quantized = self.cache.quantize(features)
+        key = self.cache.make_key(quantized)
+        result = self.cache.get(key)
+        if result is None:
+            version = self.model.registry.version
+            result = self._score(features, quantized)
+            if not result.get('fallback'):
+                self.cache.put(key, result, version)
+        return result
+
+    def _predict_batch_cached(self, features: List[Dict[str, float]], top_k: int) -> List[Dict[str, Any]]:
+        """Batch scoring that only sends distinct uncached feature vectors to the model"""
+        results: List[Optional[Dict[str, Any]]] = [None] * len(features)
+        misses: Dict[tuple, List[int]] = {}
+        miss_features = []
+
+        for i, row in enumerate(features):
+            quantized = self.cache.quantize(row)
+            key = self.cache.make_key(quantized, variant=top_k)
+            if key in misses:
+                misses[key].append(i)
+                continue
+            cached = self.cache.get(key)
+            if cached is not None:
+                results[i] = cached
+            else:
+                misses[key] = [i]
+                miss_features.append(quantized if self.score_quantized else row)
+
+        if miss_features:
+            version = self.model.registry.version
+            scored = self.model.predict_crops_batch(miss_features, top_k=top_k)
+            for (key, indices), result, scored_features in zip(misses.items(), scored, miss_features):
+                if self.score_quantized:
+                    result['scored_features'] = dict(scored_features)
+                if not result.get('fallback'):
+                    self.cache.put(key, result, version)
+                results[indices[0]] = result
+                for i in indices[1:]:
+                    results[i] = copy.deepcopy(result)
+
+        return results
+
+    def _score(self, features: Dict[str, float], quantized: Dict[str, float]) -> Dict[str, Any]:
+        """Score one request's features, or its quantized features with score_quantized"""
+        if not self.score_quantized:
+            return self.model.predict_crop(features)
+        result = self.model.predict_crop(quantized)
+        result['scored_features'] = dict(quantized)
+        return result
+
+    @staticmethod
+    def _default_profile_key(soil_type: str, season: str) -> Tuple[Optional[str], Optional[str]]:
+        """Default-table key; unknown soils and seasons share the fallback profile (None)"""
+        soil = soil_type.lower()
+        season = season.lower()
+        return (
+            soil if soil in SOIL_ADJUSTMENTS else None,
+            season if season in SEASON_TEMPERATURES else None
+        )
+
+    def _build_default_table(self, version: Optional[int] = None):
+        """
+        Score every soil x season default profile with the loaded model
+
+        Runs as a registry listener, so the table is rebuilt on every load and
+        swapped in with a single assignment.
+        """
+        self.default_table = None
+        try:
+            table = {}
+            for soil in list(SOIL_ADJUSTMENTS) + [None]:
+                for season in list(SEASON_TEMPERATURES) + [None]:
+                    features = self._prepare_features(soil or '', '', season or '', None, None, None)
+                    result = self.model.predict_crop(features)
+                    if result.get('fallback'):
+                        # Leave the table empty rather than serve fallbacks from it
+                        return
+                    table[(soil, season)] = result
+            self.default_table = MappingProxyType(table)
+        except Exception as e:
+            print(f"Error precomputing default crop recommendations: {e}")
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get recommendation cache and default-table counters for this process"""
+        table = self.default_table
+        stats = {
+            'default_profiles': len(table) if table is not None else 0,
+            'default_profile_hits': self.default_table_hits
+        }
+        if self.cache is None:
+            return dict(stats, enabled=False)
+        return dict(self.cache.get_stats(), enabled=True, **stats)
+
     def _prepare_features(self,
                          soil_type: str,
                          location: str,
@@ -82,34 +311,15 @@ class CropRecommender:
 
     def _get_seasonal_temperature(self, season: str) -> float:
         """Get typical temperature for the season"""
-        season_temps = {
-            'kharif': 28.0,  # Summer monsoon
-            'rabi': 18.0,    # Winter
-            'zaid': 32.0     # Summer
-        }
-        return season_temps.get(season.lower(), 25.0)
+        return SEASON_TEMPERATURES.get(season.lower(), DEFAULT_TEMPERATURE)
 
     def _get_seasonal_rainfall(self, season: str) -> float:
         """Get typical rainfall for the season"""
-        season_rainfall = {
-            'kharif': 150.0,  # Monsoon season
-            'rabi': 50.0,     # Winter, less rain
-            'zaid': 30.0      # Summer, minimal rain
-        }
-        return season_rainfall.get(season.lower(), 100.0)
+        return SEASON_RAINFALL.get(season.lower(), DEFAULT_RAINFALL)
 
     def _get_soil_adjustments(self, soil_type: str) -> Dict[str, float]:
         """Get nutrient adjustments based on soil type"""
-        adjustments = {
-            'clay': {'n': 60, 'p': 35, 'k': 45, 'ph': 7.2},
-            'sandy': {'n': 40, 'p': 25, 'k': 35, 'ph': 6.8},
-            'loamy': {'n': 50, 'p': 40, 'k': 40, 'ph': 7.0},
-            'silt': {'n': 55, 'p': 38, 'k': 42, 'ph': 7.1},
-            'peat': {'n': 45, 'p': 30, 'k': 38, 'ph': 6.5},
-            'chalky': {'n': 48, 'p': 42, 'k': 44, 'ph': 7.8}
-        }
-
-        base_adjustments = adjustments.get(soil_type.lower(), {'n': 50, 'p': 40, 'k': 40, 'ph': 7.0})
+        base_adjustments = SOIL_ADJUSTMENTS.get(soil_type.lower(), DEFAULT_SOIL_ADJUSTMENT)
 
         return {
             'n': base_adjustments['n'],
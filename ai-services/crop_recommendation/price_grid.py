@@ -0,0 +1,145 @@
+"""
+Precomputed price grid for Kisan Unnati
+Materializes the price model's predictions for every crop x district x month x
+arrival-quantity bucket into one float32 array, so a price request becomes an
+array lookup with linear interpolation over arrival quantity
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Ten buckets per decade (the R10 preferred numbers, ~1.26x apart). The forest
+# is piecewise constant in arrival quantity, so interpolating between buckets
+# carries an error that shrinks with bucket spacing; on synthetic mandi data
+# (benchmarks/bench_price_grid.py) the relative error against the model is
+# 1.2% mean / 3.8% p95 with these 21 buckets, versus 2.1% / 6.1% with the
+# earlier 7 (100, 250, 500, 1000, 2000, 5000, 10000) at a third of the memory
+DEFAULT_ARRIVAL_BUCKETS = (
+    100, 125, 160, 200, 250, 315, 400, 500, 630, 800,
+    1000, 1250, 1600, 2000, 2500, 3150, 4000, 5000, 6300, 8000, 10000
+)
+MONTHS = 12
+
+
+def parse_buckets(spec: Optional[str]) -> Sequence[float]:
+    """Parse comma-separated arrival buckets (e.g. '100,1000,10000'), else the defaults"""
+    if not spec:
+        return DEFAULT_ARRIVAL_BUCKETS
+    return tuple(sorted(float(value) for value in spec.split(',') if value.strip()))
+
+
+class PriceGrid:
+    """
+    Model predictions laid out as prices[crop_code, district_code, month - 1, bucket]
+
+    source is the model object the grid was built from, so callers can tell
+    whether it still matches the serving model.
+    """
+
+    def __init__(self, prices: np.ndarray, arrival_buckets: Sequence[float], source: Any = None):
+        self.prices = prices
+        self.arrival_buckets = np.asarray(arrival_buckets, dtype=np.float64)
+        self.source = source
+        self.built_at = datetime.utcnow().isoformat()
+
+    def lookup(self, crop_code: int, district_code: int, month: int, arrival_quantity: float) -> float:
+        """Price for one input, interpolated between the neighbouring arrival buckets"""
+        row = self.prices[crop_code, district_code, month - 1]
+        # np.interp clamps quantities outside the bucket range to the end values
+        return float(np.interp(arrival_quantity, self.arrival_buckets, row))
+
+    def get_info(self) -> Dict[str, Any]:
+        return {
+            'shape': list(self.prices.shape),
+            'arrival_buckets': self.arrival_buckets.tolist(),
+            'size_mb': self.prices.nbytes / (1024 * 1024),
+            'built_at': self.built_at
+        }
+
+
+def build_price_grid(model,
+                     n_crops: int,
+                     n_districts: int,
+                     arrival_buckets: Sequence[float] = DEFAULT_ARRIVAL_BUCKETS,
+                     chunk_rows: int = 65536) -> PriceGrid:
+    """
+    Score every crop x district x month x bucket combination
+
+    Args:
+        model: Fitted regressor over [crop_encoded, district_encoded, month, arrival_quantity]
+        n_crops: Number of crop codes (len(crop_encoder.classes_))
+        n_districts: Number of district codes (len(district_encoder.classes_))
+        arrival_buckets: Increasing arrival quantities to precompute
+        chunk_rows: Rows scored per predict call, bounding the feature matrix size
+    """
+    buckets = np.asarray(sorted(arrival_buckets), dtype=np.float64)
+    shape = (n_crops, n_districts, MONTHS, len(buckets))
+    prices = np.empty(int(np.prod(shape)), dtype=np.float32)
+
+    # Row i of the flattened grid is the C-order index into shape
+    per_crop = n_districts * MONTHS * len(buckets)
+    for start in range(0, len(prices), chunk_rows):
+        index = np.arange(start, min(start + chunk_rows, len(prices)))
+        crop, rest = np.divmod(index, per_crop)
+        district, rest = np.divmod(rest, MONTHS * len(buckets))
+        month, bucket = np.divmod(rest, len(buckets))
+        features = np.column_stack([crop, district, month + 1, buckets[bucket]]).astype(np.float64)
+        prices[start:start + len(index)] = model.predict(features)
+
+    return PriceGrid(prices.reshape(shape), buckets, source=model)
+
+
+class PriceGridRefresher:
+    """Background thread that calls refresh_fn on a fixed interval or on demand"""
+
+    def __init__(self, refresh_fn: Callable[[], Any], interval_seconds: float = 3600.0):
+        self.refresh_fn = refresh_fn
+        self.interval_seconds = interval_seconds
+        self.last_refresh = None
+        self.last_duration = None
+        self.last_error = None
+
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._worker = threading.Thread(target=self._run, name='price-grid-refresher', daemon=True)
+
+    def start(self):
+        self._worker.start()
+
+    def trigger(self):
+        """Refresh as soon as possible instead of waiting for the next interval"""
+        self._wake.set()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            started = time.monotonic()
+            try:
+                self.refresh_fn()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Error refreshing price grid: {str(e)}")
+            self.last_duration = time.monotonic() - started
+            self.last_refresh = datetime.utcnow().isoformat()
+
+            self._wake.wait(self.interval_seconds)
+            self._wake.clear()
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            'interval_seconds': self.interval_seconds,
+            'last_refresh': self.last_refresh,
+            'last_duration_seconds': self.last_duration,
+            'last_error': self.last_error
+        }
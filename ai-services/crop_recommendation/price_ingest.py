@@ -0,0 +1,215 @@
+"""
+Columnar ingestion of mandi price history for Kisan Unnati
+Reads mandi_prices.csv in chunks with compact dtypes (categorical crop and
+district, float32 prices and quantities, parsed dates) and writes a Parquet
+cache partitioned by year. Training then reads only the columns it needs from
+the cache, so memory stays bounded by one chunk during ingestion and by the
+compact columns afterwards.
+
+Rebuild the cache by hand:
+    python -m crop_recommendation.price_ingest crop_recommendation/data/mandi_prices.csv
+"""
+
+import json
+import logging
+import os
+import shutil
+import sys
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+MANIFEST_NAME = '_manifest.json'
+CHUNK_ROWS = 500000
+
+CSV_DTYPES = {
+    'crop': 'category',
+    'district': 'category',
+    'modal_price': 'float32',
+    'arrival_quantity': 'float32'
+}
+CSV_COLUMNS = ['date'] + list(CSV_DTYPES)
+CATEGORY_COLUMNS = ['crop', 'district']
+
+# Columns fit_price_model reads from the cache
+TRAINING_COLUMNS = ['crop', 'district', 'month', 'arrival_quantity', 'modal_price']
+
+
+def cache_dir_for(csv_path: str) -> str:
+    """Directory holding the Parquet cache of a CSV"""
+    return os.path.splitext(csv_path)[0] + '_parquet'
+
+
+def _source_signature(csv_path: str) -> Dict[str, Any]:
+    st = os.stat(csv_path)
+    return {'path': os.path.abspath(csv_path), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def read_manifest(cache_dir: str) -> Optional[Dict[str, Any]]:
+    """Read a cache's manifest, or None if there is no complete cache"""
+    try:
+        with open(os.path.join(cache_dir, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('format_version') != FORMAT_VERSION:
+        return None
+    return manifest
+
+
+def is_cache_fresh(csv_path: str, cache_dir: str) -> bool:
+    """Whether the cache was built from the CSV as it is now (or the CSV is gone)"""
+    manifest = read_manifest(cache_dir)
+    if manifest is None:
+        return False
+    if not os.path.exists(csv_path):
+        return True
+    source = _source_signature(csv_path)
+    return all(manifest['source'].get(key) == source[key] for key in ('size', 'mtime_ns'))
+
+
+def read_csv_chunks(csv_path: str, chunk_rows: int = CHUNK_ROWS):
+    """Yield cleaned chunks of the CSV with compact dtypes and month/year columns"""
+    reader = pd.read_csv(
+        csv_path,
+        usecols=CSV_COLUMNS,
+        dtype=CSV_DTYPES,
+        parse_dates=['date'],
+        chunksize=chunk_rows
+    )
+    for chunk in reader:
+        chunk = chunk.dropna()
+        chunk['year'] = chunk['date'].dt.year.astype(np.int16)
+        chunk['month'] = chunk['date'].dt.month.astype(np.int8)
+        yield chunk
+
+
+def ingest_mandi_csv(csv_path: str,
+                     cache_dir: Optional[str] = None,
+                     chunk_rows: int = CHUNK_ROWS,
+                     progress: Optional[Callable[[int], None]] = None) -> str:
+    """
+    Convert the CSV into a year-partitioned Parquet cache
+
+    The cache is written to a temporary directory and renamed into place once
+    complete, with the manifest written last, so readers never see a partial
+    cache.
+
+    Args:
+        csv_path: mandi_prices.csv
+        cache_dir: Output directory (default: next to the CSV, see cache_dir_for)
+        chunk_rows: Rows read per chunk, bounding peak memory
+        progress: Optional callback with the number of rows ingested so far
+
+    Returns:
+        The cache directory
+    """
+    if pq is None:
+        raise ImportError("pyarrow is required to write the Parquet cache")
+
+    cache_dir = cache_dir or cache_dir_for(csv_path)
+    source = _source_signature(csv_path)
+    tmp_dir = f"{cache_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    rows = 0
+    years = set()
+    for part, chunk in enumerate(read_csv_chunks(csv_path, chunk_rows)):
+        if chunk.empty:
+            continue
+        # Store categories as plain strings; Parquet dictionary-encodes them and
+        # chunks with different category sets stay compatible
+        for column in CATEGORY_COLUMNS:
+            chunk[column] = chunk[column].astype(str)
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        pq.write_to_dataset(
+            table,
+            tmp_dir,
+            partition_cols=['year'],
+            basename_template=f'part-{part:05d}-{{i}}.parquet'
+        )
+        rows += len(chunk)
+        years.update(int(year) for year in chunk['year'].unique())
+        if progress is not None:
+            progress(rows)
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'created_at': datetime.utcnow().isoformat(),
+        'source': source,
+        'rows': rows,
+        'years': sorted(years),
+        'columns': CSV_COLUMNS + ['year', 'month']
+    }
+    with open(os.path.join(tmp_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    old_dir = f"{cache_dir}.old-{os.getpid()}"
+    if os.path.exists(cache_dir):
+        os.replace(cache_dir, old_dir)
+    os.replace(tmp_dir, cache_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+    logger.info(f"Ingested {rows} rows from {csv_path} into {cache_dir}")
+    return cache_dir
+
+
+def load_training_frame(csv_path: str,
+                        columns: List[str] = TRAINING_COLUMNS,
+                        cache_dir: Optional[str] = None,
+                        progress: Optional[Callable[[int], None]] = None) -> pd.DataFrame:
+    """
+    Load the given columns of the mandi price history, (re)building the
+    Parquet cache first if the CSV changed since it was written
+
+    Crop and district come back as pandas categoricals. Without pyarrow the
+    CSV is read in compact chunks and concatenated, with no cache.
+    """
+    cache_dir = cache_dir or cache_dir_for(csv_path)
+
+    if pq is None:
+        logger.warning("pyarrow not installed, reading the CSV without a Parquet cache")
+        chunks = [chunk[columns] for chunk in read_csv_chunks(csv_path)]
+        frame = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=columns)
+        # Chunks may carry different category sets; unify them
+        for column in CATEGORY_COLUMNS:
+            if column in frame:
+                frame[column] = frame[column].astype('category')
+        return frame
+
+    if not is_cache_fresh(csv_path, cache_dir):
+        ingest_mandi_csv(csv_path, cache_dir, progress=progress)
+
+    table = pq.read_table(
+        cache_dir,
+        columns=columns,
+        read_dictionary=[column for column in CATEGORY_COLUMNS if column in columns]
+    )
+    frame = table.to_pandas()
+    for column in CATEGORY_COLUMNS:
+        if column in frame:
+            frame[column] = frame[column].astype('category').cat.remove_unused_categories()
+    return frame[columns]
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) < 2:
+        print("Usage: python -m crop_recommendation.price_ingest <mandi_prices.csv> [cache_dir]")
+        sys.exit(1)
+
+    output = ingest_mandi_csv(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
+    print(f"Wrote {read_manifest(output)['rows']} rows to {output}")
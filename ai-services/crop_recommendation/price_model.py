@@ -10,86 +10,276 @@ from sklearn.preprocessing import LabelEncoder
 import joblib
 import os
 import logging
+import threading
+from types import MappingProxyType
+from .tree_engine import compile_forest
+from .price_grid import build_price_grid, parse_buckets
+from .price_ingest import load_training_frame
 
 logger = logging.getLogger(__name__)
 
 MODEL_PATH = "crop_recommendation/price_model.pkl"
 CROPS_ENCODER_PATH = "crop_recommendation/crops_encoder.pkl"
 DISTRICTS_ENCODER_PATH = "crop_recommendation/districts_encoder.pkl"
+TRAINING_DATA_PATH = "crop_recommendation/data/mandi_prices.csv"
 
-# Global encoders
-crop_encoder = None
-district_encoder = None
-model = None
+# Forest size, grown TREES_PER_STEP trees at a time during training
+N_ESTIMATORS = 100
+TREES_PER_STEP = 10
+
+# 'compiled' scores with the flattened tree engine, 'sklearn' with the fitted estimator
+INFERENCE_BACKEND = os.getenv("PRICE_INFERENCE_BACKEND", "compiled")
+
+# Batches larger than this are scored by the multi-threaded sklearn estimator,
+# which overtakes the single-threaded compiled engine at a few hundred rows
+COMPILED_BATCH_LIMIT = int(os.getenv("PRICE_COMPILED_BATCH_LIMIT", 256))
+
+# Precomputed predictions served instead of the model once built (see price_grid.py)
+USE_PRICE_GRID = os.getenv("PRICE_GRID_ENABLED", "true").lower() == "true"
+ARRIVAL_BUCKETS = parse_buckets(os.getenv("PRICE_GRID_BUCKETS"))
+price_grid = None
+
+class PriceModelBundle:
+    """
+    Immutable snapshot of everything a prediction reads: the model, the
+    scorer built from it, both encoders and their label -> code lookups
+
+    Readers take one reference to the current bundle and use only that, so a
+    concurrent reload can never pair a new model with an old encoder.
+    """
+
+    __slots__ = ('model', 'predictor', 'crop_encoder', 'district_encoder',
+                 'crop_index', 'district_index', 'version', 'mtime', 'loaded_at')
+
+    def __init__(self, model, crop_encoder, district_encoder, version, mtime=None):
+        fields = {
+            'model': model,
+            'predictor': _select_backend(model, crop_encoder, district_encoder),
+            'crop_encoder': crop_encoder,
+            'district_encoder': district_encoder,
+            'crop_index': MappingProxyType(_build_index(crop_encoder)),
+            'district_index': MappingProxyType(_build_index(district_encoder)),
+            'version': version,
+            'mtime': mtime,
+            'loaded_at': pd.Timestamp.now().isoformat()
+        }
+        for name, value in fields.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("PriceModelBundle is immutable")
+
+    def get_info(self):
+        return {
+            'version': self.version,
+            'loaded_at': self.loaded_at,
+            'n_crops': len(self.crop_index),
+            'n_districts': len(self.district_index),
+            'scorer': type(self.predictor).__name__
+        }
+
+# The serving bundle, replaced by a single reference assignment; None until first use
+_bundle = None
+_model_version = 0
+# Serializes writers (loads and swaps); readers never take it
+_load_lock = threading.Lock()
+
+def _select_backend(fitted_model, fitted_crop_encoder, fitted_district_encoder):
+    """Compile the fitted forest for the 'compiled' backend, falling back to sklearn"""
+    if INFERENCE_BACKEND != "compiled":
+        return fitted_model
+    try:
+        # Every crop/district code for each month, at a typical arrival quantity
+        probe = np.array([
+            [crop_code, district_code, month, 1000]
+            for crop_code in range(min(len(fitted_crop_encoder.classes_), 8))
+            for district_code in range(min(len(fitted_district_encoder.classes_), 4))
+            for month in range(1, 13)
+        ], dtype=np.float64)
+        return compile_forest(fitted_model, validate_with=probe)
+    except Exception as e:
+        logger.warning(f"Using sklearn price model, compiled backend unavailable: {str(e)}")
+        return fitted_model
+
+def _build_index(encoder):
+    """Map each fitted label to its encoded value"""
+    return {label: code for code, label in enumerate(encoder.classes_)}
+
+def _publish(fitted, mtime):
+    """Build the next bundle off to the side, then swap it in (caller holds _load_lock)"""
+    global _bundle, _model_version
+
+    bundle = PriceModelBundle(*fitted, version=_model_version + 1, mtime=mtime)
+    _model_version = bundle.version
+    _bundle = bundle
+    return bundle
+
+def get_bundle():
+    """Current model bundle, loading it on first use; None when no model is available"""
+    bundle = _bundle
+    if bundle is None:
+        with _load_lock:
+            # Another thread may have finished the first load while we waited
+            if _bundle is None:
+                _load_locked()
+            bundle = _bundle
+    return bundle
+
+def get_model_info():
+    """Version and load time of the serving model, without triggering a load"""
+    bundle = _bundle
+    if bundle is None:
+        return {'loaded': False}
+    return dict(bundle.get_info(), loaded=True)
 
 def load_model():
-    """Load pre-trained model and encoders"""
-    global crop_encoder, district_encoder, model
-    
+    """
+    Load the model and encoders from MODEL_PATH and swap them in
+
+    Read-copy-update: the new bundle is fully built before it replaces the
+    current one, and a missing or unreadable file leaves the current one serving.
+
+    Returns:
+    - The serving PriceModelBundle, or None when no model is available
+    """
+    with _load_lock:
+        _load_locked()
+        return _bundle
+
+def _load_locked():
+    """Load MODEL_PATH into a new bundle (caller holds _load_lock)"""
     try:
         if os.path.exists(MODEL_PATH):
-            model, crop_encoder, district_encoder = joblib.load(MODEL_PATH)
-            logger.info(f"Model loaded successfully from {MODEL_PATH}")
+            mtime = os.path.getmtime(MODEL_PATH)
+            bundle = _publish(joblib.load(MODEL_PATH), mtime)
+            logger.info(f"Model version {bundle.version} loaded successfully from {MODEL_PATH}")
         else:
             logger.warning(f"Model file not found at {MODEL_PATH}. Using mock predictions.")
-            model = None
-            crop_encoder = None
-            district_encoder = None
     except Exception as e:
         logger.error(f"Error loading model: {str(e)}")
-        model = None
-        crop_encoder = None
-        district_encoder = None
 
-def train_model():
+def swap_in_model(path):
+    """
+    Serve a newly trained artifact: load it, move it over MODEL_PATH and
+    switch predictions to it. Raises (leaving the current model serving) if
+    the artifact cannot be loaded.
+    """
+    with _load_lock:
+        fitted = joblib.load(path)
+        os.replace(path, MODEL_PATH)
+        bundle = _publish(fitted, os.path.getmtime(MODEL_PATH))
+    logger.info(f"Swapped in price model version {bundle.version} from {path}")
+
+def is_price_grid_current():
+    """Whether the price grid was built from the serving model"""
+    bundle, grid = _bundle, price_grid
+    return bundle is not None and grid is not None and grid.source is bundle.model
+
+def refresh_price_grid(force=False):
+    """
+    Reload the model if its file changed, then rebuild the price grid if it
+    was built from a different model (or unconditionally with force)
+
+    Returns:
+    - The current PriceGrid, or None when no model is available
+    """
+    global price_grid
+
+    bundle = _bundle
+    if bundle is None or (os.path.exists(MODEL_PATH) and os.path.getmtime(MODEL_PATH) != bundle.mtime):
+        bundle = load_model()
+
+    if bundle is None:
+        price_grid = None
+        return None
+    if not force and price_grid is not None and price_grid.source is bundle.model:
+        return price_grid
+
+    started = pd.Timestamp.now()
+    grid = build_price_grid(
+        bundle.model, len(bundle.crop_encoder.classes_), len(bundle.district_encoder.classes_), ARRIVAL_BUCKETS
+    )
+    price_grid = grid
+    logger.info(f"Built price grid {grid.prices.shape} in {(pd.Timestamp.now() - started).total_seconds():.1f}s")
+    return grid
+
+def _encode_categorical(encoder, column):
+    """Fit encoder on a categorical column's labels and return the row codes"""
+    categories = np.asarray(column.cat.categories, dtype=object)
+    encoder.fit(categories)
+    return encoder.transform(categories)[column.cat.codes]
+
+def fit_price_model(csv_path=TRAINING_DATA_PATH, n_jobs=-1, progress=None):
+    """
+    Fit the price model on the mandi price history
+
+    Parameters:
+    - csv_path: CSV with columns date, crop, district, modal_price, arrival_quantity
+    - n_jobs: Cores used by the forest fit (-1 for all)
+    - progress: Optional callback(fraction, stage) for progress reporting
+
+    Returns:
+    - (model, crop_encoder, district_encoder); raises on failure
+    """
+    report = progress or (lambda fraction, stage: None)
+    
+    # Load only the needed columns, from the Parquet cache built by price_ingest.py
+    # (rebuilt in bounded chunks whenever the CSV changed)
+    report(0.0, "loading data")
+    df = load_training_frame(csv_path, progress=lambda rows: report(0.0, f"ingesting CSV ({rows} rows)"))
+    logger.info(f"Loaded {len(df)} records for training")
+    
+    # Encode categorical variables through their categories rather than every
+    # row's string; classes_ are the sorted labels, as with fit_transform
+    report(0.1, "preprocessing")
+    crop_encoder = LabelEncoder()
+    district_encoder = LabelEncoder()
+    
+    X = pd.DataFrame({
+        'crop_encoded': _encode_categorical(crop_encoder, df['crop']),
+        'district_encoded': _encode_categorical(district_encoder, df['district']),
+        'month': df['month'],
+        'arrival_quantity': df['arrival_quantity']
+    })
+    y = df['modal_price']
+    
+    # Train model, growing the forest in steps so progress can be reported.
+    # warm_start draws the same per-tree seeds as a single fit, so the result
+    # is identical to fitting all trees at once.
+    model = RandomForestRegressor(
+        n_estimators=TREES_PER_STEP,
+        random_state=42,
+        n_jobs=n_jobs,
+        max_depth=15,
+        warm_start=True
+    )
+    for trees in range(TREES_PER_STEP, N_ESTIMATORS + 1, TREES_PER_STEP):
+        report(0.2 + 0.75 * (trees - TREES_PER_STEP) / N_ESTIMATORS, f"fitting trees {trees}/{N_ESTIMATORS}")
+        model.set_params(n_estimators=trees)
+        model.fit(X, y)
+    model.set_params(warm_start=False)
+    
+    logger.info("Model trained successfully")
+    report(0.95, "fitted")
+    return model, crop_encoder, district_encoder
+
+def train_model(n_jobs=-1):
     """
     Train the price prediction model.
     This function should be called after setting up the mandi_prices.csv file
     """
     try:
         # Check if CSV exists
-        csv_path = "crop_recommendation/data/mandi_prices.csv"
+        csv_path = TRAINING_DATA_PATH
         if not os.path.exists(csv_path):
             logger.warning(f"Training data not found at {csv_path}. Please add mandi_prices.csv")
             return "Training data not found. Please add mandi_prices.csv with columns: date, crop, district, modal_price, arrival_quantity"
         
-        # Load data
-        df = pd.read_csv(csv_path)
-        logger.info(f"Loaded {len(df)} records for training")
-        
-        # Data preprocessing
-        df.dropna(inplace=True)
-        
-        # Extract month from date
-        df['date'] = pd.to_datetime(df['date'])
-        df['month'] = df['date'].dt.month
-        df['year'] = df['date'].dt.year
-        
-        # Encode categorical variables
-        crop_encoder = LabelEncoder()
-        district_encoder = LabelEncoder()
-        
-        df['crop_encoded'] = crop_encoder.fit_transform(df['crop'])
-        df['district_encoded'] = district_encoder.fit_transform(df['district'])
-        
-        # Prepare features and target
-        X = df[['crop_encoded', 'district_encoded', 'month', 'arrival_quantity']]
-        y = df['modal_price']
-        
-        # Train model
-        model = RandomForestRegressor(
-            n_estimators=100,
-            random_state=42,
-            n_jobs=-1,
-            max_depth=15
-        )
-        model.fit(X, y)
-        
-        logger.info("Model trained successfully")
+        fitted = fit_price_model(csv_path, n_jobs=n_jobs)
         
         # Save model and encoders
         os.makedirs("crop_recommendation", exist_ok=True)
-        joblib.dump((model, crop_encoder, district_encoder), MODEL_PATH)
+        joblib.dump(fitted, MODEL_PATH)
         logger.info(f"Model saved to {MODEL_PATH}")
         
         return "Model trained and saved successfully"
@@ -110,29 +300,30 @@ def predict_price(crop, district, arrival_quantity=1000):
     Returns:
     - Predicted price (float)
     """
-    global crop_encoder, district_encoder, model
-    
-    # Load model if not already loaded
-    if model is None:
-        load_model()
+    # One bundle reference for the whole prediction, loaded on first use
+    bundle = get_bundle()
     
     # If model couldn't be loaded, return mock prediction
-    if model is None:
+    if bundle is None:
         return generate_mock_price(crop)
     
     try:
         # Get current month
         current_month = pd.Timestamp.now().month
         
-        # Encode input
-        crop_encoded = crop_encoder.transform([crop.lower()])[0] if crop.lower() in crop_encoder.classes_ else 0
-        district_encoded = district_encoder.transform([district.lower()])[0] if district.lower() in district_encoder.classes_ else 0
+        # Encode input; unknown labels fall back to code 0
+        crop_encoded = bundle.crop_index.get(crop.lower(), 0)
+        district_encoded = bundle.district_index.get(district.lower(), 0)
         
         # Prepare features [crop_encoded, district_encoded, month, arrival_quantity]
         features = np.array([[crop_encoded, district_encoded, current_month, arrival_quantity]])
         
-        # Predict
-        predicted_price = model.predict(features)[0]
+        # Predict, from the precomputed grid when it matches the loaded model
+        grid = price_grid
+        if USE_PRICE_GRID and grid is not None and grid.source is bundle.model:
+            predicted_price = grid.lookup(crop_encoded, district_encoded, current_month, arrival_quantity)
+        else:
+            predicted_price = bundle.predictor.predict(features)[0]
         
         # Ensure reasonable price range
         if predicted_price < 100:
@@ -147,6 +338,63 @@ def predict_price(crop, district, arrival_quantity=1000):
         logger.error(f"Error predicting price: {str(e)}")
         return generate_mock_price(crop)
 
+def predict_prices_batch(crops, districts, arrival_quantity=1000, month=None):
+    """
+    Predict prices for every crop x district pair with one model call
+
+    Parameters:
+    - crops: Crop names (list of str)
+    - districts: District names (list of str)
+    - arrival_quantity: Quantity arriving in market, shared by all pairs (int)
+    - month: Month to predict for (default: current month)
+
+    Returns:
+    - List of {crop, district, predicted_price} dicts, crop-major, with the
+      same clamping and mock fallbacks as predict_price
+    """
+    bundle = get_bundle()
+
+    if bundle is None:
+        return [
+            {'crop': crop, 'district': district, 'predicted_price': generate_mock_price(crop)}
+            for crop in crops for district in districts
+        ]
+
+    try:
+        if month is None:
+            month = pd.Timestamp.now().month
+
+        crop_codes = np.array([bundle.crop_index.get(crop.lower(), 0) for crop in crops], dtype=np.float64)
+        district_codes = np.array([bundle.district_index.get(d.lower(), 0) for d in districts], dtype=np.float64)
+
+        # Crop-major feature matrix [crop_encoded, district_encoded, month, arrival_quantity]
+        features = np.empty((len(crops) * len(districts), 4), dtype=np.float64)
+        features[:, 0] = np.repeat(crop_codes, len(districts))
+        features[:, 1] = np.tile(district_codes, len(crops))
+        features[:, 2] = month
+        features[:, 3] = arrival_quantity
+
+        scorer = bundle.predictor if len(features) <= COMPILED_BATCH_LIMIT else bundle.model
+        prices = np.asarray(scorer.predict(features), dtype=np.float64) if len(features) else np.empty(0)
+        prices = np.where(prices > 10000, 8000.0, prices)
+
+        results = []
+        pairs = ((crop, district) for crop in crops for district in districts)
+        for (crop, district), price in zip(pairs, prices.tolist()):
+            if price < 100:
+                price = generate_mock_price(crop)
+            results.append({'crop': crop, 'district': district, 'predicted_price': price})
+
+        logger.info(f"Predicted {len(results)} prices for {len(crops)} crops x {len(districts)} districts")
+        return results
+
+    except Exception as e:
+        logger.error(f"Error predicting prices: {str(e)}")
+        return [
+            {'crop': crop, 'district': district, 'predicted_price': generate_mock_price(crop)}
+            for crop in crops for district in districts
+        ]
+
 def generate_mock_price(crop):
     """Generate mock price for testing"""
     base_prices = {
@@ -170,6 +418,3 @@ def generate_mock_price(crop):
     # Add some randomness (±10%)
     variation = base_price * (0.9 + np.random.random() * 0.2)
     return float(variation)
-
-# Load model on import
-load_model()
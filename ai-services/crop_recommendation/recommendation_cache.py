@@ -0,0 +1,124 @@
+"""
+Recommendation cache for Kisan Unnati
+Memoizes crop recommendations on a quantized feature vector. Requests that
+leave temperature, rainfall and pH to the seasonal and soil defaults collapse
+to a few soil x season combinations, so most of them are served without
+touching the model.
+"""
+
+import copy
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Rounding step per model feature; features are snapped to these grids
+DEFAULT_QUANTIZATION = {
+    'n': 1.0,
+    'p': 1.0,
+    'k': 1.0,
+    'temperature': 0.5,
+    'humidity': 1.0,
+    'ph': 0.1,
+    'rainfall': 5.0
+}
+
+
+def parse_quantization(spec: Optional[str]) -> Dict[str, float]:
+    """
+    Parse 'feature=step,...' overrides (e.g. 'temperature=1,rainfall=10')
+    on top of DEFAULT_QUANTIZATION
+    """
+    steps = dict(DEFAULT_QUANTIZATION)
+    for item in (spec or '').split(','):
+        name, _, step = item.partition('=')
+        if name.strip() and step.strip():
+            steps[name.strip().lower()] = float(step)
+    return steps
+
+
+class RecommendationCache:
+    """
+    LRU cache of recommendation results keyed on quantized features
+
+    Entries belong to one model version. invalidate() drops them when a new
+    artifact is loaded, and put() ignores results scored by an older version
+    so a reload racing with a request cannot bring stale answers back.
+    """
+
+    def __init__(self, max_entries: int = 4096, quantization: Optional[Dict[str, float]] = None):
+        """
+        Args:
+            max_entries: Maximum cached results before least recently used ones are evicted
+            quantization: Rounding step per feature name; features without a
+                step are used unrounded
+        """
+        self.max_entries = max(1, int(max_entries))
+        self.quantization = dict(DEFAULT_QUANTIZATION if quantization is None else quantization)
+        self.version = None
+
+        self._entries: 'OrderedDict[Tuple, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def quantize(self, features: Dict[str, float]) -> Dict[str, float]:
+        """Snap every feature to its rounding grid"""
+        quantized = {}
+        for name, value in features.items():
+            step = self.quantization.get(name)
+            quantized[name] = float(round(value / step) * step) if step else float(value)
+        return quantized
+
+    @staticmethod
+    def make_key(quantized: Dict[str, float], variant: Any = None) -> Tuple:
+        """Key of a quantized feature dict; variant separates result shapes (e.g. top_k)"""
+        return (variant,) + tuple(sorted(quantized.items()))
+
+    def get(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        """Get a copy of the cached result for key, or None"""
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(result)
+
+    def put(self, key: Tuple, result: Dict[str, Any], version: Optional[int] = None):
+        """Cache a result scored by the given model version"""
+        result = copy.deepcopy(result)
+        with self._lock:
+            if version != self.version:
+                return
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, version: Optional[int] = None):
+        """Drop all entries; later puts must come from the given model version"""
+        with self._lock:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.version = version
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'model_version': self.version,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
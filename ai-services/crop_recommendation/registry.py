@@ -0,0 +1,116 @@
+"""
+Model artifact registry for Kisan Unnati
+Tracks which on-disk model artifact is loaded in memory so readiness checks
+stay cheap and reloads only happen when the file actually changes
+"""
+
+import hashlib
+import os
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class ModelRegistry:
+    def __init__(self, path: str):
+        self.path = path
+        self.loaded = False
+        self.version = 0
+        self.loaded_at = None
+        self._stat_key = None
+        self._sha256 = None
+        self._lock = threading.RLock()
+        self._listeners: List[Callable[[int], None]] = []
+
+    @property
+    def lock(self) -> threading.RLock:
+        """Lock held while the owning model swaps in a new artifact"""
+        return self._lock
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        """Get (mtime_ns, size) for the artifact, or None if it is missing"""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _hash_file(self) -> Optional[str]:
+        """Compute SHA-256 of the artifact in chunks"""
+        try:
+            digest = hashlib.sha256()
+            with open(self.path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+            return digest.hexdigest()
+        except OSError:
+            return None
+
+    def file_sha256(self) -> Optional[str]:
+        """SHA-256 of the artifact currently on disk"""
+        return self._hash_file()
+
+    def mark_loaded(self, sha256: Optional[str] = None):
+        """
+        Record that the current artifact on disk is now the in-memory model
+
+        Args:
+            sha256: Hash of the loaded artifact if the caller already computed it
+        """
+        with self._lock:
+            self._stat_key = self._stat()
+            self._sha256 = sha256 or self._hash_file()
+            self.loaded = True
+            self.version += 1
+            self.loaded_at = datetime.utcnow().isoformat()
+            listeners = list(self._listeners)
+            version = self.version
+
+        for listener in listeners:
+            try:
+                listener(version)
+            except Exception as e:
+                print(f"Error in model reload listener: {e}")
+
+    def mark_unloaded(self):
+        """Record that no usable model is held in memory"""
+        with self._lock:
+            self.loaded = False
+
+    def has_changed(self) -> bool:
+        """
+        Check whether the artifact differs from the loaded one
+
+        A cheap stat comparison is done first; the file is only hashed when
+        its mtime or size moved, so touching the file without changing its
+        contents does not trigger a reload.
+        """
+        with self._lock:
+            if not self.loaded:
+                return True
+
+            stat_key = self._stat()
+            if stat_key is None or stat_key == self._stat_key:
+                return False
+
+            sha256 = self._hash_file()
+            if sha256 is not None and sha256 == self._sha256:
+                self._stat_key = stat_key
+                return False
+
+            return True
+
+    def add_listener(self, listener: Callable[[int], None]):
+        """Register a callback invoked with the new version after each load"""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def get_info(self) -> Dict[str, Any]:
+        """Get artifact tracking information"""
+        return {
+            'path': self.path,
+            'loaded': self.loaded,
+            'version': self.version,
+            'loaded_at': self.loaded_at,
+            'sha256': self._sha256
+        }
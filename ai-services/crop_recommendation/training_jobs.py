@@ -0,0 +1,196 @@
+"""
+Background training jobs for the price model
+Each job fits the model in a separate process with a limited core budget and
+reports progress back to the serving process, which swaps the new model in
+only after the fit succeeded
+"""
+
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+
+def _run_training_job(csv_path: str, output_path: str, n_jobs: int, messages):
+    """Training process entry point: fit, save to output_path and report back"""
+    try:
+        import joblib
+        from . import price_model
+
+        def report(fraction, stage):
+            messages.put(('progress', fraction, stage))
+
+        fitted = price_model.fit_price_model(csv_path, n_jobs=n_jobs, progress=report)
+        report(0.97, "saving")
+        joblib.dump(fitted, output_path)
+        messages.put(('done', 1.0, "saved"))
+    except Exception as e:
+        messages.put(('error', None, str(e)))
+
+
+class TrainingJob:
+    def __init__(self, job_id: str, n_jobs: int):
+        self.job_id = job_id
+        self.n_jobs = n_jobs
+        self.status = QUEUED
+        self.progress = 0.0
+        self.stage = 'queued'
+        self.error = None
+        self.submitted_at = datetime.utcnow().isoformat()
+        self.started_at = None
+        self.finished_at = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'progress': self.progress,
+            'stage': self.stage,
+            'error': self.error,
+            'cores': self.n_jobs,
+            'submitted_at': self.submitted_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+
+class TrainingJobManager:
+    """
+    Runs price model training jobs one at a time, each in its own process
+
+    A job's process writes the fitted model next to the serving artifact. The
+    manager thread then calls install(path), which should load it and make it
+    the serving model, and on_success() afterwards. A failed or crashed fit
+    leaves the serving model untouched.
+    """
+
+    def __init__(self,
+                 csv_path: str,
+                 model_path: str,
+                 install: Callable[[str], Any],
+                 on_success: Optional[Callable[[], Any]] = None,
+                 cores: Optional[int] = None,
+                 max_history: int = 50,
+                 start_method: Optional[str] = None):
+        """
+        Args:
+            csv_path: Training data
+            model_path: Serving artifact; jobs write next to it
+            install: Called with the trained artifact's path to swap it in
+            on_success: Called after a successful swap (e.g. to rebuild derived caches)
+            cores: Cores given to each fit (default: half the CPUs, leaving the rest to serving)
+            max_history: Finished jobs kept for status queries
+            start_method: multiprocessing start method (default: spawn)
+        """
+        self.csv_path = csv_path
+        self.model_path = model_path
+        self.install = install
+        self.on_success = on_success
+        self.cores = cores or max(1, (os.cpu_count() or 2) // 2)
+        self.max_history = max_history
+        self.context = multiprocessing.get_context(start_method or 'spawn')
+
+        self.jobs: Dict[str, TrainingJob] = {}
+        self._pending = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, name='price-training-jobs', daemon=True)
+        self._worker.start()
+
+    def submit(self, cores: Optional[int] = None) -> TrainingJob:
+        """Queue a training job and return it immediately"""
+        job = TrainingJob(uuid.uuid4().hex, max(1, int(cores or self.cores)))
+        with self._lock:
+            self.jobs[job.job_id] = job
+            self._trim_history()
+        self._pending.put(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return job.to_dict() if job is not None else None
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [job.to_dict() for job in self.jobs.values()]
+
+    def _trim_history(self):
+        """Forget the oldest finished jobs past max_history (caller holds the lock)"""
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in (SUCCEEDED, FAILED)]
+        for job_id in finished[:max(0, len(self.jobs) - self.max_history)]:
+            del self.jobs[job_id]
+
+    def _update(self, job: TrainingJob, **fields):
+        with self._lock:
+            for name, value in fields.items():
+                setattr(job, name, value)
+
+    def _run(self):
+        while True:
+            job = self._pending.get()
+            try:
+                self._run_job(job)
+            except Exception as e:
+                logger.error(f"Training job {job.job_id} failed: {str(e)}")
+                self._update(job, status=FAILED, error=str(e), finished_at=datetime.utcnow().isoformat())
+
+    def _run_job(self, job: TrainingJob):
+        if not os.path.exists(self.csv_path):
+            raise FileNotFoundError(f"Training data not found at {self.csv_path}")
+
+        output_path = f"{self.model_path}.{job.job_id}.tmp"
+        messages = self.context.Queue()
+        process = self.context.Process(
+            target=_run_training_job,
+            args=(self.csv_path, output_path, job.n_jobs, messages),
+            name=f'price-training-{job.job_id[:8]}'
+        )
+        self._update(job, status=RUNNING, stage='starting', started_at=datetime.utcnow().isoformat())
+        process.start()
+
+        outcome, error = None, None
+        while outcome is None:
+            try:
+                kind, fraction, stage = messages.get(timeout=1.0)
+            except queue.Empty:
+                if process.is_alive():
+                    continue
+                # The process may have exited right after its last message
+                try:
+                    kind, fraction, stage = messages.get(timeout=1.0)
+                except queue.Empty:
+                    outcome, error = 'error', f"Training process exited with code {process.exitcode}"
+                    continue
+            if kind == 'progress':
+                self._update(job, progress=fraction, stage=stage)
+            else:
+                outcome, error = kind, stage
+        process.join()
+
+        try:
+            if outcome != 'done':
+                raise RuntimeError(error)
+            self._update(job, progress=0.99, stage='swapping in model')
+            self.install(output_path)
+        finally:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+
+        self._update(job, status=SUCCEEDED, progress=1.0, stage='done', finished_at=datetime.utcnow().isoformat())
+        logger.info(f"Training job {job.job_id} finished")
+        if self.on_success is not None:
+            try:
+                self.on_success()
+            except Exception as e:
+                logger.error(f"Error after training job {job.job_id}: {str(e)}")
@@ -0,0 +1,168 @@
+"""
+Compiled tree-ensemble inference for Kisan Unnati
+Flattens a fitted sklearn random forest into contiguous NumPy node arrays and
+evaluates every tree at once with vectorized level-by-level traversal, skipping
+sklearn's per-call input validation and joblib dispatch
+"""
+
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+TREE_ARRAYS = ('children_left', 'children_right', 'feature', 'threshold', 'value', 'roots')
+
+CLASSIFIER = 'classifier'
+REGRESSOR = 'regressor'
+
+
+def forest_kind(model) -> str:
+    """'classifier' or 'regressor' for a fitted sklearn forest"""
+    return CLASSIFIER if hasattr(model, 'classes_') else REGRESSOR
+
+
+def flatten_forest(model) -> Dict[str, np.ndarray]:
+    """
+    Flatten a fitted RandomForestClassifier/RandomForestRegressor into global node arrays
+
+    Children indices are offset so all trees live in one set of arrays; leaves
+    have children_left == -1. For classifiers value holds each node's class
+    probabilities, for regressors its mean target in a single column.
+    """
+    estimators = getattr(model, 'estimators_', None)
+    if not estimators or not all(hasattr(est, 'tree_') for est in estimators):
+        raise ValueError(f"Only fitted sklearn random forests can be compiled, got {type(model).__name__}")
+
+    kind = forest_kind(model)
+    if kind == CLASSIFIER and not np.array_equal(model.classes_, np.arange(len(model.classes_))):
+        raise ValueError("Forest must be fitted on label-encoded classes 0..n-1")
+    if getattr(model, 'n_outputs_', 1) != 1:
+        raise ValueError("Only single-output forests can be compiled")
+
+    parts = {name: [] for name in TREE_ARRAYS if name != 'roots'}
+    roots = []
+    offset = 0
+    for est in estimators:
+        tree = est.tree_
+        left = tree.children_left.astype(np.int64)
+        right = tree.children_right.astype(np.int64)
+        is_leaf = left == -1
+
+        parts['children_left'].append(np.where(is_leaf, -1, left + offset))
+        parts['children_right'].append(np.where(is_leaf, -1, right + offset))
+        parts['feature'].append(np.where(is_leaf, 0, tree.feature).astype(np.int64))
+        parts['threshold'].append(tree.threshold.astype(np.float64))
+
+        value = tree.value[:, 0, :].astype(np.float64)
+        if kind == CLASSIFIER:
+            # Normalize node values to class probabilities as tree.predict_proba does
+            normalizer = value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            value = value / normalizer
+        parts['value'].append(value)
+
+        roots.append(offset)
+        offset += tree.node_count
+
+    arrays = {name: np.concatenate(chunks) for name, chunks in parts.items()}
+    arrays['roots'] = np.asarray(roots, dtype=np.int64)
+    return arrays
+
+
+class FlatForest:
+    """
+    Random forest evaluated on flat node arrays
+
+    The arrays may be in memory or memory-mapped. Mirrors the parts of the
+    sklearn forests the services use: classes_, predict_proba and predict.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], n_features: int, kind: str = CLASSIFIER):
+        self.children_left = arrays['children_left']
+        self.children_right = arrays['children_right']
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.value = arrays['value']
+        self.roots = arrays['roots']
+        self.kind = kind
+        self.n_estimators = len(self.roots)
+        self.n_features_in_ = n_features
+        if kind == CLASSIFIER:
+            # Label-encoded classes, as on the fitted sklearn forest
+            self.classes_ = np.arange(self.value.shape[1])
+
+    def apply(self, X) -> np.ndarray:
+        """Leaf node index reached in every tree, shape (n_samples, n_estimators)"""
+        # sklearn trees compare float32 inputs against float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected {self.n_features_in_} features, got {X.shape[1]}")
+
+        # One (row, tree) pair per slot; pairs drop out of the active set once
+        # they reach a leaf, so each level only touches the paths still descending
+        n_rows = X.shape[0]
+        nodes = np.tile(self.roots, n_rows)
+        row_offsets = np.repeat(np.arange(n_rows) * self.n_features_in_, self.n_estimators)
+        flat_X = X.ravel()
+        active = np.arange(nodes.size)
+
+        while active.size:
+            current = nodes[active]
+            left = self.children_left[current]
+            internal = left != -1
+            active, current, left = active[internal], current[internal], left[internal]
+            go_left = flat_X[row_offsets[active] + self.feature[current]] <= self.threshold[current]
+            nodes[active] = np.where(go_left, left, self.children_right[current])
+
+        return nodes.reshape(n_rows, self.n_estimators)
+
+    def _average_leaves(self, X) -> np.ndarray:
+        leaves = self.apply(X)
+        total = np.zeros((leaves.shape[0], self.value.shape[1]))
+        # Accumulate tree by tree, in the same order as the sklearn forests
+        for tree in range(self.n_estimators):
+            total += self.value[leaves[:, tree]]
+        total /= self.n_estimators
+        return total
+
+    def predict_proba(self, X) -> np.ndarray:
+        if self.kind != CLASSIFIER:
+            raise AttributeError("predict_proba is only available for classifiers")
+        return self._average_leaves(X)
+
+    def predict(self, X) -> np.ndarray:
+        if self.kind == CLASSIFIER:
+            return self.classes_[np.argmax(self._average_leaves(X), axis=1)]
+        return self._average_leaves(X)[:, 0]
+
+
+def compile_forest(model, validate_with: Optional[Any] = None) -> FlatForest:
+    """
+    Compile a fitted sklearn random forest
+
+    Args:
+        model: Fitted RandomForestClassifier or RandomForestRegressor
+        validate_with: Optional sample inputs; the compiled forest must reproduce
+            sklearn's outputs on them or ValueError is raised. Outputs are compared
+            to 1e-9 relative tolerance, since forests fitted with n_jobs > 1 sum
+            their trees in thread completion order.
+
+    Returns:
+        FlatForest with the same predictions as the model
+    """
+    kind = forest_kind(model)
+    compiled = FlatForest(flatten_forest(model), int(model.n_features_in_), kind)
+
+    if validate_with is not None:
+        X = np.asarray(validate_with, dtype=np.float64)
+        if kind == CLASSIFIER:
+            expected, actual = model.predict_proba(X), compiled.predict_proba(X)
+        else:
+            expected, actual = model.predict(X), compiled.predict(X)
+        if not np.allclose(expected, actual, rtol=1e-9, atol=1e-12):
+            raise ValueError(
+                f"Compiled forest diverges from sklearn (max abs diff {np.abs(expected - actual).max()})"
+            )
+
+    return compiled
@@ -3,5 +3,7 @@
 
 from .cnn_model import DiseaseDetectionModel
 from .predict import DiseaseDetector
+from .batcher import MicroBatcher
+from .image import PreprocessedImage
 
-__all__ = ['DiseaseDetectionModel', 'DiseaseDetector']
\ No newline at end of file
+__all__ = ['DiseaseDetectionModel', 'DiseaseDetector', 'MicroBatcher', 'PreprocessedImage']
\ No newline at end of file
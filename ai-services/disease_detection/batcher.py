@@ -0,0 +1,137 @@
+"""
+Dynamic micro-batching for disease detection inference
+Coalesces concurrent single-image requests into one model forward pass
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+_STOP = object()
+
+
+class MicroBatcher:
+    def __init__(self,
+                 predict_fn: Callable[[np.ndarray], np.ndarray],
+                 max_batch_size: int = 16,
+                 max_wait_ms: float = 10.0):
+        """
+        Args:
+            predict_fn: Function scoring a stacked batch, returning one output row per input
+            max_batch_size: Largest number of requests merged into one forward pass
+            max_wait_ms: Longest time the first request in a batch waits for company
+        """
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._queue = queue.Queue()
+        self._closed = False
+        # Makes the closed check and the put atomic with close(), so _STOP is
+        # always the last item queued and every submitted future is served
+        self._submit_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._largest_batch = 0
+
+        self._worker = threading.Thread(
+            target=self._run, name='disease-micro-batcher', daemon=True
+        )
+        self._worker.start()
+
+    def submit(self, tensor: np.ndarray) -> Future:
+        """
+        Queue a preprocessed tensor with a leading batch dimension of 1
+
+        Returns:
+            Future resolving to the model output row for this tensor
+        """
+        future = Future()
+        with self._submit_lock:
+            if self._closed:
+                raise RuntimeError("Micro-batcher is closed")
+            self._queue.put((tensor, future))
+        return future
+
+    async def submit_async(self, tensor: np.ndarray) -> np.ndarray:
+        """Queue a tensor and await its output without blocking the event loop"""
+        return await asyncio.wrap_future(self.submit(tensor))
+
+    def _run(self):
+        """Worker loop: collect a batch, score it, fan results back out"""
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._process_batch(batch)
+
+    def _process_batch(self, batch: List[Tuple[np.ndarray, Future]]):
+        """Run one forward pass and resolve every waiting future"""
+        pending = [(tensor, future) for tensor, future in batch
+                   if future.set_running_or_notify_cancel()]
+        if not pending:
+            return
+
+        try:
+            inputs = np.concatenate([tensor for tensor, _ in pending], axis=0)
+            outputs = self.predict_fn(inputs)
+            if len(outputs) != len(pending):
+                raise ValueError(f"Batch of {len(pending)} inputs returned {len(outputs)} outputs")
+
+            for (_, future), output in zip(pending, outputs):
+                future.set_result(output)
+        except Exception as e:
+            print(f"Error in batched disease prediction: {e}")
+            # Futures resolved before the failure keep their result
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+
+        with self._stats_lock:
+            self._batches += 1
+            self._items += len(pending)
+            self._largest_batch = max(self._largest_batch, len(pending))
+
+    def close(self, timeout: float = 5.0):
+        """Stop the worker after the queued requests are served"""
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._worker.join(timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get batching statistics"""
+        with self._stats_lock:
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'batches': self._batches,
+                'items': self._items,
+                'average_batch_size': self._items / self._batches if self._batches else 0.0,
+                'largest_batch': self._largest_batch,
+                'queue_depth': self._queue.qsize()
+            }
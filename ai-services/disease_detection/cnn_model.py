@@ -6,19 +6,45 @@ from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint
 import numpy as np
 import cv2
 import os
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Optional, Tuple
 import joblib
+from .image import PreprocessedImage
+
+# Reduced JPEG decode flags keyed by DCT downscale factor
+REDUCED_DECODE_FLAGS = {
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    2: cv2.IMREAD_REDUCED_COLOR_2
+}
 
 class DiseaseDetectionModel:
-    def __init__(self, model_path: str = "disease_detection/models/disease_model.h5"):
+    def __init__(self,
+                 model_path: str = "disease_detection/models/disease_model.h5",
+                 fast_decode: bool = False,
+                 lazy_load: bool = False):
+        """
+        Args:
+            model_path: Saved Keras model, built from scratch if missing
+            fast_decode: Decode large JPEGs at reduced resolution
+            lazy_load: Defer loading the Keras model until load_model() is called,
+                e.g. in each worker after a pre-fork server forks
+        """
         self.model_path = model_path
+        self.fast_decode = fast_decode
         self.model = None
         self.class_names = [
             'healthy', 'bacterial_blight', 'leaf_blight', 'powdery_mildew',
             'rust', 'fusarium_wilt', 'root_rot', 'aphid_damage', 'caterpillar_damage'
         ]
         self.img_size = (224, 224)
-        self._build_model()
+        if not lazy_load:
+            self._build_model()
+
+    def load_model(self) -> bool:
+        """Load (or build) the Keras model if it is not loaded yet"""
+        if self.model is None:
+            self._build_model()
+        return self.model is not None
 
     def _build_model(self):
         """Build CNN model for disease detection"""
@@ -73,31 +99,112 @@ class DiseaseDetectionModel:
 
     def preprocess_image(self, image_data: bytes) -> np.ndarray:
         """Preprocess image for model prediction"""
+        return self.preprocess_image_with_info(image_data)[0]
+
+    def preprocess_image_with_info(self, image_data: bytes) -> Tuple[np.ndarray, Dict[str, Any]]:
+        """Preprocess image for model prediction and report how it was decoded"""
         try:
             # Decode image
-            nparr = np.frombuffer(image_data, np.uint8)
-            img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            img, decode_info = self.decode_image(image_data)
+
+            return self.to_model_input(img), decode_info
+
+        except Exception as e:
+            print(f"Error preprocessing image: {e}")
+            raise
 
-            if img is None:
-                raise ValueError("Could not decode image")
+    def to_model_input(self, img: np.ndarray) -> np.ndarray:
+        """Convert a decoded BGR image into a normalized (1, 224, 224, 3) tensor"""
+        # Convert BGR to RGB
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
 
-            # Convert BGR to RGB
-            img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        # Resize image
+        img = cv2.resize(img, self.img_size)
 
-            # Resize image
-            img = cv2.resize(img, self.img_size)
+        # Normalize pixel values
+        img = img.astype(np.float32) / 255.0
 
-            # Normalize pixel values
-            img = img.astype(np.float32) / 255.0
+        # Add batch dimension
+        return np.expand_dims(img, axis=0)
 
-            # Add batch dimension
-            img = np.expand_dims(img, axis=0)
+    def decode_image(self, image_data: bytes) -> Tuple[np.ndarray, Dict[str, Any]]:
+        """
+        Decode image bytes to a BGR array
 
-            return img
+        In fast decode mode, JPEGs large enough to allow it are decoded with
+        IMREAD_REDUCED_COLOR_2/4/8 so libjpeg downscales in the DCT domain and
+        the full-resolution bitmap is never materialized.
+        """
+        nparr = np.frombuffer(image_data, np.uint8)
 
-        except Exception as e:
-            print(f"Error preprocessing image: {e}")
-            raise
+        encoded_size = self._read_jpeg_size(image_data) if self.fast_decode else None
+        factor = self._select_reduction_factor(encoded_size) if encoded_size else 1
+        flag = REDUCED_DECODE_FLAGS.get(factor, cv2.IMREAD_COLOR)
+
+        img = cv2.imdecode(nparr, flag)
+
+        if img is None:
+            raise ValueError("Could not decode image")
+
+        decoded_height, decoded_width = img.shape[:2]
+        original_width, original_height = encoded_size or (decoded_width, decoded_height)
+        full_decode_bytes = original_width * original_height * 3
+
+        decode_info = {
+            'decode_mode': 'reduced' if factor > 1 else 'full',
+            'reduction_factor': factor,
+            'original_size': f'{original_width}x{original_height}',
+            'decoded_size': f'{decoded_width}x{decoded_height}',
+            'decoded_bytes': int(img.nbytes),
+            'decode_bytes_saved': int(max(0, full_decode_bytes - img.nbytes))
+        }
+
+        return img, decode_info
+
+    def _select_reduction_factor(self, encoded_size: Tuple[int, int]) -> int:
+        """Pick the largest DCT downscale that keeps the image at least model-input sized"""
+        min_side = min(encoded_size)
+        target = max(self.img_size)
+
+        for factor in (8, 4, 2):
+            if min_side // factor >= target:
+                return factor
+        return 1
+
+    @staticmethod
+    def _read_jpeg_size(image_data: bytes) -> Optional[Tuple[int, int]]:
+        """Read (width, height) from a JPEG's SOF header without decoding, or None"""
+        if len(image_data) < 4 or image_data[0] != 0xFF or image_data[1] != 0xD8:
+            return None
+
+        pos = 2
+        length = len(image_data)
+        while pos + 4 <= length:
+            if image_data[pos] != 0xFF:
+                return None
+            marker = image_data[pos + 1]
+
+            # Fill bytes and standalone markers carry no length
+            if marker == 0xFF:
+                pos += 1
+                continue
+            if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:
+                pos += 2
+                continue
+
+            segment_length = (image_data[pos + 2] << 8) | image_data[pos + 3]
+
+            # SOF0-SOF15, excluding DHT (C4), JPG (C8) and DAC (CC)
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                if pos + 9 > length:
+                    return None
+                height = (image_data[pos + 5] << 8) | image_data[pos + 6]
+                width = (image_data[pos + 7] << 8) | image_data[pos + 8]
+                return (width, height) if width and height else None
+
+            pos += 2 + segment_length
+
+        return None
 
     def predict_disease(self, image_data: bytes) -> Dict[str, Any]:
         """Predict disease from image"""
@@ -106,35 +213,64 @@ class DiseaseDetectionModel:
                 raise Exception("Model not loaded")
 
             # Preprocess image
-            processed_img = self.preprocess_image(image_data)
+            processed_img, decode_info = self.preprocess_image_with_info(image_data)
 
             # Make prediction
             predictions = self.model.predict(processed_img)[0]
 
-            # Get top prediction
-            predicted_class_idx = np.argmax(predictions)
-            predicted_class = self.class_names[predicted_class_idx]
-            confidence = float(predictions[predicted_class_idx])
-
-            # Get disease information
-            disease_info = self._get_disease_info(predicted_class)
-
-            return {
-                'disease': predicted_class,
-                'confidence': confidence,
-                'severity': disease_info['severity'],
-                'treatment': disease_info['treatment'],
-                'prevention': disease_info['prevention'],
-                'all_predictions': {
-                    self.class_names[i]: float(predictions[i])
-                    for i in range(len(self.class_names))
-                }
-            }
+            result = self.format_prediction(predictions)
+            result['preprocessing'] = decode_info
+            return result
 
         except Exception as e:
             print(f"Error in disease prediction: {e}")
             return self._get_fallback_prediction()
 
+    def predict_preprocessed(self, image: PreprocessedImage) -> Dict[str, Any]:
+        """Predict disease from an already decoded image"""
+        try:
+            if self.model is None:
+                raise Exception("Model not loaded")
+
+            predictions = self.model.predict(image.tensor)[0]
+
+            result = self.format_prediction(predictions)
+            result['preprocessing'] = image.decode_info
+            return result
+
+        except Exception as e:
+            print(f"Error in disease prediction: {e}")
+            return self._get_fallback_prediction()
+
+    def predict_batch(self, images: np.ndarray) -> np.ndarray:
+        """Run one forward pass over a stacked (n, 224, 224, 3) image batch"""
+        if self.model is None:
+            raise Exception("Model not loaded")
+
+        return self.model.predict(images)
+
+    def format_prediction(self, predictions: np.ndarray) -> Dict[str, Any]:
+        """Build the prediction response from one row of class probabilities"""
+        # Get top prediction
+        predicted_class_idx = np.argmax(predictions)
+        predicted_class = self.class_names[predicted_class_idx]
+        confidence = float(predictions[predicted_class_idx])
+
+        # Get disease information
+        disease_info = self._get_disease_info(predicted_class)
+
+        return {
+            'disease': predicted_class,
+            'confidence': confidence,
+            'severity': disease_info['severity'],
+            'treatment': disease_info['treatment'],
+            'prevention': disease_info['prevention'],
+            'all_predictions': {
+                self.class_names[i]: float(predictions[i])
+                for i in range(len(self.class_names))
+            }
+        }
+
     def _get_disease_info(self, disease: str) -> Dict[str, str]:
         """Get detailed information about a disease"""
         disease_database = {
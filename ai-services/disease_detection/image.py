@@ -0,0 +1,76 @@
+"""
+Decoded image shared between quality analysis and disease prediction
+Decodes upload bytes once and derives the model tensor and quality metrics from it
+"""
+
+import cv2
+import numpy as np
+from typing import Any, Dict, Optional
+
+
+class PreprocessedImage:
+    # Longest side of the gray view used for quality metrics
+    QUALITY_MAX_SIDE = 512
+    # Sharpness (Laplacian variance) below which the gray view counts as blurry.
+    # Downsampling raises the variance, so the full-resolution threshold of 100
+    # no longer applies; this value flags blur wider than roughly 0.1-0.15% of
+    # the longest side, what 100 flagged on ~1 MP photos
+    # (benchmarks/bench_blur_calibration.py)
+    BLUR_THRESHOLD = 300.0
+
+    def __init__(self, image: np.ndarray, decode_info: Dict[str, Any], model):
+        """
+        Args:
+            image: Decoded BGR image
+            decode_info: Decode metadata from DiseaseDetectionModel.decode_image
+            model: DiseaseDetectionModel used to build the model tensor
+        """
+        self.image = image
+        self.decode_info = decode_info
+        self._model = model
+        self._tensor: Optional[np.ndarray] = None
+        self._gray: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_bytes(cls, image_data: bytes, model) -> 'PreprocessedImage':
+        """Decode image bytes once with the model's decode settings"""
+        image, decode_info = model.decode_image(image_data)
+        return cls(image, decode_info, model)
+
+    @property
+    def original_size(self):
+        """(width, height) of the encoded image before any reduced decode"""
+        width, height = self.decode_info['original_size'].split('x')
+        return int(width), int(height)
+
+    @property
+    def tensor(self) -> np.ndarray:
+        """Normalized (1, 224, 224, 3) model input, built on first access"""
+        if self._tensor is None:
+            self._tensor = self._model.to_model_input(self.image)
+        return self._tensor
+
+    @property
+    def gray(self) -> np.ndarray:
+        """Grayscale view downsampled so its longest side is at most QUALITY_MAX_SIDE"""
+        if self._gray is None:
+            height, width = self.image.shape[:2]
+            scale = self.QUALITY_MAX_SIDE / max(height, width)
+            image = self.image
+            if scale < 1.0:
+                image = cv2.resize(
+                    image,
+                    (max(1, int(width * scale)), max(1, int(height * scale))),
+                    interpolation=cv2.INTER_AREA
+                )
+            self._gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        return self._gray
+
+    def quality_metrics(self) -> Dict[str, float]:
+        """Brightness, contrast and sharpness computed on the gray view"""
+        gray = self.gray
+        return {
+            'brightness': float(np.mean(gray)),
+            'contrast': float(gray.std()),
+            'sharpness': float(cv2.Laplacian(gray, cv2.CV_64F).var())
+        }
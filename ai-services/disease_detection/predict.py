@@ -1,16 +1,96 @@
 from .cnn_model import DiseaseDetectionModel
-from typing import Dict, List, Any, Optional
+from .batcher import MicroBatcher
+from .image import PreprocessedImage
+from typing import Dict, List, Any, Optional, Awaitable, Callable
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import base64
 import io
 
 class DiseaseDetector:
-    def __init__(self):
-        self.model = DiseaseDetectionModel()
+    def __init__(self, fast_decode: bool = False, lazy_load: bool = False):
+        self.model = DiseaseDetectionModel(fast_decode=fast_decode, lazy_load=lazy_load)
+        self.batcher = None
 
     def is_ready(self) -> bool:
         """Check if the model is ready for predictions"""
         return self.model.model is not None
 
+    def load_model(self) -> bool:
+        """Load the Keras model if it was deferred with lazy_load"""
+        return self.model.load_model()
+
+    def enable_batching(self, max_batch_size: int = 16, max_wait_ms: float = 10.0):
+        """
+        Coalesce concurrent predict_async calls into shared forward passes
+
+        Args:
+            max_batch_size: Maximum images per forward pass
+            max_wait_ms: Maximum time a request waits for a batch to fill
+        """
+        if self.batcher is not None:
+            self.batcher.close()
+        self.batcher = MicroBatcher(self.model.predict_batch, max_batch_size, max_wait_ms)
+
+    def disable_batching(self):
+        """Stop the micro-batcher and go back to one forward pass per request"""
+        if self.batcher is not None:
+            self.batcher.close()
+            self.batcher = None
+
+    async def predict_async(self,
+                            image_data: bytes,
+                            crop_type: str = "general",
+                            offload: Optional[Callable[..., Awaitable[Any]]] = None) -> Dict[str, Any]:
+        """
+        Detect crop disease, sharing the forward pass with concurrent requests
+
+        Falls back to the synchronous path when batching is not enabled.
+
+        Args:
+            image_data: Raw image bytes
+            crop_type: Type of crop
+            offload: Awaitable runner (e.g. an inference executor lane) used for
+                the blocking decode and preprocessing; runs inline when omitted.
+                Errors raised by the runner itself, such as back-pressure
+                rejections, propagate to the caller.
+        """
+        if self.batcher is None:
+            if offload is not None:
+                return await offload(self.predict, image_data, crop_type)
+            return self.predict(image_data, crop_type)
+
+        if offload is not None:
+            prepared = await offload(self._safe_preprocess, image_data)
+        else:
+            prepared = self._safe_preprocess(image_data)
+
+        try:
+            try:
+                if prepared is None:
+                    raise ValueError("Image preprocessing failed")
+                processed_img, decode_info = prepared
+                predictions = await self.batcher.submit_async(processed_img)
+                result = self.model.format_prediction(predictions)
+                result['preprocessing'] = decode_info
+            except Exception as e:
+                print(f"Error in disease prediction: {e}")
+                result = self.model._get_fallback_prediction()
+
+            return self._add_result_context(result, crop_type)
+
+        except Exception as e:
+            print(f"Error in disease detection: {e}")
+            return self._get_error_response(str(e))
+
+    def _safe_preprocess(self, image_data: bytes):
+        """Decode and preprocess an upload, returning None instead of raising"""
+        try:
+            return self.model.preprocess_image_with_info(image_data)
+        except Exception as e:
+            print(f"Error preprocessing image: {e}")
+            return None
+
     def predict(self, image_data: bytes, crop_type: str = "general") -> Dict[str, Any]:
         """
         Detect crop disease from image
@@ -27,22 +107,25 @@ class DiseaseDetector:
             # Get model prediction
             result = self.model.predict_disease(image_data)
 
-            # Enhance result with crop-specific information
-            result['crop_type'] = crop_type
-            result['crop_specific_advice'] = self._get_crop_specific_advice(
-                result['disease'], crop_type
-            )
-
-            # Add additional metadata
-            result['detection_timestamp'] = self._get_current_timestamp()
-            result['model_version'] = '1.0.0'
-
-            return result
+            return self._add_result_context(result, crop_type)
 
         except Exception as e:
             print(f"Error in disease detection: {e}")
             return self._get_error_response(str(e))
 
+    def _add_result_context(self, result: Dict[str, Any], crop_type: str) -> Dict[str, Any]:
+        """Enhance a model prediction with crop-specific advice and metadata"""
+        result['crop_type'] = crop_type
+        result['crop_specific_advice'] = self._get_crop_specific_advice(
+            result['disease'], crop_type
+        )
+
+        # Add additional metadata
+        result['detection_timestamp'] = self._get_current_timestamp()
+        result['model_version'] = '1.0.0'
+
+        return result
+
     def _get_crop_specific_advice(self, disease: str, crop_type: str) -> Dict[str, Any]:
         """Get crop-specific advice for disease management"""
         crop_specific_database = {
@@ -130,71 +213,98 @@ class DiseaseDetector:
     def analyze_image_quality(self, image_data: bytes) -> Dict[str, Any]:
         """Analyze image quality for better disease detection"""
         try:
-            import cv2
-            import numpy as np
+            try:
+                image = PreprocessedImage.from_bytes(image_data, self.model)
+            except ValueError:
+                return {'quality_score': 0, 'issues': ['Invalid image format']}
 
-            # Decode image
-            nparr = np.frombuffer(image_data, np.uint8)
-            img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            return self._assess_image_quality(image)
 
-            if img is None:
-                return {'quality_score': 0, 'issues': ['Invalid image format']}
+        except Exception as e:
+            return self._get_quality_error_response(str(e))
+
+    def analyze_and_predict(self, image_data: bytes, crop_type: str = "general") -> Dict[str, Any]:
+        """
+        Analyze image quality and detect disease from a single decode
+
+        Returns:
+            Disease detection result with an added 'image_quality' report
+        """
+        try:
+            image = PreprocessedImage.from_bytes(image_data, self.model)
+        except Exception as e:
+            print(f"Error in disease detection: {e}")
+            result = self._get_error_response(str(e))
+            result['image_quality'] = {'quality_score': 0, 'issues': ['Invalid image format']}
+            return result
+
+        try:
+            quality = self._assess_image_quality(image)
+        except Exception as e:
+            quality = self._get_quality_error_response(str(e))
 
-            # Check image dimensions
-            height, width = img.shape[:2]
-            min_dimension = min(height, width)
+        try:
+            result = self._add_result_context(self.model.predict_preprocessed(image), crop_type)
+        except Exception as e:
+            print(f"Error in disease detection: {e}")
+            result = self._get_error_response(str(e))
 
-            # Check brightness
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            brightness = np.mean(gray)
+        result['image_quality'] = quality
+        return result
 
-            # Check contrast
-            contrast = gray.std()
+    def _assess_image_quality(self, image: PreprocessedImage) -> Dict[str, Any]:
+        """Score a decoded image's quality from its downsampled gray view"""
+        # Check image dimensions
+        width, height = image.original_size
+        min_dimension = min(height, width)
 
-            # Check blur
-            laplacian_var = cv2.Laplacian(gray, cv2.CV_64F).var()
+        metrics = image.quality_metrics()
+        brightness = metrics['brightness']
+        contrast = metrics['contrast']
+        laplacian_var = metrics['sharpness']
 
-            quality_score = 0
-            issues = []
+        quality_score = 0
+        issues = []
 
-            if min_dimension < 200:
-                quality_score -= 20
-                issues.append('Image too small - minimum 200x200 pixels recommended')
+        if min_dimension < 200:
+            quality_score -= 20
+            issues.append('Image too small - minimum 200x200 pixels recommended')
 
-            if brightness < 50:
-                quality_score -= 15
-                issues.append('Image too dark - ensure good lighting')
+        if brightness < 50:
+            quality_score -= 15
+            issues.append('Image too dark - ensure good lighting')
 
-            if brightness > 200:
-                quality_score -= 10
-                issues.append('Image too bright - avoid direct sunlight')
+        if brightness > 200:
+            quality_score -= 10
+            issues.append('Image too bright - avoid direct sunlight')
 
-            if contrast < 30:
-                quality_score -= 15
-                issues.append('Low contrast - focus on affected area clearly')
+        if contrast < 30:
+            quality_score -= 15
+            issues.append('Low contrast - focus on affected area clearly')
 
-            if laplacian_var < 100:
-                quality_score -= 10
-                issues.append('Image appears blurry - hold camera steady')
+        if laplacian_var < image.BLUR_THRESHOLD:
+            quality_score -= 10
+            issues.append('Image appears blurry - hold camera steady')
 
-            final_score = max(0, min(100, 100 + quality_score))
+        final_score = max(0, min(100, 100 + quality_score))
 
-            return {
-                'quality_score': final_score,
-                'brightness': float(brightness),
-                'contrast': float(contrast),
-                'sharpness': float(laplacian_var),
-                'dimensions': f'{width}x{height}',
-                'issues': issues,
-                'recommendations': self._get_quality_recommendations(issues)
-            }
+        return {
+            'quality_score': final_score,
+            'brightness': brightness,
+            'contrast': contrast,
+            'sharpness': laplacian_var,
+            'dimensions': f'{width}x{height}',
+            'issues': issues,
+            'recommendations': self._get_quality_recommendations(issues)
+        }
 
-        except Exception as e:
-            return {
-                'quality_score': 0,
-                'issues': [f'Quality analysis failed: {str(e)}'],
-                'recommendations': ['Please try with a different image']
-            }
+    def _get_quality_error_response(self, error_message: str) -> Dict[str, Any]:
+        """Return quality analysis error response"""
+        return {
+            'quality_score': 0,
+            'issues': [f'Quality analysis failed: {error_message}'],
+            'recommendations': ['Please try with a different image']
+        }
 
     def _get_quality_recommendations(self, issues: List[str]) -> List[str]:
         """Get recommendations based on quality issues"""
@@ -217,17 +327,114 @@ class DiseaseDetector:
 
         return recommendations
 
-    def batch_predict(self, image_list: List[bytes], crop_type: str = "general") -> List[Dict[str, Any]]:
-        """Batch prediction for multiple images"""
-        results = []
-        for image_data in image_list:
+    def batch_predict(self,
+                      image_list: List[bytes],
+                      crop_type: str = "general",
+                      chunk_size: int = 32,
+                      max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Batch prediction for multiple images
+
+        Images are decoded and resized in a thread pool (OpenCV releases the
+        GIL), stacked, and scored with one forward pass per chunk. The next
+        chunk is decoded while the current one is being scored. A failure to
+        decode or score an image only affects that image's result: when a
+        chunk's forward pass fails, its images are retried one at a time.
+
+        Args:
+            image_list: Raw image bytes for each photo
+            crop_type: Type of crop for crop-specific advice
+            chunk_size: Maximum images per forward pass
+            max_workers: Decode threads (defaults to ThreadPoolExecutor's choice)
+
+        Returns:
+            One result per input image, in input order
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(image_list)
+        chunk_size = max(1, chunk_size)
+        chunks = [
+            range(start, min(start + chunk_size, len(image_list)))
+            for start in range(0, len(image_list), chunk_size)
+        ]
+
+        if not chunks:
+            return []
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = [executor.submit(self._decode_for_batch, image_list[i]) for i in chunks[0]]
+
+            for chunk_idx, chunk in enumerate(chunks):
+                decoded = [future.result() for future in pending]
+
+                # Start decoding the next chunk while this one is scored
+                if chunk_idx + 1 < len(chunks):
+                    pending = [
+                        executor.submit(self._decode_for_batch, image_list[i])
+                        for i in chunks[chunk_idx + 1]
+                    ]
+
+                self._score_chunk(chunk, decoded, results, crop_type)
+
+        return results
+
+    def _decode_for_batch(self, image_data: bytes):
+        """Preprocess one image, capturing the error instead of raising"""
+        try:
+            return self.model.preprocess_image_with_info(image_data), None
+        except Exception as e:
+            return None, e
+
+    def _score_chunk(self, indices, decoded, results: List[Optional[Dict[str, Any]]], crop_type: str):
+        """Score the successfully decoded images of a chunk in one forward pass"""
+        valid = []
+        for idx, (processed, error) in zip(indices, decoded):
+            if error is not None:
+                results[idx] = self._get_error_response(str(error))
+            else:
+                valid.append((idx, processed))
+
+        if not valid:
+            return
+
+        try:
+            batch = np.concatenate([tensor for _, (tensor, _) in valid], axis=0)
+            predictions = self.model.predict_batch(batch)
+            if len(predictions) != len(valid):
+                raise ValueError(f"Batch of {len(valid)} images returned {len(predictions)} predictions")
+        except Exception as e:
+            print(f"Error in batch disease detection: {e}")
+            valid, predictions = self._score_one_by_one(valid, results, e)
+
+        for (idx, (_, decode_info)), row in zip(valid, predictions):
             try:
-                result = self.predict(image_data, crop_type)
-                results.append(result)
+                result = self.model.format_prediction(row)
+                result['preprocessing'] = decode_info
+                results[idx] = self._add_result_context(result, crop_type)
             except Exception as e:
-                results.append(self._get_error_response(str(e)))
+                results[idx] = self._get_error_response(str(e))
 
-        return results
+    def _score_one_by_one(self, valid, results: List[Optional[Dict[str, Any]]], batch_error: Exception):
+        """
+        Retry a failed chunk one image at a time, so one bad tensor cannot fail the rest
+
+        Returns:
+            The (index, decoded) entries that scored and their prediction rows;
+            failed images get an error response in results
+        """
+        if len(valid) == 1:
+            results[valid[0][0]] = self._get_error_response(str(batch_error))
+            return [], []
+
+        scored, predictions = [], []
+        for idx, (tensor, decode_info) in valid:
+            try:
+                row = self.model.predict_batch(tensor)[0]
+            except Exception as e:
+                results[idx] = self._get_error_response(str(e))
+                continue
+            scored.append((idx, (tensor, decode_info)))
+            predictions.append(row)
+        return scored, predictions
 
     def get_model_info(self) -> Dict[str, Any]:
         """Get model information and capabilities"""
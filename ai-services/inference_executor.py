@@ -0,0 +1,265 @@
+"""
+Inference executor layer for the API
+Runs blocking model code off the event loop, with per-service concurrency
+limits, queue-depth metrics and back-pressure when a service is saturated
+"""
+
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+# Objects built once per worker process by _init_worker, keyed by lane name
+_worker_targets: Dict[str, Any] = {}
+
+
+def _init_worker(name: str, factory: Callable[[], Any], warmup: Optional[str]):
+    """Process pool initializer: build the lane's target object once per worker"""
+    target = factory()
+    if warmup:
+        getattr(target, warmup)()
+    _worker_targets[name] = target
+
+
+def _call_in_worker(name: str, method: str, refresh: Optional[str], args, kwargs):
+    """Call a method on the worker's target object, refreshing it first if configured"""
+    target = _worker_targets[name]
+    if refresh:
+        getattr(target, refresh)()
+    return getattr(target, method)(*args, **kwargs)
+
+
+class ServiceOverloaded(Exception):
+    """Raised when a service's running and queued requests are at their limit"""
+
+    def __init__(self, service: str, retry_after: int = 1):
+        super().__init__(f"Service '{service}' is overloaded, retry later")
+        self.service = service
+        self.retry_after = retry_after
+
+
+class InferenceLane:
+    """
+    One service's slice of the executor
+
+    At most max_concurrency calls run at once; up to max_queue more wait their
+    turn. Anything beyond that is rejected with ServiceOverloaded instead of
+    piling up behind a saturated model. Counters are only touched from the
+    event loop thread, so they need no lock.
+    """
+
+    def __init__(self,
+                 name: str,
+                 executor: Executor,
+                 max_concurrency: int,
+                 max_queue: int,
+                 target: Any = None,
+                 refresh: Optional[str] = None,
+                 in_process: bool = False):
+        self.name = name
+        self.executor = executor
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_queue = max(0, int(max_queue))
+        self.target = target
+        self.refresh = refresh
+        self.in_process = in_process
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        self.active = 0
+        self.queued = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.max_queue_depth_seen = 0
+        self.total_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) on the lane's executor"""
+        if self.active + self.queued >= self.max_concurrency + self.max_queue:
+            self.rejected += 1
+            raise ServiceOverloaded(self.name)
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        self.submitted += 1
+        self.queued += 1
+        self.max_queue_depth_seen = max(self.max_queue_depth_seen, self.queued)
+        enqueued_at = time.perf_counter()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+
+        started_at = time.perf_counter()
+        self.total_wait_seconds += started_at - enqueued_at
+        self.active += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self.executor, partial(fn, *args, **kwargs))
+            self.completed += 1
+            return result
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.active -= 1
+            self.total_run_seconds += time.perf_counter() - started_at
+            self._semaphore.release()
+
+    async def call(self, method: str, *args, **kwargs) -> Any:
+        """Call a method on the lane's target, in a worker process when the lane has one"""
+        if self.in_process:
+            return await self.run(_call_in_worker, self.name, method, self.refresh, args, kwargs)
+        return await self.run(getattr(self.target, method), *args, **kwargs)
+
+    def get_stats(self) -> Dict[str, Any]:
+        finished = self.completed + self.failed
+        return {
+            'executor': 'process' if self.in_process else 'thread',
+            'max_concurrency': self.max_concurrency,
+            'max_queue': self.max_queue,
+            'active': self.active,
+            'queue_depth': self.queued,
+            'max_queue_depth_seen': self.max_queue_depth_seen,
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'average_wait_ms': self.total_wait_seconds * 1000.0 / self.submitted if self.submitted else 0.0,
+            'average_run_ms': self.total_run_seconds * 1000.0 / finished if finished else 0.0
+        }
+
+
+class InferenceExecutor:
+    """
+    Bounded pools for blocking inference work
+
+    Thread lanes share one thread pool and suit work that releases the GIL
+    (TensorFlow, OpenCV, network I/O). Process lanes get their own process
+    pool whose workers each build the lane's target object once, and suit
+    pure-Python and sklearn scoring that would otherwise contend for the GIL.
+    """
+
+    def __init__(self, thread_workers: Optional[int] = None, start_method: Optional[str] = None):
+        """
+        Args:
+            thread_workers: Size of the shared thread pool (default: min(32, CPUs + 4))
+            start_method: multiprocessing start method for process lanes (default: spawn,
+                which is safe after TensorFlow and other threaded libraries are loaded)
+        """
+        self.thread_pool = ThreadPoolExecutor(
+            max_workers=thread_workers, thread_name_prefix='inference'
+        )
+        self.start_method = start_method or 'spawn'
+        self.lanes: Dict[str, InferenceLane] = {}
+        self._process_pools = []
+
+    def add_thread_lane(self,
+                        name: str,
+                        max_concurrency: int,
+                        max_queue: int,
+                        target: Any = None) -> InferenceLane:
+        """Register a lane running on the shared thread pool"""
+        lane = InferenceLane(name, self.thread_pool, max_concurrency, max_queue, target=target)
+        self.lanes[name] = lane
+        return lane
+
+    def add_process_lane(self,
+                         name: str,
+                         factory: Callable[[], Any],
+                         processes: int,
+                         max_queue: int,
+                         local_target: Any = None,
+                         warmup: Optional[str] = None,
+                         refresh: Optional[str] = None) -> InferenceLane:
+        """
+        Register a lane backed by its own process pool
+
+        Args:
+            name: Lane name
+            factory: Picklable callable building the target object in each worker
+            processes: Worker processes; 0 runs calls on local_target in the thread pool
+            max_queue: Requests allowed to wait for a free worker
+            local_target: In-process target used when processes is 0
+            warmup: Method called on the target once after it is built
+            refresh: Method called on the target before every call (e.g. a cheap
+                reload-if-changed check so workers pick up new model artifacts)
+        """
+        if processes <= 0:
+            return self.add_thread_lane(name, os.cpu_count() or 1, max_queue, target=local_target)
+
+        pool = ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context(self.start_method),
+            initializer=_init_worker,
+            initargs=(name, factory, warmup)
+        )
+        self._process_pools.append(pool)
+        lane = InferenceLane(name, pool, processes, max_queue, refresh=refresh, in_process=True)
+        self.lanes[name] = lane
+        return lane
+
+    def lane(self, name: str) -> InferenceLane:
+        return self.lanes[name]
+
+    async def run(self, lane: str, fn: Callable, *args, **kwargs) -> Any:
+        """Run a blocking function on a thread lane"""
+        return await self.lanes[lane].run(fn, *args, **kwargs)
+
+    async def call(self, lane: str, method: str, *args, **kwargs) -> Any:
+        """Call a method on a lane's target object"""
+        return await self.lanes[lane].call(method, *args, **kwargs)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-lane concurrency, queue-depth and latency counters"""
+        return {name: lane.get_stats() for name, lane in self.lanes.items()}
+
+    def to_prometheus(self) -> str:
+        """Render lane counters in the Prometheus text exposition format"""
+        metrics = [
+            ('active', 'gauge', 'Calls currently running'),
+            ('queue_depth', 'gauge', 'Calls waiting for a free slot'),
+            ('submitted', 'counter', 'Calls accepted'),
+            ('completed', 'counter', 'Calls finished successfully'),
+            ('failed', 'counter', 'Calls that raised'),
+            ('rejected', 'counter', 'Calls rejected with 503 because the lane was full'),
+        ]
+        stats = self.get_stats()
+        lines = []
+        for key, kind, description in metrics:
+            suffix = '_total' if kind == 'counter' else ''
+            name = f'inference_{key}{suffix}'
+            lines += [f'# HELP {name} {description}', f'# TYPE {name} {kind}']
+            for lane, lane_stats in stats.items():
+                lines.append(f'{name}{{service="{lane}"}} {lane_stats[key]}')
+        return '\n'.join(lines) + '\n'
+
+    def shutdown(self):
+        """Stop all pools, letting running calls finish"""
+        self.thread_pool.shutdown(wait=False, cancel_futures=True)
+        for pool in self._process_pools:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def create_inference_executor() -> InferenceExecutor:
+    """Build an executor configured through INFERENCE_* environment variables"""
+    threads = os.getenv('INFERENCE_THREADS')
+    return InferenceExecutor(
+        thread_workers=int(threads) if threads else None,
+        start_method=os.getenv('INFERENCE_START_METHOD')
+    )
+
+
+def lane_limits(service: str, concurrency: int, queue: int):
+    """Read INFERENCE_<SERVICE>_CONCURRENCY / _QUEUE overrides for a lane"""
+    prefix = f'INFERENCE_{service.upper()}'
+    return (
+        int(os.getenv(f'{prefix}_CONCURRENCY', concurrency)),
+        int(os.getenv(f'{prefix}_QUEUE', queue))
+    )
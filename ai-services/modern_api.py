@@ -8,13 +8,14 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import uvicorn
 import numpy as np
-import joblib
 import tensorflow as tf
 import pickle
 import json
 import os
 from typing import Optional, List, Dict
 import logging
+from crop_recommendation.artifact import load_crop_artifact
+from crop_recommendation.registry import ModelRegistry
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -41,6 +42,8 @@ models = {
     'disease': None,
     'chatbot': None
 }
+models_preloaded = False
+keras_models_loaded = False
 
 # Request Models
 class CropRecommendationRequest(BaseModel):
@@ -60,17 +63,54 @@ class ChatbotRequest(BaseModel):
 @app.on_event("startup")
 async def load_models():
     """Load all ML models on startup"""
+    preload_models()
+    load_keras_models()
+
+def preload_models():
+    """
+    Load the fork-safe models once
+
+    serve.py calls this in the parent before forking workers so they share the
+    crop model copy-on-write; the call from the startup event is then a no-op
+    in each worker. The Keras models are left to load_keras_models().
+    """
+    global models_preloaded
+    if models_preloaded:
+        return
+
     logger.info("🚀 Loading AI models...")
     
     try:
         # Load crop model
         crop_path = 'crop_recommendation/models/crop_model.pkl'
         if os.path.exists(crop_path):
-            models['crop'] = joblib.load(crop_path)
+            # Prefers the memory-mapped export written by train_crop_model.py,
+            # as long as it was exported from this exact pickle
+            models['crop'] = load_crop_artifact(
+                crop_path, source_sha256=ModelRegistry(crop_path).file_sha256()
+            )
             logger.info("✅ Crop recommendation model loaded")
         else:
             logger.warning("⚠️ Crop model not found")
         
+        models_preloaded = True
+        
+    except Exception as e:
+        logger.error(f"❌ Error loading models: {e}")
+
+def load_keras_models():
+    """
+    Load the TensorFlow models in the current process
+
+    TensorFlow's runtime is not fork-safe once a model is loaded, so under
+    serve.py this runs in each worker after the fork and every worker holds
+    its own copy of these weights.
+    """
+    global keras_models_loaded
+    if keras_models_loaded:
+        return
+
+    try:
         # Load disease detection model
         disease_path = 'disease_detection/models/disease_model.h5'
         if os.path.exists(disease_path):
@@ -97,6 +137,7 @@ async def load_models():
             logger.warning("⚠️ Chatbot model not found")
         
         logger.info("🎉 All models loaded successfully!")
+        keras_models_loaded = True
         
     except Exception as e:
         logger.error(f"❌ Error loading models: {e}")
@@ -0,0 +1,188 @@
+"""
+Pre-fork server for the AI services
+Loads the fork-safe models once in the parent process, then forks uvicorn
+workers that share the loaded weights copy-on-write instead of each loading its
+own copy. TensorFlow models are not fork-safe once loaded, so the apps load
+them in each worker's startup event instead.
+
+Usage:
+    python serve.py --app api:app --workers 4 --port 8000
+    python serve.py --app modern_api:app --workers 8 --report-memory
+"""
+
+import argparse
+import gc
+import importlib
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Any, Dict, Optional
+
+import uvicorn
+
+
+def load_app(app_path: str):
+    """Import the ASGI app and run its module's preload_models() hook if it has one"""
+    module_name, _, attr = app_path.partition(':')
+    module = importlib.import_module(module_name)
+
+    preload = getattr(module, 'preload_models', None)
+    if preload is not None:
+        started = time.time()
+        preload()
+        print(f"Preloaded models for {module_name} in {time.time() - started:.1f}s")
+
+    return getattr(module, attr or 'app')
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    """Create the listening socket shared by all workers"""
+    sock = socket.socket(socket.AF_INET6 if ':' in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def memory_usage(pid: int) -> Optional[Dict[str, float]]:
+    """
+    Memory of a process in MB from /proc/<pid>/smaps_rollup
+
+    pss (proportional set size) splits shared pages between the processes
+    mapping them, so summing pss over workers gives their real footprint.
+    """
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            fields = {}
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                    fields[parts[0][:-1]] = int(parts[1]) / 1024.0
+    except OSError:
+        return None
+
+    return {
+        'rss': fields.get('Rss', 0.0),
+        'pss': fields.get('Pss', 0.0),
+        'shared': fields.get('Shared_Clean', 0.0) + fields.get('Shared_Dirty', 0.0),
+        'private': fields.get('Private_Clean', 0.0) + fields.get('Private_Dirty', 0.0)
+    }
+
+
+class PreforkServer:
+    def __init__(self, app: Any, sock: socket.socket, workers: int, log_level: str = 'info'):
+        self.app = app
+        self.sock = sock
+        self.num_workers = max(1, workers)
+        self.log_level = log_level
+        self.workers: Dict[int, float] = {}
+        self.stopping = False
+
+    def spawn_worker(self):
+        """Fork one uvicorn worker serving on the shared socket"""
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            exit_code = 0
+            try:
+                config = uvicorn.Config(self.app, log_level=self.log_level, lifespan='on')
+                uvicorn.Server(config).run(sockets=[self.sock])
+            except Exception as e:
+                print(f"Worker {os.getpid()} failed: {e}")
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+
+        self.workers[pid] = time.time()
+
+    def _handle_stop(self, signum, frame):
+        self.stopping = True
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def report_memory(self):
+        """Print per-worker and total memory, as seen by the kernel"""
+        rows = [('parent', os.getpid())] + [('worker', pid) for pid in self.workers]
+        total_pss = 0.0
+        print(f"{'process':>8} {'pid':>8} {'rss MB':>9} {'pss MB':>9} {'shared MB':>10} {'private MB':>11}")
+        for role, pid in rows:
+            usage = memory_usage(pid)
+            if usage is None:
+                continue
+            total_pss += usage['pss']
+            print(f"{role:>8} {pid:>8} {usage['rss']:>9.1f} {usage['pss']:>9.1f} "
+                  f"{usage['shared']:>10.1f} {usage['private']:>11.1f}")
+        print(f"Total PSS: {total_pss:.1f} MB")
+
+    def run(self, report_memory_after: Optional[float] = None):
+        """Start the workers and restart any that exit until told to stop"""
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+
+        for _ in range(self.num_workers):
+            self.spawn_worker()
+        print(f"Started {self.num_workers} workers: {sorted(self.workers)}")
+
+        if report_memory_after:
+            time.sleep(report_memory_after)
+            self.report_memory()
+
+        while self.workers:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+
+            started = self.workers.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+
+            print(f"Worker {pid} exited with status {status}, restarting")
+            # Back off when workers die right after starting, e.g. on a bad model file
+            if time.time() - started < 1.0:
+                time.sleep(1.0)
+            self.spawn_worker()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fork server sharing loaded models between workers")
+    parser.add_argument('--app', default=os.getenv('SERVE_APP', 'api:app'))
+    parser.add_argument('--host', default=os.getenv('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('PORT', 8000)))
+    parser.add_argument('--workers', type=int, default=int(os.getenv('WEB_CONCURRENCY', os.cpu_count() or 1)))
+    parser.add_argument('--log-level', default='info')
+    parser.add_argument('--report-memory', action='store_true',
+                        help='Print per-worker RSS/PSS once the workers have started')
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    # Pre-forked workers already provide process parallelism; separate crop
+    # scoring processes would each load a private copy of the model
+    os.environ.setdefault('INFERENCE_CROP_PROCESSES', '0')
+
+    app = load_app(args.app)
+
+    # Keep the garbage collector from writing to the preloaded objects' headers,
+    # which would un-share their pages in every worker
+    gc.collect()
+    gc.freeze()
+
+    sock = bind_socket(args.host, args.port)
+    print(f"Serving {args.app} on {args.host}:{args.port}")
+    PreforkServer(app, sock, args.workers, args.log_level).run(
+        report_memory_after=5.0 if args.report_memory else None
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -14,6 +14,8 @@ import joblib
 import os
 from datetime import datetime
 import json
+import hashlib
+from crop_recommendation.artifact import export_mapped_model, mapped_dir_for
 
 def load_and_prepare_data(data_path='crop_recommendation/data/crop_data.csv'):
     """Load and prepare crop data"""
@@ -118,6 +120,16 @@ def save_model(model, scaler, label_encoder, feature_columns, crop_names,
     }
     
     joblib.dump(model_data, 'crop_recommendation/models/crop_model.pkl')
+
+    # Memory-mapped export for fast, shared loading (random forests only)
+    try:
+        with open('crop_recommendation/models/crop_model.pkl', 'rb') as f:
+            source_sha256 = hashlib.sha256(f.read()).hexdigest()
+        export_mapped_model(model_data, mapped_dir_for('crop_recommendation/models/crop_model.pkl'),
+                            source_sha256=source_sha256)
+        print("✅ Memory-mapped export written")
+    except ValueError as e:
+        print(f"⚠️ Skipping memory-mapped export: {e}")
     
     # Save metadata
     metadata = {